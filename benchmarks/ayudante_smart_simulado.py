@@ -0,0 +1,60 @@
+'''
+Ayudante SMART simulado, que responde el protocolo de utils.ayudante_smart
+con las salidas de smartctl grabadas en los fixtures en lugar de ejecutar
+smartctl. Permite probar y medir el cliente sin permisos de administrador.
+
+    python -m benchmarks.ayudante_smart_simulado /tmp/smart.sock [latencia_ms]
+'''
+import sys
+import threading
+import time
+
+from pathlib import Path
+
+import utils.ayudante_smart as ayudante_smart
+import utils.smartmontools as smartmontools
+
+RUTA_FIXTURES = Path(__file__).parent / 'fixtures' / 'smartctl'
+
+def crear_ejecutor(latencia=0.0, ruta_fixtures=RUTA_FIXTURES):
+    '''
+    Devuelve una función que reemplaza a la ejecución de smartctl sobre un
+    lote: a cada dispositivo le corresponde siempre el mismo fixture JSON
+    (los NVMe, el de NVMe), después de esperar 'latencia' segundos.
+    '''
+    salidas = {
+        ruta.stem: ruta.read_text(encoding='utf-8')
+        for ruta in Path(ruta_fixtures).glob('*.json')
+    }
+
+    def ejecutar_lote(dispositivos, timeout):
+        if latencia:
+            time.sleep(latencia)
+
+        return {
+            dispositivo: smartmontools.ResultadoSmartctl(
+                'ok',
+                salidas['nvme' if 'nvme' in dispositivo else 'ata'],
+                None, latencia
+            )
+            for dispositivo in dispositivos
+        }
+
+    return ejecutar_lote
+
+def iniciar_servidor(ruta_socket, latencia=0.0, ttl=0):
+    '''Inicia el ayudante simulado en un hilo en segundo plano.'''
+    ayudante = ayudante_smart.AyudanteSmart(crear_ejecutor(latencia), ttl)
+
+    return ayudante_smart.iniciar_servidor(ruta_socket, ayudante)
+
+if __name__ == '__main__':
+    latencia = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    servidor = iniciar_servidor(sys.argv[1], latencia)
+    print(f'Ayudante SMART simulado en {sys.argv[1]}')
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+        servidor.server_close()
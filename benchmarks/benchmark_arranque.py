@@ -0,0 +1,125 @@
+'''
+Benchmark del arranque del agente en modo sin interfaz: el tiempo desde que
+se lanza el proceso hasta la primera instantánea de cada recolector, y la
+memoria residente (RSS) en ese momento. Se compara con las importaciones
+que hacía main.py antes del modo sin interfaz (tkinter, requests y
+py-cpuinfo). El presupuesto es de 100 ms hasta la primera muestra. Se
+ejecuta desde la raíz del proyecto:
+
+    python -m benchmarks.benchmark_arranque
+'''
+import os
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+
+import psutil
+
+RAIZ = Path(__file__).parent.parent
+
+REPETICIONES = 5
+
+PRESUPUESTO_MS = 100
+
+# * Proceso hijo: arma el motor igual que main.py en modo sin interfaz y
+# * marca la primera instantánea con datos de cada recolector.
+HIJO = '''
+import os, sys
+{importaciones}
+import config
+import metrics.cpu as cpu
+import metrics.storage as storage
+import utils.recoleccion as recoleccion
+
+servicio = config.ServicioConfiguracion()
+servicio.cargar()
+motor = recoleccion.MotorRecoleccion(
+    cpu.Cpu(), storage.Storage(), os.name, servicio
+)
+motor.iniciar()
+
+pendientes = {{'cpu', 'almacenamiento'}}
+while pendientes:
+    for instantanea in motor.obtener_instantaneas_pendientes():
+        for campo in tuple(pendientes):
+            if getattr(instantanea, campo) is not None:
+                pendientes.discard(campo)
+                print(campo, flush=True)
+
+print('modulos', *sorted(
+    modulo for modulo in ('tkinter', 'requests', 'cpuinfo')
+    if modulo in sys.modules
+), flush=True)
+input()
+'''
+
+CASOS = (
+    ('sin interfaz', ''),
+    ('importaciones anteriores', 'import tkinter, requests, cpuinfo'),
+)
+
+def medir(importaciones):
+    '''
+    Lanza el proceso hijo y devuelve los milisegundos hasta la primera
+    instantánea de cada recolector, el RSS en KiB al terminar y los módulos
+    opcionales importados.
+    '''
+    entorno = dict(os.environ, PYTHONUNBUFFERED='1')
+
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, '-c', HIJO.format(importaciones=importaciones)],
+        cwd=RAIZ, env=entorno, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, text=True
+    )
+
+    tiempos = {}
+    modulos = ()
+
+    for linea in proceso.stdout:
+        campos = linea.split()
+
+        if not campos:
+            continue
+
+        if campos[0] in ('cpu', 'almacenamiento'):
+            tiempos[campos[0]] = (time.perf_counter() - inicio) * 1000
+        elif campos[0] == 'modulos':
+            modulos = campos[1:]
+            break
+
+    rss = psutil.Process(proceso.pid).memory_info().rss / 1024
+
+    proceso.communicate('\n', timeout=30)
+
+    return tiempos, rss, modulos
+
+def main():
+    print(
+        f'{"caso":<26}{"cpu ms":>10}{"storage ms":>12}{"primera ms":>12}'
+        f'{"RSS KiB":>10}  módulos opcionales'
+    )
+
+    for nombre, importaciones in CASOS:
+        mediciones = [medir(importaciones) for _ in range(REPETICIONES)]
+
+        cpu = sorted(tiempos['cpu'] for tiempos, _, _ in mediciones)
+        almacenamiento = sorted(
+            tiempos['almacenamiento'] for tiempos, _, _ in mediciones
+        )
+        primera = sorted(min(tiempos.values()) for tiempos, _, _ in mediciones)
+        rss = sorted(rss for _, rss, _ in mediciones)
+        mediana = REPETICIONES // 2
+
+        print(
+            f'{nombre:<26}{cpu[mediana]:>10.1f}'
+            f'{almacenamiento[mediana]:>12.1f}{primera[mediana]:>12.1f}'
+            f'{rss[mediana]:>10.0f}  {" ".join(mediciones[0][2]) or "-"}'
+        )
+
+    print(f'presupuesto hasta la primera muestra: {PRESUPUESTO_MS} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+'''
+Benchmark del costo por lote de leer SMART a través del ayudante, con el
+ayudante simulado (sin smartctl), comparado con crear un proceso por disco
+como hace 'sudo smartctl'. El proceso por disco ejecuta 'true', por lo que
+es una cota inferior: no incluye a sudo, PAM ni a smartctl. Se ejecuta
+desde la raíz del proyecto:
+
+    python -m benchmarks.benchmark_ayudante_smart
+'''
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import benchmarks.ayudante_smart_simulado as ayudante_simulado
+import metrics.smart as smart
+import utils.smartmontools as smartmontools
+
+DISCOS = (4, 16, 64)
+LOTES = 200
+PARALELISMO = 8
+
+def crear_dispositivos(cantidad):
+    '''Devuelve nombres de dispositivos válidos, mitad SATA y mitad NVMe.'''
+    letras = 'abcdefghijklmnopqrstuvwxyz'
+
+    return [
+        f'/dev/nvme{numero}n1' if numero % 2 else
+        f'/dev/sd{letras[numero // 26 % 26]}{letras[numero % 26]}'
+        for numero in range(cantidad)
+    ]
+
+def medir_ayudante(ruta_socket, dispositivos, lotes=LOTES):
+    '''Devuelve los ms por lote, incluido interpretar las salidas.'''
+    cliente = smartmontools.Smartmontools(ayudante=ruta_socket)
+    parser = smart.ParserSmart()
+
+    inicio = time.perf_counter()
+    for _ in range(lotes):
+        resultados = cliente.ejecutar_smartmontools_lote(dispositivos)
+
+        for resultado in resultados.values():
+            assert resultado.estado == 'ok', resultado.error
+            parser.parsear(resultado.salida)
+
+    return (time.perf_counter() - inicio) / lotes * 1000
+
+def medir_procesos(dispositivos, lotes):
+    '''Devuelve los ms por lote de crear un proceso 'true' por disco.'''
+    comando = [shutil.which('true')]
+
+    with ThreadPoolExecutor(max_workers=PARALELISMO) as ejecutor:
+        inicio = time.perf_counter()
+        for _ in range(lotes):
+            list(ejecutor.map(
+                lambda _: subprocess.run(comando, capture_output=True),
+                dispositivos
+            ))
+
+        return (time.perf_counter() - inicio) / lotes * 1000
+
+def main():
+    with tempfile.TemporaryDirectory() as directorio:
+        sin_cache = ayudante_simulado.iniciar_servidor(
+            os.path.join(directorio, 'sin-cache.sock')
+        )
+        con_cache = ayudante_simulado.iniciar_servidor(
+            os.path.join(directorio, 'con-cache.sock'), ttl=3600
+        )
+
+        print(f'{"discos":>6}{"caso":>30}{"ms/lote":>10}')
+
+        for cantidad in DISCOS:
+            dispositivos = crear_dispositivos(cantidad)
+
+            casos = (
+                ('ayudante', medir_ayudante, sin_cache, LOTES),
+                ('ayudante con caché', medir_ayudante, con_cache, LOTES),
+                ('proceso por disco (cota)', None, None, LOTES // 10),
+            )
+
+            for nombre, funcion, servidor, lotes in casos:
+                if funcion is None:
+                    tiempo = medir_procesos(dispositivos, lotes)
+                else:
+                    tiempo = funcion(
+                        servidor.server_address, dispositivos, lotes
+                    )
+
+                print(f'{cantidad:>6}{nombre:>30}{tiempo:>10.3f}')
+
+        for servidor in (sin_cache, con_cache):
+            servidor.shutdown()
+            servidor.server_close()
+
+if __name__ == '__main__':
+    main()
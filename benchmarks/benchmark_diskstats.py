@@ -0,0 +1,82 @@
+'''
+Benchmark del costo de una muestra de entrada/salida de los discos: el
+muestreador de /proc/diskstats del sistema comparado con
+psutil.disk_io_counters(perdisk=True), y el muestreador sobre un
+/proc/diskstats sintético con muchos discos y particiones. Se ejecuta desde
+la raíz del proyecto (en Linux):
+
+    python -m benchmarks.benchmark_diskstats
+'''
+import os
+import random
+import tempfile
+import timeit
+
+import psutil
+
+import metrics.diskstats as diskstats
+
+DISCOS = 64
+PARTICIONES = 4
+
+REPETICIONES = 5
+ITERACIONES = 2000
+
+def medir(funcion):
+    '''Devuelve el mejor tiempo por llamada en microsegundos.'''
+    tiempos = timeit.repeat(
+        funcion, repeat=REPETICIONES, number=ITERACIONES
+    )
+
+    return min(tiempos) / ITERACIONES * 1e6
+
+def escribir_diskstats(directorio):
+    '''Escribe un diskstats sintético con DISCOS discos NVMe particionados.'''
+    generador = random.Random(0)
+    lineas = []
+
+    for disco in range(DISCOS):
+        nombres = [f'nvme{disco}n1'] + [
+            f'nvme{disco}n1p{particion}'
+            for particion in range(1, PARTICIONES + 1)
+        ]
+
+        for menor, nombre in enumerate(nombres):
+            contadores = ' '.join(
+                str(generador.randrange(1 << 40)) for _ in range(17)
+            )
+            lineas.append(f' 259 {menor:7d} {nombre} {contadores}')
+
+    with open(
+        os.path.join(directorio, 'diskstats'), 'w', encoding='ascii'
+    ) as archivo:
+        archivo.write('\n'.join(lineas) + '\n')
+
+def main():
+    muestreador = diskstats.MuestreadorIO('posix')
+    muestreador.muestrear()
+
+    print(
+        f'sistema ({len(muestreador.muestrear())} dispositivos): '
+        f'muestreador {medir(muestreador.muestrear):.2f} µs, '
+        'psutil '
+        f'{medir(lambda: psutil.disk_io_counters(perdisk=True)):.2f} µs'
+    )
+
+    with tempfile.TemporaryDirectory() as directorio:
+        escribir_diskstats(directorio)
+
+        sintetico = diskstats.MuestreadorIO('posix', directorio)
+        sintetico.muestrear()
+
+        print(
+            f'sintético ({DISCOS * (PARTICIONES + 1)} dispositivos): '
+            f'muestreador {medir(sintetico.muestrear):.2f} µs'
+        )
+
+        sintetico.cerrar()
+
+    muestreador.cerrar()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+'''
+Benchmark de la latencia y las asignaciones de memoria por consulta de la
+temperatura de la CPU a Libre Hardware Monitor, usando el servidor local que
+sirve los data.json grabados. Compara el cliente con conexión persistente y
+rutas resueltas con el recorrido anterior (una conexión nueva y el árbol
+completo en cada consulta). Se ejecuta desde la raíz del proyecto:
+
+    python -m benchmarks.benchmark_lhm
+'''
+import time
+import tracemalloc
+
+from pathlib import Path
+
+import requests
+
+import benchmarks.servidor_lhm as servidor_lhm
+import utils.libre_hardware_monitor as lhm
+
+RUTA_FIXTURES = Path(__file__).parent / 'fixtures' / 'lhm'
+
+CASOS = (
+    ('intel.json', 'Intel Core i7-12700K'),
+    ('amd.json', 'AMD Ryzen 7 5800X'),
+)
+
+ITERACIONES = 300
+
+def leer_legado(url, modelo):
+    '''
+    Reproduce la consulta anterior: una conexión nueva por consulta y el
+    recorrido del árbol completo comparando ImageURL y Text.
+    '''
+    datos = requests.get(url, timeout=3).json()
+
+    paquete_cpu = None
+    temperatura_nucleos = []
+
+    for hardware in datos['Children'][0]['Children']:
+        if hardware.get('ImageURL', '') == 'images_icon/cpu.png':
+            for sensor in hardware['Children']:
+                if sensor['Text'] == 'Temperatures':
+                    core = 1
+
+                    for sensor_temperatura in sensor['Children']:
+                        if modelo.startswith('Intel'):
+                            if sensor_temperatura['Text'] == f'CPU Core #{core}':
+                                temperatura_nucleos.append(float(
+                                    sensor_temperatura['Value']
+                                    .replace('°C', '').strip()
+                                ))
+                                core += 1
+                            if sensor_temperatura['Text'] == 'CPU Package':
+                                paquete_cpu = float(
+                                    sensor_temperatura['Value']
+                                    .replace('°C', '').strip()
+                                )
+                        if modelo.startswith('AMD'):
+                            if sensor_temperatura['Text'] == 'CCD1 (Tdie)':
+                                temperatura_nucleos.append(float(
+                                    sensor_temperatura['Value']
+                                    .replace('°C', '').strip()
+                                ))
+                            if sensor_temperatura['Text'] == 'Core (Tctl/Tdie)':
+                                paquete_cpu = float(
+                                    sensor_temperatura['Value']
+                                    .replace('°C', '').strip()
+                                )
+
+    temperatura_nucleos = tuple(temperatura_nucleos)
+
+    return (
+        temperatura_nucleos,
+        round(sum(temperatura_nucleos) / len(temperatura_nucleos), 2),
+        paquete_cpu
+    )
+
+def medir(funcion):
+    '''
+    Devuelve la latencia media en milisegundos y los bytes asignados por
+    consulta (medidos con tracemalloc en una segunda pasada, para que el
+    trazado no afecte a la latencia).
+    '''
+    funcion()
+
+    inicio = time.perf_counter()
+    for _ in range(ITERACIONES):
+        funcion()
+    latencia = (time.perf_counter() - inicio) / ITERACIONES * 1000
+
+    tracemalloc.start()
+    for _ in range(ITERACIONES):
+        funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    instantanea = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    asignado = sum(
+        estadistica.size for estadistica in instantanea.statistics('filename')
+    )
+
+    return latencia, pico, asignado
+
+def main():
+    print(
+        f'{"fixture":<12}{"cliente":<26}{"ms/consulta":>12}'
+        f'{"pico KiB":>10}{"retenido KiB":>14}'
+    )
+
+    for fixture, modelo in CASOS:
+        servidor = servidor_lhm.iniciar_servidor(RUTA_FIXTURES / fixture)
+        url = f'http://127.0.0.1:{servidor.server_address[1]}/data.json'
+
+        cliente = lhm.ClienteLibreHardwareMonitor(url)
+        assert cliente.obtener_temperatura_cpu(modelo) == leer_legado(
+            url, modelo
+        )
+
+        casos = (
+            ('legado', lambda: leer_legado(url, modelo)),
+            ('persistente+rutas', lambda: cliente.obtener_temperatura_cpu(modelo)),
+        )
+
+        for nombre, funcion in casos:
+            latencia, pico, retenido = medir(funcion)
+            print(
+                f'{fixture:<12}{nombre:<26}{latencia:>12.3f}'
+                f'{pico / 1024:>10.1f}{retenido / 1024:>14.1f}'
+            )
+
+        print(f'{"":<12}redescubrimientos: {cliente.redescubrimientos}')
+
+        cliente.cerrar()
+        servidor.shutdown()
+        servidor.server_close()
+
+if __name__ == '__main__':
+    main()
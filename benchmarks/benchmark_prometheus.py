@@ -0,0 +1,157 @@
+'''
+Benchmark del exportador de Prometheus con un cliente HTTP local: el costo
+de renderizar el cuerpo una vez por instantánea, la latencia de una consulta
+con conexión persistente y el rendimiento con varios scrapers concurrentes.
+La instantánea es sintética (32 núcleos y 8 discos con los registros SMART
+de los fixtures). Se ejecuta desde la raíz del proyecto:
+
+    python -m benchmarks.benchmark_prometheus
+'''
+import http.client
+import threading
+import time
+
+from pathlib import Path
+
+import metrics.cpu as cpu
+import metrics.smart as smart
+import utils.exportador_prometheus as exportador_prometheus
+import utils.recoleccion as recoleccion
+
+RUTA_FIXTURES = Path(__file__).parent / 'fixtures' / 'smartctl'
+
+NUCLEOS = 32
+DISCOS = 8
+PARTICIONES_POR_DISCO = 3
+
+ITERACIONES = 2000
+SCRAPERS = (1, 4, 16)
+DURACION = 2.0
+
+def crear_instantanea():
+    '''Devuelve una instantánea sintética con todas las métricas.'''
+    parser = smart.ParserSmart()
+    registros = [
+        parser.parsear((RUTA_FIXTURES / nombre).read_text(encoding='utf-8'))
+        for nombre in ('nvme.json', 'ata.json')
+    ]
+
+    desglose = cpu.DesgloseCpu(12.5, 3.25, 0.5, 0.0)
+    metricas_cpu = recoleccion.MetricasCpu(
+        'AMD Ryzen 9 7950X', NUCLEOS // 2, NUCLEOS,
+        (tuple(float(nucleo) for nucleo in range(NUCLEOS)), 16.25),
+        ((desglose,) * NUCLEOS, desglose),
+        (tuple(40.0 + nucleo for nucleo in range(2)), 41.5, 55.0)
+    )
+
+    discos = tuple(
+        recoleccion.MetricasDisco(
+            f'/dev/disco{indice}', f'Modelo {indice}', 'ok',
+            registros[indice % 2].horas_encendido,
+            registros[indice % 2].temperatura,
+            (
+                registros[indice % 2].unidades_leidas,
+                registros[indice % 2].unidades_escritas
+            ),
+            registros[indice % 2],
+            tuple(
+                recoleccion.MetricasParticion(
+                    f'/mnt/disco{indice}/p{particion}', 'ext4',
+                    (1 << 40, 1 << 39, 1 << 39, 50.0)
+                )
+                for particion in range(PARTICIONES_POR_DISCO)
+            )
+        )
+        for indice in range(DISCOS)
+    )
+
+    return recoleccion.Instantanea(
+        1, time.monotonic(), metricas_cpu, discos, ()
+    )
+
+def consultar(conexion, cabeceras):
+    '''Hace una consulta a /metrics y devuelve la cantidad de bytes leídos.'''
+    conexion.request('GET', '/metrics', headers=cabeceras)
+    respuesta = conexion.getresponse()
+    cuerpo = respuesta.read()
+    assert respuesta.status == 200
+
+    return len(cuerpo)
+
+def medir_concurrencia(puerto, scrapers, cabeceras):
+    '''Devuelve las consultas por segundo con 'scrapers' clientes.'''
+    detener = threading.Event()
+    contadores = [0] * scrapers
+
+    def scraper(indice):
+        conexion = http.client.HTTPConnection('127.0.0.1', puerto)
+        while not detener.is_set():
+            consultar(conexion, cabeceras)
+            contadores[indice] += 1
+        conexion.close()
+
+    hilos = [
+        threading.Thread(target=scraper, args=(indice,))
+        for indice in range(scrapers)
+    ]
+    for hilo in hilos:
+        hilo.start()
+
+    time.sleep(DURACION)
+    detener.set()
+
+    for hilo in hilos:
+        hilo.join()
+
+    return sum(contadores) / DURACION
+
+def main():
+    instantanea = crear_instantanea()
+
+    inicio = time.perf_counter()
+    for _ in range(200):
+        cuerpo = exportador_prometheus.renderizar_openmetrics(instantanea)
+    renderizado = (time.perf_counter() - inicio) / 200 * 1000
+
+    exportador = exportador_prometheus.ExportadorPrometheus(puerto=0)
+    exportador.actualizar(instantanea)
+    exportador.iniciar()
+
+    print(
+        f'cuerpo: {len(cuerpo)} bytes '
+        f'({len(exportador.obtener_cuerpo()[1])} con gzip), '
+        f'renderizado por instantánea: {renderizado:.3f} ms'
+    )
+    print(f'{"codificación":<14}{"ms/consulta":>12}' + ''.join(
+        f'{f"{scrapers} scrapers/s":>16}' for scrapers in SCRAPERS
+    ))
+
+    for codificacion, cabeceras in (
+        ('identidad', {}), ('gzip', {'Accept-Encoding': 'gzip'})
+    ):
+        conexion = http.client.HTTPConnection('127.0.0.1', exportador.puerto)
+        consultar(conexion, cabeceras)
+
+        inicio = time.perf_counter()
+        for _ in range(ITERACIONES):
+            consultar(conexion, cabeceras)
+        latencia = (time.perf_counter() - inicio) / ITERACIONES * 1000
+        conexion.close()
+
+        rendimientos = [
+            medir_concurrencia(exportador.puerto, scrapers, cabeceras)
+            for scrapers in SCRAPERS
+        ]
+
+        print(f'{codificacion:<14}{latencia:>12.3f}' + ''.join(
+            f'{rendimiento:>16.0f}' for rendimiento in rendimientos
+        ))
+
+    # * Las consultas nunca renderizan: sólo se renderizó la instantánea
+    # * inicial.
+    print(f'renderizados durante las consultas: {exportador.renderizados - 1}')
+
+    exportador.detener()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+'''
+Benchmark del exportador push contra el receptor local. Se publican
+instantáneas sintéticas en tres fases: con el receptor disponible, con el
+receptor caído (los lotes van al spool) y otra vez disponible (el spool se
+reenvía en orden). Reporta el rendimiento, el tamaño de los lotes, la
+compresión y la profundidad del spool. Se ejecuta desde la raíz del
+proyecto:
+
+    python -m benchmarks.benchmark_push
+'''
+import tempfile
+import time
+
+import benchmarks.benchmark_prometheus as benchmark_prometheus
+import benchmarks.receptor_push as receptor_push
+import config
+import utils.exportador_push as exportador_push
+
+INSTANTANEAS_POR_FASE = 2000
+
+def publicar(exportador, instantanea, desde, cantidad):
+    '''Publica 'cantidad' instantáneas con secuencias consecutivas.'''
+    for secuencia in range(desde, desde + cantidad):
+        exportador.actualizar(instantanea._replace(secuencia=secuencia))
+
+def esperar(condicion, limite=30.0):
+    '''Espera hasta que se cumpla la condición o pase el límite.'''
+    inicio = time.monotonic()
+    while not condicion() and time.monotonic() - inicio < limite:
+        time.sleep(0.01)
+
+def mostrar(fase, exportador, receptor, segundos):
+    estadisticas = exportador.obtener_estadisticas()
+    comprimidos = estadisticas.bytes_enviados + estadisticas.bytes_en_spool
+    compresion = (
+        estadisticas.bytes_sin_comprimir / comprimidos if comprimidos else 0.0
+    )
+
+    print(
+        f'{fase:<14}{len(receptor.secuencias):>10}'
+        f'{INSTANTANEAS_POR_FASE / segundos:>14.0f}'
+        f'{estadisticas.promedio_lote:>10.1f}{compresion:>12.1f}x'
+        f'{estadisticas.lotes_en_spool:>8}'
+        f'{estadisticas.bytes_en_spool / 1024:>10.1f}{estadisticas.fallos:>8}'
+    )
+
+def main():
+    instantanea = benchmark_prometheus.crear_instantanea()
+    receptor = receptor_push.iniciar_receptor()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        configuracion = config.Push(
+            habilitado=True,
+            url=f'http://127.0.0.1:{receptor.server_address[1]}/ingesta',
+            maximo_instantaneas=50, maximo_bytes_lote=1048576,
+            intervalo=0.05, timeout=5, directorio_spool=directorio,
+            maximo_spool_bytes=64 * 1048576, backoff_inicial=0.05,
+            backoff_maximo=0.4
+        )
+
+        exportador = exportador_push.ExportadorPush(configuracion)
+        exportador.iniciar()
+
+        print(
+            f'{"fase":<14}{"recibidas":>10}{"fase inst/s":>14}{"lote":>10}'
+            f'{"compresión":>13}{"spool":>8}{"spool KiB":>10}{"fallos":>8}'
+        )
+
+        inicio = time.perf_counter()
+        publicar(exportador, instantanea, 1, INSTANTANEAS_POR_FASE)
+        esperar(lambda: len(receptor.secuencias) == INSTANTANEAS_POR_FASE)
+        mostrar(
+            'disponible', exportador, receptor, time.perf_counter() - inicio
+        )
+
+        receptor.disponible = False
+        inicio = time.perf_counter()
+        publicar(
+            exportador, instantanea, INSTANTANEAS_POR_FASE + 1,
+            INSTANTANEAS_POR_FASE
+        )
+        esperar(lambda: exportador.obtener_estadisticas().lotes_en_spool >= (
+            INSTANTANEAS_POR_FASE // configuracion.maximo_instantaneas
+        ))
+        mostrar('caído', exportador, receptor, time.perf_counter() - inicio)
+
+        receptor.disponible = True
+        inicio = time.perf_counter()
+        publicar(
+            exportador, instantanea, 2 * INSTANTANEAS_POR_FASE + 1,
+            INSTANTANEAS_POR_FASE
+        )
+        esperar(
+            lambda: len(receptor.secuencias) == 3 * INSTANTANEAS_POR_FASE
+        )
+        mostrar(
+            'recuperado', exportador, receptor, time.perf_counter() - inicio
+        )
+
+        exportador.detener()
+
+    print(f'en orden y sin pérdidas: {receptor_push.en_orden(receptor)}')
+
+    receptor.shutdown()
+    receptor.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+Benchmark del motor de reglas de alerta con muchas métricas: una CPU con
+256 núcleos (uso y temperatura por núcleo) y 64 particiones, evaluadas con
+las reglas de config.json y con reglas adicionales por núcleo. Reporta la
+cantidad de pares de regla y métrica y el tiempo por lote de muestras. Se
+ejecuta desde la raíz del proyecto:
+
+    python -m benchmarks.benchmark_reglas
+'''
+import json
+import random
+import time
+
+import config
+import utils.alertas as alertas
+
+NUCLEOS = 256
+PARTICIONES = 64
+LOTES = 500
+
+def crear_muestras(generador):
+    '''Devuelve un lote de muestras sintéticas como las del historial.'''
+    muestras = [('cpu.uso', generador.uniform(0, 100))]
+    muestras.extend(
+        (f'cpu.nucleo.{nucleo}.uso', generador.uniform(0, 100))
+        for nucleo in range(NUCLEOS)
+    )
+    muestras.append(('cpu.temperatura_paquete', generador.uniform(30, 90)))
+    muestras.extend(
+        (f'cpu.nucleo.{nucleo}.temperatura', generador.uniform(30, 90))
+        for nucleo in range(NUCLEOS)
+    )
+
+    for particion in range(PARTICIONES):
+        muestras.append(
+            (f'particion./mnt/p{particion}.uso', generador.uniform(0, 100))
+        )
+        muestras.append((
+            f'particion./mnt/p{particion}.libre',
+            generador.uniform(0, 1 << 32)
+        ))
+
+    return tuple(muestras)
+
+def main():
+    with open('config.json', encoding='utf-8') as archivo:
+        parametros = json.load(archivo)
+
+    parametros['umbrales'].setdefault('reglas', []).extend((
+        {
+            'metrica': 'cpu.nucleo.*.uso', 'umbral': 95, 'durante': 30,
+            'liberar': 80, 'enfriamiento': 300
+        },
+        {
+            'metrica': 'cpu.nucleo.*.temperatura', 'umbral': 85,
+            'durante': 10, 'liberar': 80
+        },
+        {
+            'metrica': 'particion.*.uso', 'umbral': 90, 'durante': 60,
+            'liberar': 85
+        },
+    ))
+
+    reglas = config.compilar_configuracion(parametros).umbrales.reglas
+    generador = random.Random(0)
+    lotes = [crear_muestras(generador) for _ in range(LOTES)]
+
+    motor = alertas.MotorReglas()
+
+    inicio = time.perf_counter()
+    motor.evaluar(reglas, 0.0, lotes[0])
+    primera = (time.perf_counter() - inicio) * 1000
+
+    disparadas = 0
+    inicio = time.perf_counter()
+    for indice, muestras in enumerate(lotes):
+        disparadas += len(motor.evaluar(reglas, indice * 5.0, muestras))
+    por_lote = (time.perf_counter() - inicio) / LOTES * 1000
+
+    print(
+        f'reglas: {len(reglas)}, muestras por lote: {len(lotes[0])}, '
+        f'pares regla/métrica: {motor.pares}'
+    )
+    print(f'primer lote (resuelve las reglas): {primera:.3f} ms')
+    print(f'por lote: {por_lote:.3f} ms, alertas disparadas: {disparadas}')
+
+if __name__ == '__main__':
+    main()
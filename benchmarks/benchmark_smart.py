@@ -0,0 +1,101 @@
+'''
+Benchmark del costo por disco de interpretar la salida de smartctl.
+
+Compara el parser de una sola pasada (JSON y texto) con el recorrido
+anterior, que escaneaba la salida de texto una vez por atributo, y la
+decodificación parcial de la salida JSON (sólo los atributos ATA que se
+guardan) con la decodificación completa. Se ejecuta
+desde la raíz del proyecto:
+
+    python -m benchmarks.benchmark_smart
+'''
+import json
+import timeit
+
+from pathlib import Path
+
+import metrics.smart as smart
+
+RUTA_FIXTURES = Path(__file__).parent / 'fixtures' / 'smartctl'
+
+REPETICIONES = 5
+ITERACIONES = 2000
+
+def parsear_legado(salida):
+    '''
+    Reproduce el recorrido anterior: una pasada completa por la salida para
+    las horas de encendido, otra para los datos leídos/escritos y otra para
+    la temperatura.
+    '''
+    horas_encendido = -1
+    for linea in salida.splitlines():
+        if 'Power On Hours' in linea:
+            for cadena in linea.split():
+                if cadena.replace(',', '').isdigit():
+                    horas_encendido = int(cadena.replace(',', ''))
+                    break
+            break
+
+    datos_leidos = None
+    datos_escritos = None
+    for linea in salida.splitlines():
+        if 'Data Units Read' in linea:
+            for cadena in linea.split():
+                if cadena.replace(',', '').isdigit():
+                    datos_leidos = int(cadena.replace(',', ''))
+                    break
+        elif 'Data Units Written' in linea:
+            for cadena in linea.split():
+                if cadena.replace(',', '').isdigit():
+                    datos_escritos = int(cadena.replace(',', ''))
+                    break
+
+    temperatura = -1
+    for linea in salida.splitlines():
+        if 'Temperature' in linea:
+            for cadena in linea.split():
+                if cadena.isdigit():
+                    temperatura = int(cadena)
+                    break
+            break
+
+    return horas_encendido, (datos_leidos, datos_escritos), temperatura
+
+def medir(funcion, argumento):
+    '''Devuelve el mejor tiempo por llamada en microsegundos.'''
+    tiempos = timeit.repeat(
+        lambda: funcion(argumento), repeat=REPETICIONES, number=ITERACIONES
+    )
+
+    return min(tiempos) / ITERACIONES * 1e6
+
+def main():
+    parser = smart.ParserSmart()
+
+    print(f'{"fixture":<12}{"parser":<28}{"µs/disco":>10}')
+
+    for ruta in sorted(RUTA_FIXTURES.iterdir()):
+        salida = ruta.read_text(encoding='utf-8')
+
+        if ruta.suffix == '.json':
+            casos = (
+                ('json (decodificar+parsear)', parser.parsear, salida),
+                (
+                    'json (json.loads+parsear)',
+                    lambda salida: parser.parsear_json(json.loads(salida)),
+                    salida
+                ),
+                ('json (sólo parsear)', parser.parsear_json, json.loads(salida)),
+            )
+        else:
+            casos = (
+                ('texto (una pasada)', parser.parsear_texto, salida),
+                ('texto (legado, 3 pasadas)', parsear_legado, salida),
+            )
+
+        for nombre, funcion, argumento in casos:
+            tiempo = medir(funcion, argumento)
+            print(f'{ruta.name:<12}{nombre:<28}{tiempo:>10.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+'''
+Benchmark de la temperatura de los discos desde hwmon, con el árbol de
+sysfs de prueba (un NVMe y un SATA con drivetemp, y un SATA sin sensor que
+queda para smartctl), comparada con sólo interpretar la salida JSON de
+smartctl de cada disco, sin contar la ejecución de smartctl. En el árbol de
+prueba, los ':' de los nombres de sysfs se reemplazaron por '_'. Se ejecuta
+desde la raíz del proyecto:
+
+    python -m benchmarks.benchmark_temperatura_discos
+'''
+import timeit
+
+from pathlib import Path
+
+import metrics.hwmon as hwmon
+import metrics.smart as smart
+
+RUTA_FIXTURES = Path(__file__).parent / 'fixtures'
+DISCOS = ('nvme0n1', 'sda', 'sdb')
+
+REPETICIONES = 5
+ITERACIONES = 5000
+
+def medir(funcion):
+    '''Devuelve el mejor tiempo por llamada en microsegundos.'''
+    tiempos = timeit.repeat(
+        funcion, repeat=REPETICIONES, number=ITERACIONES
+    )
+
+    return min(tiempos) / ITERACIONES * 1e6
+
+def main():
+    temperatura_discos = hwmon.TemperaturaDiscosHwmon(
+        str(RUTA_FIXTURES / 'sysfs')
+    )
+    temperaturas = temperatura_discos.leer(DISCOS)
+
+    print(f'temperaturas desde hwmon: {temperaturas}')
+    print(
+        'discos para smartctl: '
+        f'{sorted(set(DISCOS) - set(temperaturas))}'
+    )
+
+    parser = smart.ParserSmart()
+    salidas = [
+        (RUTA_FIXTURES / 'smartctl' / nombre).read_text(encoding='utf-8')
+        for nombre in ('nvme.json', 'ata.json')
+    ]
+
+    hwmon_por_lectura = medir(lambda: temperatura_discos.leer(DISCOS))
+    smartctl_por_lectura = medir(
+        lambda: [parser.parsear(salida) for salida in salidas]
+    )
+
+    print(
+        f'hwmon, {len(temperaturas)} discos: {hwmon_por_lectura:.2f} µs '
+        'por lectura'
+    )
+    print(
+        f'smartctl, {len(salidas)} discos (sólo interpretar): '
+        f'{smartctl_por_lectura:.2f} µs por lectura'
+    )
+
+if __name__ == '__main__':
+    main()
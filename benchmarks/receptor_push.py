@@ -0,0 +1,88 @@
+'''
+Receptor HTTP local que reemplaza al endpoint del exportador push. Recibe
+los lotes comprimidos, cuenta las instantáneas y verifica que lleguen en
+orden. Se puede marcar como no disponible para simular una caída.
+
+    python -m benchmarks.receptor_push 9109
+'''
+import gzip
+import json
+import socket
+import sys
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _ManejadorPush(BaseHTTPRequestHandler):
+    '''Recibe los lotes en /ingesta.'''
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        servidor = self.server
+
+        if self.path != '/ingesta' or not servidor.disponible:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.headers.get('Content-Encoding') == 'gzip':
+            cuerpo = gzip.decompress(cuerpo)
+
+        secuencias = [
+            json.loads(linea)['secuencia'] for linea in cuerpo.splitlines()
+        ]
+
+        with servidor.candado:
+            servidor.lotes.append(len(secuencias))
+            servidor.secuencias.extend(secuencias)
+
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+def iniciar_receptor(puerto=0):
+    '''
+    Inicia el receptor en un hilo en segundo plano y lo devuelve. Con el
+    puerto 0 se elige un puerto libre, disponible en server_address.
+    '''
+    receptor = ThreadingHTTPServer(('127.0.0.1', puerto), _ManejadorPush)
+    receptor.daemon_threads = True
+    receptor.disponible = True
+    receptor.candado = threading.Lock()
+    receptor.lotes = []
+    receptor.secuencias = []
+
+    hilo = threading.Thread(target=receptor.serve_forever, daemon=True)
+    hilo.start()
+
+    return receptor
+
+def en_orden(receptor):
+    '''Devuelve True si las instantáneas recibidas están en orden.'''
+    with receptor.candado:
+        secuencias = list(receptor.secuencias)
+
+    return all(
+        anterior < siguiente
+        for anterior, siguiente in zip(secuencias, secuencias[1:])
+    )
+
+if __name__ == '__main__':
+    receptor = iniciar_receptor(int(sys.argv[1]))
+    print(f'Recibiendo en http://127.0.0.1:{sys.argv[1]}/ingesta')
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f'{len(receptor.secuencias)} instantáneas recibidas')
+        receptor.shutdown()
@@ -0,0 +1,69 @@
+'''
+Servidor HTTP local que reemplaza al Web Server de Libre Hardware Monitor,
+sirviendo un data.json grabado. Permite probar y medir el cliente en Linux.
+
+    python -m benchmarks.servidor_lhm benchmarks/fixtures/lhm/intel.json 8085
+'''
+import socket
+import sys
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+class _ManejadorLhm(BaseHTTPRequestHandler):
+    '''Responde /data.json con el contenido del fixture.'''
+
+    # * HTTP/1.1 para que el cliente pueda mantener la conexión abierta,
+    # * igual que el Web Server real.
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+
+        # * Sin TCP_NODELAY, el cuerpo enviado después de las cabeceras queda
+        # * esperando el ACK retrasado del cliente en conexiones persistentes.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        if self.path != '/data.json':
+            self.send_error(404)
+            return
+
+        cuerpo = self.server.cuerpo
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+def iniciar_servidor(ruta_fixture, puerto=0):
+    '''
+    Inicia el servidor en un hilo en segundo plano y lo devuelve. Con el
+    puerto 0 se elige un puerto libre, disponible en server_address.
+    '''
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), _ManejadorLhm)
+    servidor.daemon_threads = True
+    servidor.cuerpo = Path(ruta_fixture).read_bytes()
+
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+
+    return servidor
+
+def cambiar_fixture(servidor, ruta_fixture):
+    '''Cambia el data.json servido, por ejemplo para simular otro hardware.'''
+    servidor.cuerpo = Path(ruta_fixture).read_bytes()
+
+if __name__ == '__main__':
+    servidor = iniciar_servidor(sys.argv[1], int(sys.argv[2]))
+    print(f'Sirviendo {sys.argv[1]} en http://127.0.0.1:{sys.argv[2]}/data.json')
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -1,34 +1,742 @@
+import ctypes
+import ctypes.util
 import json
+import os
+import struct
+import sys
+import threading
 
+from collections import namedtuple
 from pathlib import Path
 from datetime import datetime
+from types import MappingProxyType
 
-class Config:
-    '''Clase para gestionar la configuración de Monitor Agent.'''
+# * Configuración ya validada y compilada. Todos los objetos son namedtuples
+# * (o mappings de sólo lectura), por lo que los recolectores pueden usarlos
+# * desde cualquier hilo sin copiarlos.
+Metricas = namedtuple('Metricas', ['cpu', 'storage', 'io'])
 
-    def __init__(self):
-        self.parametros = self.__cargar_configuracion()
+# * Regla de alerta compilada. 'metrica' es un nombre de métrica del
+# * historial que puede incluir comodines '*' (por ejemplo,
+# * 'cpu.nucleo.*.uso'); 'tipo' indica si se evalúa el valor o su tasa de
+# * cambio por segundo, y 'condicion' si se alerta por encima ('mayor') o
+# * por debajo ('menor') del umbral.
+Regla = namedtuple(
+    'Regla',
+    [
+        'metrica', 'tipo', 'condicion', 'umbral', 'durante', 'liberar',
+        'enfriamiento', 'mensaje'
+    ]
+)
 
-    def __cargar_configuracion(self):
-        '''Carga la configuración desde el archivo JSON.'''
-        ruta_configuracion = Path('config.json')
+Umbrales = namedtuple('Umbrales', ['reglas'])
 
-        if ruta_configuracion.exists():
+Recoleccion = namedtuple(
+    'Recoleccion', ['trabajadores', 'politica_solapamiento']
+)
+
+Smart = namedtuple('Smart', ['timeout', 'paralelismo', 'ttl', 'ayudante'])
+
+# * Tiempo límite máximo de smartctl, en segundos, que acepta el ayudante
+# * SMART (utils.ayudante_smart). Está aquí y no en utils.smartmontools para
+# * que la configuración no dependa de los recolectores, y para que no haya
+# * valores configurados que el ayudante rechace.
+TIMEOUT_MAXIMO = 60
+
+Io = namedtuple('Io', ['intervalo'])
+
+Procesos = namedtuple(
+    'Procesos', ['habilitado', 'trabajadores', 'timeout', 'espera_reinicio']
+)
+
+Fuentes = namedtuple(
+    'Fuentes', ['fallos_para_abrir', 'backoff_inicial', 'backoff_maximo']
+)
+
+NivelHistorial = namedtuple('NivelHistorial', ['resolucion', 'capacidad'])
+
+Persistencia = namedtuple(
+    'Persistencia',
+    [
+        'habilitada', 'directorio', 'muestras_por_segmento',
+        'rotacion_segundos', 'escritura_segundos', 'fsync_segundos',
+        'retencion_cruda'
+    ]
+)
+
+# * 'olvido_segundos' es el tiempo sin muestras tras el cual se descarta la
+# * serie de una métrica (por ejemplo, de un disco retirado).
+Historial = namedtuple(
+    'Historial', ['capacidad', 'niveles', 'olvido_segundos', 'persistencia']
+)
+
+Prometheus = namedtuple('Prometheus', ['habilitado', 'direccion', 'puerto'])
+
+Push = namedtuple(
+    'Push',
+    [
+        'habilitado', 'url', 'maximo_instantaneas', 'maximo_bytes_lote',
+        'intervalo', 'timeout', 'directorio_spool', 'maximo_spool_bytes',
+        'backoff_inicial', 'backoff_maximo'
+    ]
+)
+
+Exportadores = namedtuple('Exportadores', ['prometheus', 'push'])
+
+Alertas = namedtuple(
+    'Alertas',
+    [
+        'capacidad', 'ventana_coalescencia', 'archivo',
+        'maximo_bytes_archivo', 'archivos_respaldo'
+    ]
+)
+
+Gui = namedtuple('Gui', ['cuadros_por_segundo', 'lineas_alertas'])
+
+ConfiguracionCompilada = namedtuple(
+    'ConfiguracionCompilada',
+    [
+        'intervalo', 'recoleccion', 'io', 'procesos', 'smart', 'fuentes',
+        'historial', 'exportadores',
+        'alertas', 'gui', 'metricas', 'umbrales'
+    ]
+)
+
+class ErrorConfiguracion(ValueError):
+    '''Error de formato o de validación del archivo de configuración.'''
+
+def _obtener(datos, clave, tipos, ruta, defecto=None, minimo=None,
+             opciones=None, maximo=None):
+    '''
+    Devuelve el valor de una clave validando su tipo, sus valores mínimo y
+    máximo y sus opciones. Si la clave no existe y no tiene valor por defecto, es
+    obligatoria.
+    '''
+    ruta_clave = f'{ruta}.{clave}' if ruta else clave
+
+    if clave not in datos:
+        if defecto is None:
+            raise ErrorConfiguracion(f'Falta el parámetro "{ruta_clave}"')
+
+        return defecto
+
+    valor = datos[clave]
+
+    # * bool es subclase de int, por lo que se rechaza explícitamente cuando
+    # * se espera un número.
+    if not isinstance(valor, tipos) or (
+        isinstance(valor, bool) and bool not in tipos
+    ):
+        nombres = ', '.join(tipo.__name__ for tipo in tipos)
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta_clave}" debe ser de tipo {nombres}'
+        )
+
+    if minimo is not None and valor < minimo:
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta_clave}" debe ser mayor o igual a {minimo}'
+        )
+
+    if maximo is not None and valor > maximo:
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta_clave}" debe ser menor o igual a {maximo}'
+        )
+
+    if opciones is not None and valor not in opciones:
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta_clave}" debe ser uno de: '
+            f'{", ".join(opciones)}'
+        )
+
+    return valor
+
+def _seccion(datos, clave, ruta, opcional=False):
+    '''Devuelve una sección (objeto JSON) de la configuración.'''
+    if opcional and clave not in datos:
+        return {}
+
+    return _obtener(datos, clave, (dict,), ruta)
+
+NUMERO = (int, float)
+
+# * Niveles de resumen por defecto: cubetas de un minuto durante un día y de
+# * una hora durante 30 días.
+NIVELES_HISTORIAL = (
+    NivelHistorial(resolucion=60, capacidad=1440),
+    NivelHistorial(resolucion=3600, capacidad=720),
+)
+
+def _compilar_niveles(historial):
+    '''
+    Valida los niveles de resumen del historial, cuyas resoluciones deben ser
+    crecientes, y los devuelve en un tuple de NivelHistorial.
+    '''
+    if 'niveles' not in historial:
+        return NIVELES_HISTORIAL
+
+    niveles = []
+
+    for indice, nivel in enumerate(
+        _obtener(historial, 'niveles', (list,), 'historial')
+    ):
+        ruta = f'historial.niveles[{indice}]'
+
+        if not isinstance(nivel, dict):
+            raise ErrorConfiguracion(
+                f'El parámetro "{ruta}" debe ser de tipo dict'
+            )
+
+        niveles.append(NivelHistorial(
+            resolucion=_obtener(nivel, 'resolucion', (int,), ruta, minimo=1),
+            capacidad=_obtener(nivel, 'capacidad', (int,), ruta, minimo=1),
+        ))
+
+        if len(niveles) > 1 and (
+            niveles[-1].resolucion <= niveles[-2].resolucion
+        ):
+            raise ErrorConfiguracion(
+                f'El parámetro "{ruta}.resolucion" debe ser mayor a la del '
+                'nivel anterior'
+            )
+
+    return tuple(niveles)
+
+# * Umbrales fijos de config.json y la regla que define cada uno.
+UMBRALES = (
+    (
+        'cpu', 'uso', 'cpu.uso', 'mayor', 'Uso de CPU alto: {valor}%'
+    ),
+    (
+        'cpu', 'temperatura_paquete', 'cpu.temperatura_paquete', 'mayor',
+        'Temperatura de CPU alta: {valor}°C'
+    ),
+    (
+        'storage', 'temperatura', 'disco.*.temperatura', 'mayor',
+        'Temperatura de disco {comodin}: {valor} °C'
+    ),
+    (
+        'storage', 'espacio_libre', 'particion.*.libre', 'menor',
+        'Espacio libre bajo en {comodin}: {valor} bytes'
+    ),
+)
+
+def _compilar_regla(datos, ruta, metrica=None, condicion=None,
+                    mensaje=None):
+    '''
+    Valida una regla de alerta. Un número es un umbral simple; un objeto
+    puede definir además cuántos segundos debe cumplirse la condición
+    ('durante'), el umbral de liberación ('liberar', para la histéresis) y
+    los segundos mínimos entre dos disparos ('enfriamiento').
+    '''
+    if isinstance(datos, NUMERO) and not isinstance(datos, bool):
+        datos = {'umbral': datos}
+
+    if not isinstance(datos, dict):
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta}" debe ser de tipo int, float o dict'
+        )
+
+    if metrica is None:
+        metrica = _obtener(datos, 'metrica', (str,), ruta)
+        condicion = _obtener(
+            datos, 'condicion', (str,), ruta, defecto='mayor',
+            opciones=('mayor', 'menor')
+        )
+        mensaje = _obtener(
+            datos, 'mensaje', (str,), ruta, defecto='{metrica}: {valor}'
+        )
+
+    umbral = _obtener(datos, 'umbral', NUMERO, ruta)
+    liberar = _obtener(datos, 'liberar', NUMERO, ruta, defecto=umbral)
+
+    if (liberar > umbral) if condicion == 'mayor' else (liberar < umbral):
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta}.liberar" debe ser '
+            f'{"menor" if condicion == "mayor" else "mayor"} o igual al '
+            'umbral'
+        )
+
+    try:
+        mensaje.format(metrica='', comodin='', valor=0.0)
+    except (KeyError, IndexError, ValueError) as error:
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta}.mensaje" no es un formato válido: {error}'
+        )
+
+    return Regla(
+        metrica=metrica,
+        tipo=_obtener(
+            datos, 'tipo', (str,), ruta, defecto='valor',
+            opciones=('valor', 'tasa')
+        ),
+        condicion=condicion,
+        umbral=umbral,
+        durante=_obtener(datos, 'durante', NUMERO, ruta, defecto=0, minimo=0),
+        liberar=liberar,
+        enfriamiento=_obtener(
+            datos, 'enfriamiento', NUMERO, ruta, defecto=0, minimo=0
+        ),
+        mensaje=mensaje,
+    )
+
+def _compilar_umbrales(umbrales):
+    '''
+    Compila los umbrales fijos de la CPU y del almacenamiento, y las reglas
+    adicionales de 'umbrales.reglas', en un tuple de Regla.
+    '''
+    reglas = []
+
+    for seccion, clave, metrica, condicion, mensaje in UMBRALES:
+        datos = _seccion(umbrales, seccion, 'umbrales')
+        ruta = f'umbrales.{seccion}.{clave}'
+
+        if clave not in datos:
+            raise ErrorConfiguracion(f'Falta el parámetro "{ruta}"')
+
+        reglas.append(_compilar_regla(
+            datos[clave], ruta, metrica, condicion, mensaje
+        ))
+
+    for indice, datos in enumerate(
+        _obtener(umbrales, 'reglas', (list,), 'umbrales', defecto=[])
+    ):
+        reglas.append(_compilar_regla(datos, f'umbrales.reglas[{indice}]'))
+
+    return tuple(reglas)
+
+def _compilar_persistencia(persistencia):
+    '''Valida la sección de persistencia del historial en disco.'''
+    ruta = 'historial.persistencia'
+
+    return Persistencia(
+        habilitada=_obtener(
+            persistencia, 'habilitada', (bool,), ruta, defecto=False
+        ),
+        directorio=_obtener(
+            persistencia, 'directorio', (str,), ruta, defecto='historial'
+        ),
+        muestras_por_segmento=_obtener(
+            persistencia, 'muestras_por_segmento', (int,), ruta,
+            defecto=4096, minimo=1
+        ),
+        rotacion_segundos=_obtener(
+            persistencia, 'rotacion_segundos', (int,), ruta, defecto=3600,
+            minimo=1
+        ),
+        escritura_segundos=_obtener(
+            persistencia, 'escritura_segundos', NUMERO, ruta, defecto=60,
+            minimo=0
+        ),
+        fsync_segundos=_obtener(
+            persistencia, 'fsync_segundos', NUMERO, ruta, defecto=300,
+            minimo=0
+        ),
+        retencion_cruda=_obtener(
+            persistencia, 'retencion_cruda', NUMERO, ruta, defecto=86400,
+            minimo=0
+        ),
+    )
+
+def _compilar_fuentes(fuentes):
+    '''Valida la sección de los interruptores de las fuentes de métricas.'''
+    backoff_inicial = _obtener(
+        fuentes, 'backoff_inicial', NUMERO, 'fuentes', defecto=5,
+        minimo=0.001
+    )
+
+    return Fuentes(
+        fallos_para_abrir=_obtener(
+            fuentes, 'fallos_para_abrir', (int,), 'fuentes', defecto=3,
+            minimo=1
+        ),
+        backoff_inicial=backoff_inicial,
+        backoff_maximo=_obtener(
+            fuentes, 'backoff_maximo', NUMERO, 'fuentes', defecto=300,
+            minimo=backoff_inicial
+        ),
+    )
+
+def _compilar_push(push):
+    '''Valida la sección del exportador push.'''
+    ruta = 'exportadores.push'
+    habilitado = _obtener(push, 'habilitado', (bool,), ruta, defecto=False)
+
+    # * La URL sólo es obligatoria si el exportador está habilitado.
+    url = _obtener(push, 'url', (str,), ruta, defecto='')
+
+    if habilitado and not url.startswith(('http://', 'https://')):
+        raise ErrorConfiguracion(
+            f'El parámetro "{ruta}.url" debe ser una URL http:// o https://'
+        )
+
+    backoff_inicial = _obtener(
+        push, 'backoff_inicial', NUMERO, ruta, defecto=1, minimo=0.001
+    )
+
+    return Push(
+        habilitado=habilitado,
+        url=url,
+        maximo_instantaneas=_obtener(
+            push, 'maximo_instantaneas', (int,), ruta, defecto=50, minimo=1
+        ),
+        maximo_bytes_lote=_obtener(
+            push, 'maximo_bytes_lote', (int,), ruta, defecto=1048576,
+            minimo=1
+        ),
+        intervalo=_obtener(
+            push, 'intervalo', NUMERO, ruta, defecto=30, minimo=0.001
+        ),
+        timeout=_obtener(push, 'timeout', NUMERO, ruta, defecto=5, minimo=0),
+        directorio_spool=_obtener(
+            push, 'directorio_spool', (str,), ruta, defecto='spool'
+        ),
+        maximo_spool_bytes=_obtener(
+            push, 'maximo_spool_bytes', (int,), ruta, defecto=67108864,
+            minimo=1
+        ),
+        backoff_inicial=backoff_inicial,
+        backoff_maximo=_obtener(
+            push, 'backoff_maximo', NUMERO, ruta, defecto=300,
+            minimo=backoff_inicial
+        ),
+    )
+
+def compilar_configuracion(parametros):
+    '''
+    Valida los parámetros leídos de config.json y los devuelve compilados en
+    un ConfiguracionCompilada inmutable. Lanza ErrorConfiguracion si algún
+    parámetro falta o es inválido.
+    '''
+    if not isinstance(parametros, dict):
+        raise ErrorConfiguracion('La configuración debe ser un objeto JSON')
+
+    # * El intervalo se define en milisegundos en config.json, y se compila
+    # * en segundos.
+    intervalo = _obtener(parametros, 'intervalo', (int,), '', minimo=1)
+
+    recoleccion = _seccion(parametros, 'recoleccion', '', opcional=True)
+    io = _seccion(parametros, 'io', '', opcional=True)
+    procesos = _seccion(parametros, 'procesos', '', opcional=True)
+    smart = _seccion(parametros, 'smart', '', opcional=True)
+    ttl = _seccion(smart, 'ttl', 'smart', opcional=True)
+    fuentes = _seccion(parametros, 'fuentes', '', opcional=True)
+    historial = _seccion(parametros, 'historial', '', opcional=True)
+    persistencia = _seccion(
+        historial, 'persistencia', 'historial', opcional=True
+    )
+    exportadores = _seccion(parametros, 'exportadores', '', opcional=True)
+    prometheus = _seccion(
+        exportadores, 'prometheus', 'exportadores', opcional=True
+    )
+    push = _seccion(exportadores, 'push', 'exportadores', opcional=True)
+    alertas = _seccion(parametros, 'alertas', '', opcional=True)
+    gui = _seccion(parametros, 'gui', '', opcional=True)
+    metricas = _seccion(parametros, 'metricas', '')
+    umbrales = _seccion(parametros, 'umbrales', '')
+
+    for clase in ttl:
+        _obtener(ttl, clase, NUMERO, 'smart.ttl', minimo=0)
+
+    return ConfiguracionCompilada(
+        intervalo=intervalo / 1000,
+        recoleccion=Recoleccion(
+            trabajadores=_obtener(
+                recoleccion, 'trabajadores', (int,), 'recoleccion',
+                defecto=2, minimo=1
+            ),
+            politica_solapamiento=_obtener(
+                recoleccion, 'politica_solapamiento', (str,), 'recoleccion',
+                defecto='omitir',
+                opciones=('omitir', 'fusionar', 'encolar_ultimo')
+            ),
+        ),
+        # * El intervalo de la entrada/salida también se define en
+        # * milisegundos, y puede ser menor que el de los demás recolectores.
+        io=Io(
+            intervalo=_obtener(
+                io, 'intervalo', (int,), 'io', defecto=1000, minimo=1
+            ) / 1000,
+        ),
+        procesos=Procesos(
+            habilitado=_obtener(
+                procesos, 'habilitado', (bool,), 'procesos', defecto=False
+            ),
+            trabajadores=_obtener(
+                procesos, 'trabajadores', (int,), 'procesos', defecto=2,
+                minimo=1
+            ),
+            timeout=_obtener(
+                procesos, 'timeout', NUMERO, 'procesos', defecto=30,
+                minimo=0.001
+            ),
+            espera_reinicio=_obtener(
+                procesos, 'espera_reinicio', NUMERO, 'procesos', defecto=1,
+                minimo=0.001
+            ),
+        ),
+        smart=Smart(
+            # * El ayudante SMART rechaza los tiempos límite mayores que
+            # * TIMEOUT_MAXIMO, por lo que se validan al cargar.
+            timeout=_obtener(
+                smart, 'timeout', NUMERO, 'smart', defecto=10,
+                minimo=0.001, maximo=TIMEOUT_MAXIMO
+            ),
+            paralelismo=_obtener(
+                smart, 'paralelismo', (int,), 'smart', defecto=8, minimo=1
+            ),
+            ttl=MappingProxyType(dict(ttl)),
+            ayudante=_obtener(
+                smart, 'ayudante', (str,), 'smart', defecto=''
+            ),
+        ),
+        fuentes=_compilar_fuentes(fuentes),
+        historial=Historial(
+            capacidad=_obtener(
+                historial, 'capacidad', (int,), 'historial', defecto=720,
+                minimo=1
+            ),
+            niveles=_compilar_niveles(historial),
+            olvido_segundos=_obtener(
+                historial, 'olvido_segundos', NUMERO, 'historial',
+                defecto=3600, minimo=1
+            ),
+            persistencia=_compilar_persistencia(persistencia),
+        ),
+        exportadores=Exportadores(
+            prometheus=Prometheus(
+                habilitado=_obtener(
+                    prometheus, 'habilitado', (bool,),
+                    'exportadores.prometheus', defecto=False
+                ),
+                direccion=_obtener(
+                    prometheus, 'direccion', (str,), 'exportadores.prometheus',
+                    defecto='127.0.0.1'
+                ),
+                puerto=_obtener(
+                    prometheus, 'puerto', (int,), 'exportadores.prometheus',
+                    defecto=9108, minimo=0
+                ),
+            ),
+            push=_compilar_push(push),
+        ),
+        alertas=Alertas(
+            capacidad=_obtener(
+                alertas, 'capacidad', (int,), 'alertas', defecto=1000,
+                minimo=1
+            ),
+            ventana_coalescencia=_obtener(
+                alertas, 'ventana_coalescencia', NUMERO, 'alertas',
+                defecto=300, minimo=0
+            ),
+            archivo=_obtener(
+                alertas, 'archivo', (str,), 'alertas',
+                defecto='alertas/alertas.log'
+            ),
+            maximo_bytes_archivo=_obtener(
+                alertas, 'maximo_bytes_archivo', (int,), 'alertas',
+                defecto=1048576, minimo=1
+            ),
+            archivos_respaldo=_obtener(
+                alertas, 'archivos_respaldo', (int,), 'alertas', defecto=5,
+                minimo=0
+            ),
+        ),
+        gui=Gui(
+            cuadros_por_segundo=_obtener(
+                gui, 'cuadros_por_segundo', NUMERO, 'gui', defecto=10,
+                minimo=1
+            ),
+            lineas_alertas=_obtener(
+                gui, 'lineas_alertas', (int,), 'gui', defecto=200, minimo=1
+            ),
+        ),
+        metricas=Metricas(
+            cpu=_obtener(metricas, 'cpu', (bool,), 'metricas'),
+            storage=_obtener(metricas, 'storage', (bool,), 'metricas'),
+            io=_obtener(
+                metricas, 'io', (bool,), 'metricas', defecto=False
+            ),
+        ),
+        umbrales=Umbrales(reglas=_compilar_umbrales(umbrales)),
+    )
+
+class _VigilanteInotify:
+    '''
+    Vigila con inotify el directorio del archivo de configuración, para no
+    tener que consultar su fecha de modificación en cada lectura. Se vigila el
+    directorio porque los editores suelen reemplazar el archivo en lugar de
+    modificarlo.
+    '''
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+
+    ENCABEZADO_EVENTO = struct.Struct('iIII')
+
+    def __init__(self, ruta):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+        self.nombre = os.fsencode(ruta.name)
+        self._descriptor = libc.inotify_init1(self.IN_NONBLOCK)
+
+        if self._descriptor < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+
+        mascara = (
+            self.IN_MODIFY | self.IN_ATTRIB | self.IN_CLOSE_WRITE |
+            self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        )
+
+        if libc.inotify_add_watch(
+            self._descriptor, os.fsencode(ruta.parent.resolve()), mascara
+        ) < 0:
+            os.close(self._descriptor)
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch')
+
+    def hubo_cambios(self):
+        '''
+        Devuelve True si hubo eventos sobre el archivo de configuración
+        desde la última consulta, sin bloquear.
+        '''
+        hubo_cambios = False
+
+        while True:
+            try:
+                datos = os.read(self._descriptor, 4096)
+            except BlockingIOError:
+                return hubo_cambios
+
+            desplazamiento = 0
+
+            while desplazamiento < len(datos):
+                _, _, _, longitud = self.ENCABEZADO_EVENTO.unpack_from(
+                    datos, desplazamiento
+                )
+                desplazamiento += self.ENCABEZADO_EVENTO.size
+
+                nombre = datos[desplazamiento:desplazamiento + longitud]
+                desplazamiento += longitud
+
+                if nombre.rstrip(b'\0') == self.nombre:
+                    hubo_cambios = True
+
+    def cerrar(self):
+        '''Cierra el descriptor de inotify.'''
+        os.close(self._descriptor)
+
+class ServicioConfiguracion:
+    '''
+    Servicio para gestionar la configuración de Monitor Agent. El archivo se
+    lee y valida una sola vez, y sólo se vuelve a cargar cuando cambia (según
+    inotify, o si no está disponible, según su inode, tamaño y fecha de
+    modificación). Una recarga inválida no reemplaza a la configuración
+    vigente.
+    '''
+
+    def __init__(self, ruta='config.json'):
+        self.ruta = Path(ruta)
+
+        self._candado = threading.Lock()
+        self._firma = None
+        self._actual = None
+        self.recargas = 0
+
+        self._vigilante = None
+
+        if sys.platform.startswith('linux'):
             try:
-                contenido = ruta_configuracion.read_text(encoding='utf-8')
-                parametros = json.loads(contenido)
+                self._vigilante = _VigilanteInotify(self.ruta)
+            except (OSError, AttributeError, TypeError):
+                self._vigilante = None
+
+    def _calcular_firma(self):
+        '''Devuelve el inode, el tamaño y la fecha de modificación.'''
+        estado = self.ruta.stat()
+        return (estado.st_ino, estado.st_size, estado.st_mtime_ns)
+
+    def _cargar(self):
+        '''Lee, valida y compila el archivo de configuración.'''
+        if not self.ruta.exists():
+            raise ErrorConfiguracion(
+                f'Archivo de configuración {self.ruta} no encontrado'
+            )
+
+        firma = self._calcular_firma()
+        contenido = self.ruta.read_text(encoding='utf-8')
+
+        try:
+            parametros = json.loads(contenido)
+        except json.JSONDecodeError as error:
+            raise ErrorConfiguracion(
+                f'Error de formato en {self.ruta}: {error}'
+            ) from error
+
+        return firma, compilar_configuracion(parametros)
+
+    def cargar(self):
+        '''
+        Carga la configuración por primera vez. Lanza ErrorConfiguracion si
+        el archivo no existe o es inválido.
+        '''
+        with self._candado:
+            self._firma, self._actual = self._cargar()
+
+        return self._actual
 
-                return parametros
-            except json.JSONDecodeError as error:
+    def actual(self):
+        '''
+        Devuelve la configuración vigente, recargándola antes si el archivo
+        cambió. El reemplazo es atómico: quien ya obtuvo la configuración
+        anterior la sigue usando sin cambios.
+        '''
+        with self._candado:
+            if self._actual is None:
+                raise ErrorConfiguracion('La configuración no fue cargada')
+
+            if self._vigilante is not None:
+                if not self._vigilante.hubo_cambios():
+                    return self._actual
+
+            try:
+                firma = self._calcular_firma()
+            except OSError:
+                return self._actual
+
+            if firma == self._firma:
+                return self._actual
+
+            # * La firma se actualiza aunque la recarga falle, para no
+            # * reportar el mismo error en cada lectura.
+            self._firma = firma
+
+            try:
+                _, self._actual = self._cargar()
+                self.recargas += 1
+
+                print(
+                    f'{datetime.now()} >>> *** Configuración recargada desde '
+                    f'{self.ruta} ***'
+                )
+            except (ErrorConfiguracion, OSError) as error:
                 print(
-                    f'{datetime.now()} >> *** Error de formato en config.json '
-                    '***'
+                    f'{datetime.now()} >>> *** Error al recargar '
+                    f'{self.ruta}. Se mantiene la configuración anterior ***'
                 )
                 print(error)
-        else:
-            print(
-                f'{datetime.now()} >> *** Error. Archivo de configuración '
-                'config.json no encontrado ***'
-            )
 
-        return {}
+            return self._actual
+
+    def cerrar(self):
+        '''
+        Deja de vigilar el archivo de configuración. La configuración vigente
+        se sigue pudiendo consultar, y los cambios se detectan por su firma.
+        '''
+        with self._candado:
+            if self._vigilante is not None:
+                self._vigilante.cerrar()
+                self._vigilante = None
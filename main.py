@@ -1,8 +1,8 @@
+import argparse
 import os
+import signal
 import sys
-
-# * Libre Hardware Monitor.
-import utils.libre_hardware_monitor as lhm
+import threading
 
 # * Configuración.
 import config
@@ -11,37 +11,75 @@ import config
 import metrics.cpu as cpu
 import metrics.storage as storage
 
-# * GUI.
-import utils.gui as gui
+# * Motor de recolección y alertas.
+import utils.alertas as alertas
+import utils.recoleccion as recoleccion
 
 from datetime import datetime
 
-def obtener_alertas_cpu(uso_cpu, temperatura_cpu, temperatura_paquete_cpu,
-                        umbrales_uso, umbrales_temperatura,
-                        umbrales_temperatura_paquete):
+# * Libre Hardware Monitor sólo es importado si el sistema operativo es
+# * Windows. La GUI (y con ella tkinter) se importa recién en main(), y sólo
+# * si el agente no se ejecuta en modo sin interfaz.
+if os.name == 'nt':
+    import utils.libre_hardware_monitor as lhm
+
+def obtener_argumentos():
+    '''Devuelve los argumentos de la línea de comandos.'''
+    parser = argparse.ArgumentParser(description='Monitor Agent')
+    parser.add_argument(
+        '--headless', action='store_true',
+        help='ejecuta los recolectores y las alertas sin GUI (por ejemplo, '
+        'como servicio de systemd)'
+    )
+    parser.add_argument(
+        '--una-vez', action='store_true',
+        help='en modo sin GUI, finaliza al publicarse la primera instantánea'
+    )
+    parser.add_argument(
+        '--config', default='config.json',
+        help='ruta del archivo de configuración (por defecto, config.json)'
+    )
+
+    return parser.parse_args()
+
+def ejecutar_sin_interfaz(motor, una_vez=False):
     '''
-    Muestra las alertas de la CPU según los umbrales definidos en la
-    configuración.
+    Consume las instantáneas del motor sin GUI, mostrando las alertas por la
+    salida estándar, hasta recibir SIGINT o SIGTERM.
     '''
-    # * Alerta para el uso de CPU alto.
-    if uso_cpu >= umbrales_uso:
-        print(f'\nAlerta: uso de CPU alto - {uso_cpu[1]}%')
+    detener = threading.Event()
 
-    # * Alerta para la temperatura de CPU alta.
-    if temperatura_cpu >= umbrales_temperatura:
-        print(f'\nAlerta: temperatura de CPU alta - {temperatura_cpu[1]}°C')
+    def manejar_senal(numero, marco):
+        detener.set()
 
-    # * Alerta para la temperatura de paquete de CPU alta.
-    if temperatura_paquete_cpu >= umbrales_temperatura_paquete:
-        print(
-            '\nAlerta: temperatura de paquete de CPU alta - '
-            f'{temperatura_cpu[2]}°C'
-        )
+    signal.signal(signal.SIGINT, manejar_senal)
+    signal.signal(signal.SIGTERM, manejar_senal)
+
+    primera = True
+
+    # * Las alertas llegan con las instantáneas, por lo que basta con
+    # * consultarlas con la misma frecuencia que la GUI.
+    while not detener.wait(0.1):
+        for instantanea in motor.obtener_instantaneas_pendientes():
+            if primera:
+                print(
+                    f'{datetime.now()} >>> *** Primera instantánea publicada '
+                    '***', flush=True
+                )
+                primera = False
+
+            for alerta in instantanea.alertas:
+                print(alertas.formatear_alerta(alerta), flush=True)
+
+        if una_vez and not primera:
+            break
 
 def main():
     '''
     Punto de entrada del programa.
     '''
+    argumentos = obtener_argumentos()
+
     sistema_operativo = os.name
     print(f'{datetime.now()} >>> *** Sistema Operativo: {sys.platform} ***')
 
@@ -51,11 +89,73 @@ def main():
         instancia_lhm = lhm.LibreHardwareMonitor()
         instancia_lhm.iniciar_libre_hardware_monitor()
 
+    # * La configuración se valida al iniciar. Si es inválida, se finaliza el
+    # * agente, ya que no hay una configuración anterior que mantener.
+    servicio_configuracion = config.ServicioConfiguracion(argumentos.config)
+
+    try:
+        servicio_configuracion.cargar()
+    except config.ErrorConfiguracion as error:
+        print(
+            f'{datetime.now()} >>> *** Error en la configuración. La '
+            'ejecución del agente se finalizará ***'
+        )
+        print(error)
+
+        sys.exit(1)
+
     cpu_metrics = cpu.Cpu()
     storage_metrics = storage.Storage()
 
-    aplicacion = gui.GUI(cpu_metrics, storage_metrics, sistema_operativo)
-    aplicacion.mainloop()
+    # * Los recolectores se ejecutan en hilos de trabajo del motor, y la GUI
+    # * (o el modo sin interfaz) sólo consume las instantáneas que este
+    # * publica.
+    motor = recoleccion.MotorRecoleccion(
+        cpu_metrics, storage_metrics, sistema_operativo,
+        servicio_configuracion
+    )
+
+    # * Los exportadores se configuran al iniciar y reciben cada instantánea
+    # * publicada por el motor.
+    exportadores = []
+    configuracion_exportadores = servicio_configuracion.actual().exportadores
+
+    if configuracion_exportadores.prometheus.habilitado:
+        import utils.exportador_prometheus as exportador_prometheus
+
+        prometheus = configuracion_exportadores.prometheus
+        exportador = exportador_prometheus.ExportadorPrometheus(
+            prometheus.direccion, prometheus.puerto
+        )
+        motor.agregar_observador(exportador.actualizar)
+        exportadores.append(exportador)
+
+    if configuracion_exportadores.push.habilitado:
+        import utils.exportador_push as exportador_push
+
+        exportador = exportador_push.ExportadorPush(
+            configuracion_exportadores.push
+        )
+        motor.agregar_observador(exportador.actualizar)
+        exportadores.append(exportador)
+
+    for exportador in exportadores:
+        exportador.iniciar()
+
+    motor.iniciar()
+
+    if argumentos.headless:
+        ejecutar_sin_interfaz(motor, argumentos.una_vez)
+    else:
+        import utils.gui as gui
+
+        aplicacion = gui.GUI(motor, sistema_operativo)
+        aplicacion.mainloop()
+
+    motor.detener()
+
+    for exportador in exportadores:
+        exportador.detener()
 
 if __name__ == '__main__':
     main()
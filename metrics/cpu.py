@@ -1,205 +1,222 @@
+import os
 import psutil
-import requests
-import cpuinfo
 
-from datetime import datetime
+from collections import namedtuple
+
+# * Sensores de temperatura de hwmon.
+import metrics.hwmon as hwmon
+
+# * Identidad estática de la CPU.
+import metrics.identidad_cpu as identidad_cpu
+
+# * Libre Hardware Monitor sólo es importado si el sistema operativo es
+# * Windows.
+if os.name == 'nt':
+    import utils.libre_hardware_monitor as lhm
+
+# * Porcentaje del tiempo de la CPU dedicado a cada estado. iowait y steal
+# * sólo existen en Linux; en otros sistemas operativos se reportan en 0.
+DesgloseCpu = namedtuple('DesgloseCpu', ['user', 'system', 'iowait', 'steal'])
+
+class MuestreadorCpu:
+    '''
+    Clase para calcular el uso de la CPU a partir de la diferencia entre dos
+    lecturas de los tiempos acumulados de cada núcleo, sin bloquear el hilo
+    que la consulta.
+    '''
+
+    def __init__(self):
+        self._anterior = psutil.cpu_times(percpu=True)
+
+    def _tiempo_total(self, tiempos):
+        '''
+        Devuelve el tiempo total de una lectura. guest y guest_nice ya están
+        incluidos en user y nice en Linux, por lo que se descuentan para no
+        contarlos dos veces.
+        '''
+        return (
+            sum(tiempos) - getattr(tiempos, 'guest', 0.0) -
+            getattr(tiempos, 'guest_nice', 0.0)
+        )
+
+    def _calcular(self, anterior, actual):
+        '''
+        Devuelve el porcentaje de uso y el desglose por estado entre dos
+        lecturas de tiempos de CPU.
+        '''
+        delta_total = self._tiempo_total(actual) - self._tiempo_total(anterior)
+
+        if delta_total <= 0:
+            return 0.0, DesgloseCpu(0.0, 0.0, 0.0, 0.0)
+
+        def porcentaje(campo):
+            delta = (
+                getattr(actual, campo, 0.0) - getattr(anterior, campo, 0.0)
+            )
+            return round(min(100.0, max(0.0, delta / delta_total * 100)), 1)
+
+        # * El tiempo ocupado es todo el tiempo que no es idle ni iowait, al
+        # * igual que lo calcula psutil.cpu_percent().
+        delta_inactivo = (
+            actual.idle - anterior.idle +
+            getattr(actual, 'iowait', 0.0) - getattr(anterior, 'iowait', 0.0)
+        )
+        uso = round(
+            min(100.0, max(0.0, (1 - delta_inactivo / delta_total) * 100)), 1
+        )
+
+        desglose = DesgloseCpu(
+            porcentaje('user'), porcentaje('system'), porcentaje('iowait'),
+            porcentaje('steal')
+        )
+
+        return uso, desglose
+
+    def muestrear(self):
+        '''
+        Devuelve el uso de la CPU desde la muestra anterior en un tuple, donde
+        el primer elemento es un tuple con el uso de cada núcleo, el segundo
+        es el uso total, el tercero es un tuple con el desglose de cada núcleo
+        y el cuarto es el desglose total.
+        '''
+        actual = psutil.cpu_times(percpu=True)
+        anterior = self._anterior
+        self._anterior = actual
+
+        # * Si cambió la cantidad de núcleos (por ejemplo, al conectar una
+        # * CPU en caliente) no hay diferencia válida, y la muestra actual
+        # * pasa a ser la nueva base.
+        if len(actual) != len(anterior):
+            anterior = actual
+
+        uso_nucleos = []
+        desglose_nucleos = []
+
+        for tiempos_anteriores, tiempos_actuales in zip(anterior, actual):
+            uso, desglose = self._calcular(tiempos_anteriores, tiempos_actuales)
+            uso_nucleos.append(uso)
+            desglose_nucleos.append(desglose)
+
+        # * El total se calcula sumando los tiempos de todos los núcleos, que
+        # * es lo mismo que psutil.cpu_times(percpu=False).
+        uso_total, desglose_total = self._calcular(
+            self._sumar(anterior), self._sumar(actual)
+        )
+
+        return (
+            tuple(uso_nucleos), uso_total, tuple(desglose_nucleos),
+            desglose_total
+        )
+
+    def _sumar(self, tiempos_nucleos):
+        '''Suma campo a campo los tiempos de todos los núcleos.'''
+        tipo = type(tiempos_nucleos[0])
+        return tipo(*(sum(campo) for campo in zip(*tiempos_nucleos)))
 
 class Cpu:
     '''Clase para obtener las métricas de la CPU.'''
 
-    def __init__(self):
+    def __init__(self, raiz_sys='/sys', raiz_proc='/proc', ruta_cache=None):
         self.modelo = None
+        self.desglose = None
+
+        # * El modelo y la cantidad de núcleos se calculan una sola vez por
+        # * arranque del sistema.
+        self._identidad = identidad_cpu.ProveedorIdentidadCpu(
+            raiz_proc, raiz_sys, ruta_cache
+        )
+
+        # * La raíz de sysfs es configurable para poder leer los sensores de
+        # * un árbol de prueba.
+        self._temperatura_hwmon = hwmon.TemperaturaCpuHwmon(raiz_sys)
+
+        # * El cliente de Libre Hardware Monitor se crea con la primera
+        # * consulta de temperatura en Windows.
+        self._cliente_lhm = None
+
+        # * La primera lectura de tiempos de CPU sirve de base para que la
+        # * primera muestra ya tenga una diferencia que medir.
+        self._muestreador = MuestreadorCpu()
+
+    def obtener_identidad_cpu(self):
+        '''
+        Devuelve la IdentidadCpu (modelo, fabricante, topología y cantidad de
+        núcleos), leída de la caché de este arranque si existe.
+        '''
+        return self._identidad.obtener()
 
     def obtener_modelo_cpu(self):
         '''Devuelve el modelo de la CPU.'''
-        # * Obtener el modelo de la CPU demora considerablemente, por lo que
-        # * se almacena en el attribute 'modelo' y así sólo se usa el attribute
-        # * para el resto de la ejecución del programa.
-        self.modelo = cpuinfo.get_cpu_info()['brand_raw']
+        # * El modelo se almacena en el attribute 'modelo' y así sólo se usa
+        # * el attribute para el resto de la ejecución del programa.
+        self.modelo = self.obtener_identidad_cpu().modelo
         return self.modelo
 
     def obtener_nucleos_fisicos(self):
         '''Devuelve el número de núcleos físicos de la CPU.'''
-        return psutil.cpu_count(logical = False)
+        return self.obtener_identidad_cpu().nucleos_fisicos
 
     def obtener_nucleos_logicos(self):
         '''Devuelve el número de núcleos lógicos de la CPU.'''
-        return psutil.cpu_count(logical = True)
+        return self.obtener_identidad_cpu().nucleos_logicos
     
     def obtener_uso_cpu(self):
         '''
-        Devuelve el uso de la CPU en un tuple, donde el primer elemento es un
-        tuple conteniendo el uso de cada núcleo y el segundo elemento es el uso
-        total de la CPU.
+        Devuelve el uso de la CPU desde la llamada anterior en un tuple, donde
+        el primer elemento es un tuple conteniendo el uso de cada núcleo y el
+        segundo elemento es el uso total de la CPU. No bloquea, por lo que el
+        intervalo de muestreo lo define quien la llama.
         '''
-        uso_cpu_nucleos = tuple(psutil.cpu_percent(interval=5.0, percpu=True))
-        uso_cpu_total = round(sum(uso_cpu_nucleos) / len(uso_cpu_nucleos), 2)
+        (
+            uso_cpu_nucleos, uso_cpu_total, desglose_nucleos, desglose_total
+        ) = self._muestreador.muestrear()
+
+        # * El desglose de la misma muestra se guarda para consultarlo con
+        # * obtener_desglose_cpu() sin volver a muestrear.
+        self.desglose = (desglose_nucleos, desglose_total)
+
         uso_cpu = (uso_cpu_nucleos, uso_cpu_total)
 
         return uso_cpu
 
+    def obtener_desglose_cpu(self):
+        '''
+        Devuelve el desglose user/system/iowait/steal de la última muestra de
+        obtener_uso_cpu() en un tuple, donde el primer elemento es un tuple
+        con el desglose de cada núcleo y el segundo es el desglose total.
+        '''
+        return self.desglose
+
     def obtener_temperatura_cpu_windows(self, modelo):
         '''
         Devuelve la temperatura de la CPU en Windows en un tuple, donde el
         primer elemento es un tuple conteniendo la temperatura de cada núcleo,
         el segundo elemento es la temperatura promedio de los núcleos y el
-        tercer elemento es la temperatura del paquete de la CPU.
-        '''
-        try:
-            # * Se accede al JSON que brinda Libre Hardware Monitor por medio
-            # * de una petición HTTP GET.
-            url = 'http://localhost:8085/data.json'
-            respuesta = requests.get(url, timeout = 3)
-            respuesta.raise_for_status()
-            datos = respuesta.json()
-
-            paquete_cpu = None
-            temperatura_nucleos = []
-
-            for hardware in datos['Children'][0]['Children']:
-                # * Se accede al objeto de la CPU por medio de la imagen por
-                # * defecto que brinda Libre Hardware Monitor.
-                if hardware.get('ImageURL', '') == 'images_icon/cpu.png':
-                    for sensor in hardware['Children']:
-                        # * Se accede al objeto que contiene los sensores de
-                        # * temperatura.
-                        if sensor['Text'] == 'Temperatures':
-                            core = 1
-
-                            for sensor_temperatura in sensor['Children']:
-                                # * Si la CPU es Intel, se devuelve la
-                                # * temperatura de cada núcleo, su promedio y
-                                # * la temperatura del paquete.
-                                if modelo.startswith('Intel'):
-                                    # * Se accede al objeto que contiene la
-                                    # * temperatura de cada núcleo.
-                                    if (sensor_temperatura['Text'] ==
-                                        f'CPU Core #{core}'):
-                                        # * El valor tiene formato string con
-                                        # * el símbolo de grados Celsius. Se
-                                        # * curó a float.
-                                        temperatura_nucleo = float(
-                                            sensor_temperatura['Value']
-                                                .replace('°C', '')
-                                                .strip()
-                                        )
-                                        temperatura_nucleos.append(
-                                            temperatura_nucleo
-                                        )
-
-                                        # * A la primera ejecución de este if,
-                                        # * se va a incrementar el valor para
-                                        # * que acceda a todos los núcleos, ya
-                                        # * que están presentados en orden en
-                                        # * el JSON.
-                                        core += 1
-
-                                    # * Se accede al objeto que contiene la
-                                    # * temperatura del paquete de la CPU.
-                                    if (sensor_temperatura['Text'] ==
-                                        'CPU Package'):
-                                        # * El valor tiene formato string con
-                                        # * el símbolo de grados Celsius. Se
-                                        # * curó a float.
-                                        paquete_cpu = float(
-                                            sensor_temperatura['Value']
-                                                .replace('°C', '')
-                                                .strip()
-                                        )
-
-                                # * Si la CPU es AMD, se devuelve la
-                                # * temperatura de los núcleos y la
-                                # * temperatura del paquete.
-                                if modelo.startswith('AMD'):
-                                    # * Se accede al objeto que contiene la
-                                    # * temperatura de los núcleos.
-                                    if (sensor_temperatura['Text'] ==
-                                        'CCD1 (Tdie)'):
-                                        # * El valor tiene formato string con
-                                        # * el símbolo de grados Celsius. Se
-                                        # * curó a float.
-                                        valor_temperatura_nucleos = float(
-                                            sensor_temperatura['Value']
-                                                .replace('°C', '')
-                                                .strip()
-                                        )
-
-                                        temperatura_nucleos.append(
-                                            valor_temperatura_nucleos
-                                        )
-
-                                    # * Se accede al objeto que contiene la
-                                    # * temperatura del paquete de la CPU.
-                                    if (sensor_temperatura['Text'] ==
-                                        'Core (Tctl/Tdie)'):
-                                        # * El valor tiene formato string con
-                                        # * el símbolo de grados Celsius. Se
-                                        # * curó a float.
-                                        paquete_cpu = float(
-                                            sensor_temperatura['Value']
-                                                .replace('°C', '')
-                                                .strip()
-                                        )
-                                        
-            # * En el caso de que el procesador sea AMD, el tuple sólo va a
-            # * contener un elemento, que es la temperatura de los núcleos (no
-            # * es un promedio).
-            temperatura_nucleos = tuple(temperatura_nucleos)
-            temperatura_promedio = round(
-                sum(temperatura_nucleos) / len(temperatura_nucleos), 2
-            )
-            temperatura_cpu = (
-                temperatura_nucleos, temperatura_promedio, paquete_cpu
-            )
-            
-            return temperatura_cpu                                
-        except requests.RequestException as error:
-            print(
-                f'{datetime.now()} >>> *** Error al conectar con el servidor '
-                'de Libre Hardware Monitor ***'
-            )
-            print(error)
+        tercer elemento es la temperatura del paquete de la CPU. Si Libre
+        Hardware Monitor no responde, lanza la excepción del cliente
+        (requests.RequestException o ValueError), para que el interruptor de
+        la fuente deje de consultarlo mientras esté caído.
+        '''
+        # * Se accede al JSON que brinda Libre Hardware Monitor por medio de
+        # * un cliente que mantiene la conexión abierta y que sólo recorre el
+        # * árbol completo cuando cambia el hardware.
+        if self._cliente_lhm is None:
+            self._cliente_lhm = lhm.ClienteLibreHardwareMonitor()
+
+        # * En el caso de que el procesador sea AMD, el tuple de núcleos
+        # * contiene la temperatura de cada CCD (no es un promedio).
+        return self._cliente_lhm.obtener_temperatura_cpu(modelo)
 
-            return []
-        
     def obtener_temperatura_cpu_linux(self, modelo):
         '''
         Devuelve la temperatura de la CPU en Linux en un tuple, donde el primer
         elemento es un tuple conteniendo la temperatura de cada núcleo, el
         segundo elemento es la temperatura promedio de los núcleos y el tercer
-        elemento es la temperatura del paquete de la CPU.
-        '''
-        # * Se obtienen las temperaturas de los sensores del sistema.
-        temperaturas = psutil.sensors_temperatures()
-
-        paquete_cpu = None
-        temperaturas_nucleos = []
-
-        # * Se verifica si el sensor de temperatura de la CPU está disponible.
-        if 'coretemp' in temperaturas:
-            for sensor in temperaturas['coretemp']:
-                # * Se accede al objeto que contiene la temperatura del paquete
-                # * de la CPU.
-                if sensor.label.startswith('Package'):
-                    paquete_cpu = sensor.current
-                # * Se accede al objeto que contiene la temperatura de cada
-                # * núcleo.
-                if sensor.label.startswith('Core'):
-                    temperaturas_nucleos.append(sensor.current)
-        else:
-            print(
-                f'{datetime.now()} >>> *** No se encontró el sensor de '
-                'temperatura de la CPU ***'
-            )
-
-        temperatura_nucleos = tuple(temperaturas_nucleos)
-        temperatura_promedio = round(
-            sum(temperatura_nucleos) / len(temperatura_nucleos), 2
-        )
-        temperatura_nucleos = (0, )
-        temperatura_promedio = 0.0
-        temperatura_cpu = (
-            temperatura_nucleos, temperatura_promedio, paquete_cpu
-        )
-
-        return temperatura_cpu
+        elemento es la temperatura del paquete de la CPU. En AMD, el primer
+        elemento contiene la temperatura de cada CCD. Devuelve un tuple vacío
+        si no se encontró el sensor de temperatura, y lanza la excepción si
+        no se pudo leer.
+        '''
+        # * Los sensores se descubren en /sys/class/hwmon la primera vez, y
+        # * luego sólo se releen sus archivos ya abiertos.
+        return self._temperatura_hwmon.leer()
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+
+import psutil
+
+from collections import namedtuple
+
+# * Contadores acumulados de entrada/salida de un dispositivo de bloque: las
+# * operaciones completadas, los bytes y los milisegundos de lectura y de
+# * escritura, los milisegundos con alguna operación en curso y los
+# * milisegundos ponderados por la cantidad de operaciones en curso. Los
+# * campos que la plataforma no reporta quedan en None.
+ContadoresIO = namedtuple(
+    'ContadoresIO',
+    [
+        'lecturas', 'bytes_leidos', 'ms_lectura', 'escrituras',
+        'bytes_escritos', 'ms_escritura', 'ms_activo', 'ms_ponderado'
+    ]
+)
+
+# * Rendimiento de entrada/salida de un dispositivo entre dos muestras. Las
+# * operaciones (IOPS) y los bytes son por segundo; las latencias son el
+# * tiempo promedio de cada operación en milisegundos, incluida la espera en
+# * la cola; 'cola' es la cantidad promedio de operaciones en curso y
+# * 'utilizacion' es el porcentaje del tiempo con alguna operación en curso.
+RendimientoIO = namedtuple(
+    'RendimientoIO',
+    [
+        'iops_lectura', 'iops_escritura', 'bytes_lectura', 'bytes_escritura',
+        'latencia_lectura', 'latencia_escritura', 'cola', 'utilizacion'
+    ]
+)
+
+class MuestreadorIO:
+    '''
+    Clase para obtener el rendimiento de entrada/salida de los discos y de
+    las particiones por diferencia entre dos muestras de sus contadores
+    acumulados, por lo que se puede muestrear con intervalos menores a un
+    segundo sin bloquear.
+
+    En Linux se lee /proc/diskstats, que se abre una sola vez y se vuelve a
+    leer con pread en cada muestra. Los dispositivos se identifican por su
+    nombre en el kernel ('sda', 'nvme0n1p1'), el mismo de la topología. En
+    Windows se usa psutil, que sólo reporta los discos físicos (por ejemplo,
+    'physicaldrive0'), sin la cola ni la utilización.
+    '''
+
+    # * /proc/diskstats cuenta los sectores en unidades de 512 bytes, sin
+    # * importar el tamaño de sector del dispositivo.
+    BYTES_SECTOR = 512
+
+    def __init__(self, sistema_operativo, raiz_proc='/proc'):
+        self.sistema_operativo = sistema_operativo
+        self.ruta_diskstats = os.path.join(raiz_proc, 'diskstats')
+
+        self._candado = threading.Lock()
+        self._descriptor = None
+        self._tamano_lectura = 16384
+
+        self._anteriores = None
+        self._marca_anterior = None
+
+    def _leer_diskstats(self):
+        '''
+        Devuelve un dictionary donde la clave es el nombre del dispositivo
+        y el valor son sus ContadoresIO, desde /proc/diskstats.
+        '''
+        if self._descriptor is None:
+            self._descriptor = os.open(self.ruta_diskstats, os.O_RDONLY)
+
+        # * Si la lectura llenó el buffer, puede haber más dispositivos, y
+        # * se vuelve a leer con un buffer más grande.
+        while True:
+            datos = os.pread(self._descriptor, self._tamano_lectura, 0)
+
+            if len(datos) < self._tamano_lectura:
+                break
+
+            self._tamano_lectura *= 2
+
+        contadores = {}
+
+        # * Campos de cada línea: mayor, menor, nombre, lecturas completadas,
+        # * lecturas combinadas, sectores leídos, ms leyendo, escrituras
+        # * completadas, escrituras combinadas, sectores escritos, ms
+        # * escribiendo, operaciones en curso, ms con operaciones en curso y
+        # * ms ponderados (los kernels recientes agregan más campos).
+        for linea in datos.decode('ascii').splitlines():
+            campos = linea.split()
+
+            if len(campos) < 14:
+                continue
+
+            contadores[campos[2]] = ContadoresIO(
+                int(campos[3]), int(campos[5]) * self.BYTES_SECTOR,
+                int(campos[6]), int(campos[7]),
+                int(campos[9]) * self.BYTES_SECTOR, int(campos[10]),
+                int(campos[12]), int(campos[13])
+            )
+
+        return contadores
+
+    def _leer_psutil(self):
+        '''
+        Devuelve los ContadoresIO de cada disco físico desde psutil, con
+        los nombres en minúsculas.
+        '''
+        return {
+            nombre.lower(): ContadoresIO(
+                io.read_count, io.read_bytes, io.read_time, io.write_count,
+                io.write_bytes, io.write_time, None, None
+            )
+            for nombre, io in (
+                psutil.disk_io_counters(perdisk=True) or {}
+            ).items()
+        }
+
+    def cerrar(self):
+        '''Cierra /proc/diskstats.'''
+        with self._candado:
+            if self._descriptor is not None:
+                os.close(self._descriptor)
+                self._descriptor = None
+
+    def muestrear(self):
+        '''
+        Devuelve un dictionary donde la clave es el nombre del dispositivo y
+        el valor es su RendimientoIO desde la muestra anterior. La primera
+        muestra sólo sirve de referencia, por lo que devuelve un dictionary
+        vacío. Si los contadores de un dispositivo disminuyeron (porque se
+        volvió a conectar o porque desbordaron), ese dispositivo se omite
+        hasta la siguiente muestra.
+        '''
+        with self._candado:
+            if self.sistema_operativo == 'nt':
+                contadores = self._leer_psutil()
+            if self.sistema_operativo == 'posix':
+                contadores = self._leer_diskstats()
+
+            marca = time.monotonic()
+
+            anteriores = self._anteriores
+            transcurrido = (
+                None if anteriores is None else marca - self._marca_anterior
+            )
+
+            self._anteriores = contadores
+            self._marca_anterior = marca
+
+        if not transcurrido:
+            return {}
+
+        rendimientos = {}
+
+        for nombre, actual in contadores.items():
+            anterior = anteriores.get(nombre)
+
+            if anterior is None:
+                continue
+
+            diferencia = ContadoresIO(*(
+                None if valor is None else valor - valor_anterior
+                for valor, valor_anterior in zip(actual, anterior)
+            ))
+
+            if any(
+                valor is not None and valor < 0 for valor in diferencia
+            ):
+                continue
+
+            rendimientos[nombre] = RendimientoIO(
+                diferencia.lecturas / transcurrido,
+                diferencia.escrituras / transcurrido,
+                diferencia.bytes_leidos / transcurrido,
+                diferencia.bytes_escritos / transcurrido,
+                (
+                    diferencia.ms_lectura / diferencia.lecturas
+                    if diferencia.lecturas else 0.0
+                ),
+                (
+                    diferencia.ms_escritura / diferencia.escrituras
+                    if diferencia.escrituras else 0.0
+                ),
+                (
+                    None if diferencia.ms_ponderado is None
+                    else diferencia.ms_ponderado / (transcurrido * 1000)
+                ),
+                (
+                    None if diferencia.ms_activo is None
+                    else min(
+                        100.0, diferencia.ms_activo / (transcurrido * 10)
+                    )
+                ),
+            )
+
+        return rendimientos
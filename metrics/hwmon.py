@@ -0,0 +1,327 @@
+import os
+import re
+
+from datetime import datetime
+
+class SensorHwmon:
+    '''
+    Sensor de temperatura de hwmon. El archivo de entrada se abre una sola
+    vez y se vuelve a leer con pread en cada muestra, sin volver a recorrer
+    /sys.
+    '''
+
+    def __init__(self, ruta, etiqueta):
+        self.ruta = ruta
+        self.etiqueta = etiqueta
+        self._descriptor = os.open(ruta, os.O_RDONLY)
+
+    def leer(self):
+        '''Devuelve la temperatura del sensor en grados Celsius.'''
+        # * hwmon reporta la temperatura en miligrados Celsius.
+        return int(os.pread(self._descriptor, 32, 0)) / 1000
+
+    def cerrar(self):
+        '''Cierra el archivo de entrada del sensor.'''
+        if self._descriptor is not None:
+            os.close(self._descriptor)
+            self._descriptor = None
+
+class IndiceHwmon:
+    '''
+    Índice de los dispositivos de /sys/class/hwmon. La raíz de sysfs es
+    configurable para poder usar un árbol de prueba.
+    '''
+
+    PATRON_ENTRADA = re.compile(r'^temp(\d+)_input$')
+
+    def __init__(self, raiz_sys='/sys'):
+        self.raiz_sys = raiz_sys
+
+    def _leer_texto(self, ruta):
+        '''Devuelve el contenido de un archivo de sysfs sin espacios.'''
+        with open(ruta, encoding='utf-8') as archivo:
+            return archivo.read().strip()
+
+    def obtener_chips(self, nombres):
+        '''
+        Devuelve una list de tuples con el directorio y el nombre de cada
+        chip hwmon cuyo nombre está en 'nombres', ordenados por el
+        dispositivo al que pertenecen para que el orden sea estable.
+        '''
+        ruta_hwmon = os.path.join(self.raiz_sys, 'class', 'hwmon')
+
+        try:
+            entradas = os.listdir(ruta_hwmon)
+        except OSError:
+            return []
+
+        chips = []
+
+        for entrada in entradas:
+            directorio = os.path.join(ruta_hwmon, entrada)
+
+            try:
+                nombre = self._leer_texto(os.path.join(directorio, 'name'))
+            except OSError:
+                continue
+
+            if nombre in nombres:
+                chips.append((os.path.realpath(directorio), nombre))
+
+        return sorted(chips)
+
+    def obtener_entradas_temperatura(self, directorio):
+        '''
+        Devuelve una list de tuples con la ruta de cada entrada de
+        temperatura del chip y su etiqueta, o None si no tiene etiqueta,
+        ordenadas por número de entrada.
+        '''
+        entradas = []
+
+        for archivo in os.listdir(directorio):
+            coincidencia = self.PATRON_ENTRADA.match(archivo)
+
+            if coincidencia is None:
+                continue
+
+            numero = int(coincidencia.group(1))
+
+            try:
+                etiqueta = self._leer_texto(
+                    os.path.join(directorio, f'temp{numero}_label')
+                )
+            except OSError:
+                etiqueta = None
+
+            entradas.append((numero, os.path.join(directorio, archivo), etiqueta))
+
+        return [(ruta, etiqueta) for _, ruta, etiqueta in sorted(entradas)]
+
+class TemperaturaCpuHwmon:
+    '''
+    Clase para obtener la temperatura de la CPU desde hwmon. Los sensores del
+    paquete y de los núcleos se descubren una sola vez, y en cada muestra
+    sólo se leen sus archivos de entrada ya abiertos.
+
+    Soporta coretemp (Intel), y k10temp y zenpower (AMD). En AMD no hay
+    sensores por núcleo, por lo que se usan los de cada CCD (Tccd1, Tccd2,
+    ...), y como temperatura del paquete se prefiere Tdie sobre Tctl, ya
+    que Tctl puede incluir un desplazamiento.
+    '''
+
+    CHIPS_CPU = ('coretemp', 'k10temp', 'zenpower')
+
+    def __init__(self, raiz_sys='/sys'):
+        self.indice = IndiceHwmon(raiz_sys)
+
+        self._paquetes = None
+        self._nucleos = None
+
+    def _descubrir(self):
+        '''Descubre los sensores del paquete y de los núcleos de la CPU.'''
+        paquetes = []
+        nucleos = []
+
+        for directorio, nombre in self.indice.obtener_chips(self.CHIPS_CPU):
+            entradas = self.indice.obtener_entradas_temperatura(directorio)
+
+            if nombre == 'coretemp':
+                for ruta, etiqueta in entradas:
+                    if etiqueta is None:
+                        continue
+                    if etiqueta.startswith('Package'):
+                        paquetes.append(SensorHwmon(ruta, etiqueta))
+                    elif etiqueta.startswith('Core'):
+                        nucleos.append(SensorHwmon(ruta, etiqueta))
+            else:
+                # * En kernels antiguos, k10temp sólo tiene temp1_input sin
+                # * etiqueta, que corresponde a Tctl.
+                etiquetas = {
+                    etiqueta or 'Tctl': ruta for ruta, etiqueta in entradas
+                }
+
+                for etiqueta in ('Tdie', 'Tctl'):
+                    if etiqueta in etiquetas:
+                        paquetes.append(
+                            SensorHwmon(etiquetas[etiqueta], etiqueta)
+                        )
+                        break
+
+                for ruta, etiqueta in entradas:
+                    if etiqueta is not None and etiqueta.startswith('Tccd'):
+                        nucleos.append(SensorHwmon(ruta, etiqueta))
+
+        if not paquetes and not nucleos:
+            print(
+                f'{datetime.now()} >>> *** No se encontró el sensor de '
+                'temperatura de la CPU ***'
+            )
+
+        self._paquetes = paquetes
+        self._nucleos = nucleos
+
+    def cerrar(self):
+        '''Cierra los sensores abiertos, para volver a descubrirlos.'''
+        for sensor in (self._paquetes or []) + (self._nucleos or []):
+            sensor.cerrar()
+
+        self._paquetes = None
+        self._nucleos = None
+
+    def leer(self):
+        '''
+        Devuelve la temperatura de la CPU en un tuple, donde el primer
+        elemento es un tuple con la temperatura de cada núcleo (o de cada
+        CCD en AMD), el segundo es el promedio de los núcleos y el tercero es
+        la temperatura del paquete. Si hay varios paquetes, se reporta el más
+        caliente. Devuelve un tuple vacío si no hay sensores, y si un sensor
+        no se puede leer, lanza la excepción, para que el interruptor de la
+        fuente la registre.
+        '''
+        if self._paquetes is None:
+            self._descubrir()
+
+        try:
+            paquetes = [sensor.leer() for sensor in self._paquetes]
+            temperatura_nucleos = tuple(
+                sensor.leer() for sensor in self._nucleos
+            )
+        except (OSError, ValueError):
+            # * Si un sensor desapareció (por ejemplo, al recargar el módulo
+            # * del kernel), se vuelven a descubrir en la siguiente muestra.
+            self.cerrar()
+            raise
+
+        if not paquetes and not temperatura_nucleos:
+            return ()
+
+        paquete_cpu = max(paquetes) if paquetes else None
+
+        # * Si no hay sensores por núcleo, el promedio es la temperatura del
+        # * paquete.
+        if temperatura_nucleos:
+            temperatura_promedio = round(
+                sum(temperatura_nucleos) / len(temperatura_nucleos), 2
+            )
+        else:
+            temperatura_promedio = paquete_cpu
+
+        return (temperatura_nucleos, temperatura_promedio, paquete_cpu)
+
+class TemperaturaDiscosHwmon:
+    '''
+    Clase para obtener la temperatura de los discos desde hwmon: los chips
+    'nvme' (controladoras NVMe) y 'drivetemp' (discos SATA, con el módulo
+    drivetemp cargado). Leer un sensor ya abierto es mucho más barato que
+    ejecutar smartctl, por lo que la temperatura se puede leer en cada
+    intervalo y smartctl queda para los contadores de vida útil.
+
+    Cada disco se asocia a su chip comparando el dispositivo al que apunta
+    /sys/block/<disco>/device con el dispositivo del chip (el enlace
+    'device' del directorio hwmon), ambos resueltos con realpath. La
+    asociación se descubre una única vez por conjunto de discos.
+    '''
+
+    CHIPS_DISCO = ('nvme', 'drivetemp')
+
+    # * Con multipath nativo de NVMe, el disco nvme0n1 apunta al subsistema
+    # * y no a la controladora, por lo que se asocia por nombre a nvme0.
+    PATRON_NVME = re.compile(r'^(nvme\d+)n\d+$')
+
+    def __init__(self, raiz_sys='/sys'):
+        self.indice = IndiceHwmon(raiz_sys)
+        self.raiz_sys = raiz_sys
+
+        self._discos = None
+        self._sensores = {}
+
+    def _descubrir(self, discos):
+        '''
+        Abre el sensor de cada disco que tiene un chip hwmon. Los discos sin
+        chip quedan sin sensor hasta que cambie el conjunto de discos.
+        '''
+        chips = {}
+
+        for directorio, _ in self.indice.obtener_chips(self.CHIPS_DISCO):
+            entradas = self.indice.obtener_entradas_temperatura(directorio)
+
+            if not entradas:
+                continue
+
+            # * El chip nvme reporta la temperatura 'Composite' y la de cada
+            # * sensor interno; se usa la 'Composite', que es la que reporta
+            # * smartctl. drivetemp tiene una única entrada.
+            ruta, etiqueta = next(
+                (
+                    (ruta, etiqueta) for ruta, etiqueta in entradas
+                    if etiqueta == 'Composite'
+                ),
+                entradas[0]
+            )
+
+            dispositivo = os.path.realpath(os.path.join(directorio, 'device'))
+            chips[dispositivo] = (ruta, etiqueta)
+            chips.setdefault(os.path.basename(dispositivo), (ruta, etiqueta))
+
+        sensores = {}
+
+        for disco in discos:
+            dispositivo = os.path.realpath(
+                os.path.join(self.raiz_sys, 'block', disco, 'device')
+            )
+            chip = chips.get(dispositivo)
+
+            if chip is None:
+                coincidencia = self.PATRON_NVME.match(disco)
+
+                if coincidencia is not None:
+                    chip = chips.get(coincidencia.group(1))
+
+            if chip is None:
+                continue
+
+            try:
+                sensores[disco] = SensorHwmon(*chip)
+            except OSError:
+                continue
+
+        self._discos = discos
+        self._sensores = sensores
+
+    def cerrar(self):
+        '''Cierra los sensores abiertos, para volver a descubrirlos.'''
+        for sensor in self._sensores.values():
+            sensor.cerrar()
+
+        self._discos = None
+        self._sensores = {}
+
+    def leer(self, discos):
+        '''
+        Devuelve un dictionary donde la clave es el nombre del disco en el
+        kernel (por ejemplo, 'sda' o 'nvme0n1') y el valor es su temperatura
+        en grados Celsius, sólo para los discos que tienen un sensor en
+        hwmon. Si la lectura de un sensor falla, ese disco se omite y los
+        sensores se vuelven a descubrir en la siguiente lectura.
+        '''
+        discos = frozenset(discos)
+
+        if discos != self._discos:
+            self.cerrar()
+            self._descubrir(discos)
+
+        temperaturas = {}
+        fallo = False
+
+        for disco, sensor in self._sensores.items():
+            try:
+                temperaturas[disco] = sensor.leer()
+            except (OSError, ValueError):
+                # * Un disco retirado o un módulo del kernel descargado; la
+                # * topología o el próximo descubrimiento lo resuelven.
+                fallo = True
+
+        if fallo:
+            self.cerrar()
+
+        return temperaturas
@@ -0,0 +1,251 @@
+import json
+import os
+import re
+
+from collections import namedtuple
+from datetime import datetime
+
+import psutil
+
+# * Identidad estática de la CPU. 'topologia' es un tuple con un tuple
+# * (cpu lógica, paquete, núcleo) por cada CPU lógica.
+IdentidadCpu = namedtuple(
+    'IdentidadCpu',
+    [
+        'modelo', 'fabricante', 'paquetes', 'nucleos_fisicos',
+        'nucleos_logicos', 'topologia', 'origen'
+    ]
+)
+
+def _ruta_cache_por_defecto():
+    '''Devuelve la ruta por defecto del archivo de caché de la identidad.'''
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    else:
+        base = os.environ.get(
+            'XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')
+        )
+
+    return os.path.join(base, 'monitor-agent', 'identidad_cpu.json')
+
+class ProveedorIdentidadCpu:
+    '''
+    Obtiene el modelo, el fabricante, la topología y la cantidad de núcleos
+    de la CPU una sola vez por arranque del sistema. En Linux se leen
+    /proc/cpuinfo y /sys/devices/system/cpu; py-cpuinfo, que demora
+    considerablemente, sólo se usa como último recurso. El resultado se
+    guarda en un archivo de caché asociado al boot id, por lo que los
+    reinicios del agente no vuelven a calcularlo.
+    '''
+
+    PATRON_CPU = re.compile(r'^cpu(\d+)$')
+
+    def __init__(self, raiz_proc='/proc', raiz_sys='/sys', ruta_cache=None):
+        self.raiz_proc = raiz_proc
+        self.raiz_sys = raiz_sys
+        self.ruta_cache = ruta_cache or _ruta_cache_por_defecto()
+
+        self._identidad = None
+
+    def _leer_texto(self, ruta):
+        '''Devuelve el contenido de un archivo sin espacios.'''
+        with open(ruta, encoding='utf-8') as archivo:
+            return archivo.read().strip()
+
+    def _obtener_id_arranque(self):
+        '''
+        Devuelve un identificador del arranque actual del sistema: el boot id
+        del kernel en Linux, o la hora de arranque en otros sistemas.
+        '''
+        try:
+            return self._leer_texto(os.path.join(
+                self.raiz_proc, 'sys', 'kernel', 'random', 'boot_id'
+            ))
+        except OSError:
+            return f'arranque-{psutil.boot_time():.0f}'
+
+    def _leer_cache(self, id_arranque):
+        '''Devuelve la identidad guardada para este arranque, o None.'''
+        try:
+            with open(self.ruta_cache, encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+
+            if datos.get('id_arranque') != id_arranque:
+                return None
+
+            identidad = datos['identidad']
+            identidad['topologia'] = tuple(
+                tuple(cpu) for cpu in identidad['topologia']
+            )
+
+            return IdentidadCpu(**identidad)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _guardar_cache(self, id_arranque, identidad):
+        '''
+        Guarda la identidad en el archivo de caché. El archivo se reemplaza
+        de forma atómica, para que otra instancia nunca lea uno incompleto.
+        '''
+        temporal = f'{self.ruta_cache}.{os.getpid()}.tmp'
+
+        try:
+            os.makedirs(os.path.dirname(self.ruta_cache), exist_ok=True)
+
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(
+                    {
+                        'id_arranque': id_arranque,
+                        'identidad': identidad._asdict()
+                    },
+                    archivo
+                )
+
+            os.replace(temporal, self.ruta_cache)
+        except OSError as error:
+            print(
+                f'{datetime.now()} >>> *** No se pudo guardar la identidad de '
+                f'la CPU en {self.ruta_cache} ***'
+            )
+            print(error)
+
+    def _leer_cpuinfo(self):
+        '''
+        Devuelve una list con un dictionary de los campos de cada procesador
+        de /proc/cpuinfo, o una list vacía si no existe.
+        '''
+        try:
+            contenido = self._leer_texto(
+                os.path.join(self.raiz_proc, 'cpuinfo')
+            )
+        except OSError:
+            return []
+
+        procesadores = []
+
+        for bloque in contenido.split('\n\n'):
+            campos = {}
+
+            for linea in bloque.splitlines():
+                clave, separador, valor = linea.partition(':')
+
+                if separador:
+                    campos[clave.strip()] = valor.strip()
+
+            if campos:
+                procesadores.append(campos)
+
+        return procesadores
+
+    def _leer_topologia_sysfs(self):
+        '''
+        Devuelve la topología de las CPUs lógicas según
+        /sys/devices/system/cpu, o un tuple vacío si no está disponible.
+        '''
+        ruta_cpus = os.path.join(self.raiz_sys, 'devices', 'system', 'cpu')
+
+        try:
+            entradas = os.listdir(ruta_cpus)
+        except OSError:
+            return ()
+
+        topologia = []
+
+        for entrada in entradas:
+            coincidencia = self.PATRON_CPU.match(entrada)
+
+            if coincidencia is None:
+                continue
+
+            ruta_topologia = os.path.join(ruta_cpus, entrada, 'topology')
+
+            # * Las CPUs fuera de línea no tienen directorio de topología.
+            try:
+                paquete = int(self._leer_texto(
+                    os.path.join(ruta_topologia, 'physical_package_id')
+                ))
+                nucleo = int(self._leer_texto(
+                    os.path.join(ruta_topologia, 'core_id')
+                ))
+            except (OSError, ValueError):
+                continue
+
+            topologia.append((int(coincidencia.group(1)), paquete, nucleo))
+
+        return tuple(sorted(topologia))
+
+    def _topologia_cpuinfo(self, procesadores):
+        '''Devuelve la topología según 'physical id' y 'core id'.'''
+        topologia = []
+
+        for indice, campos in enumerate(procesadores):
+            try:
+                topologia.append((
+                    int(campos.get('processor', indice)),
+                    int(campos.get('physical id', 0)),
+                    int(campos.get(
+                        'core id', campos.get('processor', indice)
+                    ))
+                ))
+            except ValueError:
+                return ()
+
+        return tuple(sorted(topologia))
+
+    def _calcular(self):
+        '''Calcula la identidad de la CPU sin usar la caché.'''
+        procesadores = self._leer_cpuinfo()
+        primero = procesadores[0] if procesadores else {}
+
+        modelo = primero.get('model name') or primero.get('Model')
+        fabricante = primero.get('vendor_id') or primero.get('CPU implementer')
+        origen = 'proc'
+
+        topologia = self._leer_topologia_sysfs()
+        if not topologia:
+            topologia = self._topologia_cpuinfo(procesadores)
+
+        if not modelo:
+            # * Último recurso: py-cpuinfo, que se importa recién aquí, ya
+            # * que su importación y su consulta son costosas.
+            import cpuinfo
+
+            informacion = cpuinfo.get_cpu_info()
+            modelo = informacion.get('brand_raw')
+            fabricante = fabricante or informacion.get('vendor_id_raw')
+            origen = 'cpuinfo'
+
+        if topologia:
+            paquetes = len({paquete for _, paquete, _ in topologia})
+            nucleos_fisicos = len({
+                (paquete, nucleo) for _, paquete, nucleo in topologia
+            })
+            nucleos_logicos = len(topologia)
+        else:
+            paquetes = None
+            nucleos_fisicos = psutil.cpu_count(logical=False)
+            nucleos_logicos = psutil.cpu_count(logical=True)
+
+        return IdentidadCpu(
+            modelo, fabricante, paquetes, nucleos_fisicos, nucleos_logicos,
+            topologia, origen
+        )
+
+    def obtener(self):
+        '''
+        Devuelve la IdentidadCpu, calculándola sólo si no está en memoria ni
+        en la caché de este arranque.
+        '''
+        if self._identidad is not None:
+            return self._identidad
+
+        id_arranque = self._obtener_id_arranque()
+        identidad = self._leer_cache(id_arranque)
+
+        if identidad is None:
+            identidad = self._calcular()
+            self._guardar_cache(id_arranque, identidad)
+
+        self._identidad = identidad
+
+        return identidad
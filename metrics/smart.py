@@ -0,0 +1,474 @@
+import json
+import re
+import threading
+import time
+
+from collections import namedtuple
+from datetime import datetime
+
+# * Registro compacto de los atributos SMART de un disco. Los campos que el
+# * protocolo del disco no reporta quedan en None. Las unidades de datos
+# * leídas/escritas son de NVMe (1000 sectores de 512 bytes), y los LBAs
+# * leídos/escritos son de ATA.
+RegistroSmart = namedtuple(
+    'RegistroSmart',
+    [
+        'protocolo', 'temperatura', 'horas_encendido', 'ciclos_encendido',
+        'unidades_leidas', 'unidades_escritas', 'porcentaje_usado',
+        'errores_medios', 'sectores_reasignados', 'sectores_pendientes',
+        'lbas_leidos', 'lbas_escritos'
+    ]
+)
+
+REGISTRO_SMART_VACIO = RegistroSmart(*([None] * len(RegistroSmart._fields)))
+
+# * Bytes de una unidad de datos de NVMe (Data Units Read/Written).
+BYTES_UNIDAD_NVME = 512 * 1000
+
+class ParserSmart:
+    '''
+    Clase para convertir la salida de smartctl en un RegistroSmart en una
+    sola pasada. Usa la salida JSON (smartctl -j), y la salida de texto sólo
+    como alternativa cuando smartctl no soporta JSON.
+    '''
+
+    # * Atributos ATA, por ID, que se guardan en el registro.
+    ATRIBUTOS_ATA = {
+        5: 'sectores_reasignados',
+        9: 'horas_encendido',
+        12: 'ciclos_encendido',
+        190: 'temperatura',
+        194: 'temperatura',
+        197: 'sectores_pendientes',
+        241: 'lbas_escritos',
+        242: 'lbas_leidos',
+    }
+
+    # * Claves del registro de salud de NVMe que se guardan en el registro.
+    CLAVES_NVME_JSON = {
+        'temperature': 'temperatura',
+        'power_on_hours': 'horas_encendido',
+        'power_cycles': 'ciclos_encendido',
+        'data_units_read': 'unidades_leidas',
+        'data_units_written': 'unidades_escritas',
+        'percentage_used': 'porcentaje_usado',
+        'media_errors': 'errores_medios',
+    }
+
+    # * Mismas claves en la salida de texto de NVMe. Se comparan de forma
+    # * exacta para no confundir, por ejemplo, 'Temperature' con
+    # * 'Temperature Sensor 1' o 'Warning  Comp. Temperature Time'.
+    CLAVES_NVME_TEXTO = {
+        'Temperature': 'temperatura',
+        'Power On Hours': 'horas_encendido',
+        'Power Cycles': 'ciclos_encendido',
+        'Data Units Read': 'unidades_leidas',
+        'Data Units Written': 'unidades_escritas',
+        'Percentage Used': 'porcentaje_usado',
+        'Media and Data Integrity Errors': 'errores_medios',
+    }
+
+    # * IDs de los atributos ATA, como alternativa de expresión regular.
+    _IDS_ATA = '|'.join(str(identificador) for identificador in ATRIBUTOS_ATA)
+
+    # * smartctl indenta el JSON con dos espacios, por lo que cada clave de
+    # * primer nivel empieza una línea con esa indentación.
+    ENCABEZADO_ATA_JSON = '\n  "ata_smart_attributes": '
+    PATRON_CLAVE_JSON = re.compile(r'\n  "')
+
+    # * Identificador de un atributo que interesa en la tabla ATA de la
+    # * salida JSON.
+    PATRON_ID_ATA_JSON = re.compile(r'"id": (' + _IDS_ATA + r'),')
+
+    # * Línea de un atributo ATA que interesa en la salida de texto. El ID
+    # * ocupa las primeras columnas, por lo que sólo se separan las columnas
+    # * de las líneas que coinciden.
+    PATRON_ATA_TEXTO = re.compile(r'\n *(' + _IDS_ATA + r') ([^\n]*)')
+    ENCABEZADO_ATA_TEXTO = 'ID# ATTRIBUTE_NAME'
+
+    # * Línea 'clave: valor' del registro de salud de NVMe con una clave que
+    # * interesa.
+    PATRON_NVME_TEXTO = re.compile(
+        r'\n *(' + '|'.join(re.escape(clave) for clave in CLAVES_NVME_TEXTO)
+        + r'): +([\d,]+)%?(?!\S)'
+    )
+
+    def __init__(self):
+        self._decodificador = json.JSONDecoder()
+
+    def parsear(self, salida):
+        '''Devuelve el RegistroSmart de la salida de smartctl.'''
+        if not salida:
+            return REGISTRO_SMART_VACIO
+
+        if salida.lstrip().startswith('{'):
+            try:
+                return self.parsear_json(self.decodificar_json(salida))
+            except ValueError:
+                pass
+
+        return self.parsear_texto(salida)
+
+    def decodificar_json(self, salida):
+        '''
+        Decodifica la salida JSON de smartctl. La tabla de atributos ATA es
+        casi toda la salida, por lo que de ella sólo se decodifica el valor
+        crudo de los atributos que se guardan en el registro, y el resto de
+        la salida se decodifica sin la tabla. Si la salida no está indentada
+        como la de smartctl, se decodifica completa.
+        '''
+        inicio = salida.find(self.ENCABEZADO_ATA_JSON)
+
+        if inicio < 0:
+            return json.loads(salida)
+
+        # * La tabla termina donde empieza la siguiente clave de primer nivel.
+        siguiente = self.PATRON_CLAVE_JSON.search(
+            salida, inicio + len(self.ENCABEZADO_ATA_JSON)
+        )
+
+        if siguiente is None:
+            return json.loads(salida)
+
+        fin = siguiente.start()
+
+        try:
+            datos = json.loads(salida[:inicio] + salida[fin:])
+            datos['ata_smart_attributes'] = {
+                'table': self._decodificar_tabla_ata(salida, inicio, fin)
+            }
+        except ValueError:
+            return json.loads(salida)
+
+        return datos
+
+    def _decodificar_tabla_ata(self, salida, inicio, fin):
+        '''
+        Devuelve los atributos de la tabla ATA entre 'inicio' y 'fin' que se
+        guardan en el registro, con su ID y su valor crudo.
+        '''
+        atributos = []
+
+        for coincidencia in self.PATRON_ID_ATA_JSON.finditer(
+            salida, inicio, fin
+        ):
+            identificador = int(coincidencia.group(1))
+
+            # * En cada atributo, smartctl escribe 'raw' después de 'id'.
+            crudo = salida.find('"raw": ', coincidencia.end(), fin)
+
+            if crudo < 0:
+                raise ValueError(f'Atributo ATA {identificador} sin valor')
+
+            valor, _ = self._decodificador.raw_decode(salida, crudo + 7)
+            atributos.append({'id': identificador, 'raw': valor})
+
+        return atributos
+
+    def parsear_json(self, datos):
+        '''Devuelve el RegistroSmart de la salida JSON de smartctl ya decodificada.'''
+        valores = {}
+
+        protocolo = datos.get('device', {}).get('protocol')
+        valores['protocolo'] = protocolo
+
+        registro_nvme = datos.get('nvme_smart_health_information_log')
+
+        if registro_nvme is not None:
+            for clave, campo in self.CLAVES_NVME_JSON.items():
+                if clave in registro_nvme:
+                    valores[campo] = registro_nvme[clave]
+
+        atributos_ata = datos.get('ata_smart_attributes')
+
+        if atributos_ata is not None:
+            for atributo in atributos_ata.get('table', ()):
+                campo = self.ATRIBUTOS_ATA.get(atributo.get('id'))
+
+                if campo is None or campo in valores:
+                    continue
+
+                valor = self._valor_crudo_ata(atributo.get('raw', {}))
+
+                if valor is not None:
+                    valores[campo] = valor
+
+        # * Los valores normalizados por smartctl tienen prioridad sobre los
+        # * de las tablas, porque ya contemplan las particularidades de cada
+        # * fabricante.
+        temperatura = datos.get('temperature', {}).get('current')
+        if temperatura is not None:
+            valores['temperatura'] = temperatura
+
+        horas_encendido = datos.get('power_on_time', {}).get('hours')
+        if horas_encendido is not None:
+            valores['horas_encendido'] = horas_encendido
+
+        ciclos_encendido = datos.get('power_cycle_count')
+        if ciclos_encendido is not None:
+            valores['ciclos_encendido'] = ciclos_encendido
+
+        return REGISTRO_SMART_VACIO._replace(**valores)
+
+    def _valor_crudo_ata(self, crudo):
+        '''
+        Devuelve el valor crudo de un atributo ATA. Se usa el primer número
+        del texto, ya que algunos atributos (como la temperatura) empaquetan
+        el mínimo y el máximo en el valor entero.
+        '''
+        texto = crudo.get('string')
+
+        if texto:
+            numero = texto.split(maxsplit=1)[0]
+
+            if numero.isdigit():
+                return int(numero)
+
+        return crudo.get('value')
+
+    def parsear_texto(self, salida):
+        '''
+        Devuelve el RegistroSmart de la salida de texto de smartctl. Las
+        líneas que interesan se buscan con expresiones regulares sobre la
+        salida completa, sin recorrer las líneas una por una.
+        '''
+        valores = {}
+
+        # * Las expresiones buscan el inicio de cada línea.
+        salida = '\n' + salida
+
+        # * La tabla de atributos ATA y el registro de salud de NVMe no
+        # * aparecen en la misma salida, por lo que el registro de NVMe sólo
+        # * se busca si no está el encabezado de la tabla ATA.
+        tabla_ata = self.ENCABEZADO_ATA_TEXTO in salida
+
+        if not tabla_ata:
+            for clave, numero in self.PATRON_NVME_TEXTO.findall(salida):
+                valores['protocolo'] = 'NVMe'
+                valores[self.CLAVES_NVME_TEXTO[clave]] = int(
+                    numero.replace(',', '')
+                )
+
+            if valores:
+                return REGISTRO_SMART_VACIO._replace(**valores)
+
+        # * Columnas de un atributo ATA después del ID: nombre, flag, valor,
+        # * peor, umbral, tipo, actualizado, cuándo falló y valor crudo. Si
+        # * un campo aparece en varios atributos (como la temperatura en 190
+        # * y 194), se usa el primero con un valor crudo numérico.
+        for identificador, resto in self.PATRON_ATA_TEXTO.findall(salida):
+            campo = self.ATRIBUTOS_ATA[int(identificador)]
+
+            if campo in valores:
+                continue
+
+            columnas = resto.split(None, 9)
+
+            if len(columnas) >= 9:
+                numero = columnas[8].replace(',', '')
+
+                if numero.isdigit():
+                    valores[campo] = int(numero)
+
+        if valores or tabla_ata:
+            valores['protocolo'] = 'ATA'
+
+        return REGISTRO_SMART_VACIO._replace(**valores)
+
+# * Valores SMART de un disco tal como los devuelve la caché. El estado es el
+# * de la última ejecución de smartctl ('ok', 'error' o 'timeout'), y la edad
+# * son los segundos desde que se obtuvieron los valores.
+RegistroCacheSmart = namedtuple(
+    'RegistroCacheSmart', ['estado', 'registro', 'edad']
+)
+
+class _EntradaCacheSmart:
+    '''Valores SMART y marcas de tiempo de un dispositivo en la caché.'''
+
+    def __init__(self):
+        self.estado = None
+        self.registro = REGISTRO_SMART_VACIO
+        self.obtenido = None
+        self.actualizado = {}
+
+class CacheSmart:
+    '''
+    Caché de los atributos SMART de cada dispositivo, con un tiempo de vida
+    distinto para cada clase de atributo. smartctl sólo se ejecuta sobre los
+    dispositivos que tienen alguna clase de atributo vencida.
+    '''
+
+    # * Atributos que pertenecen a cada clase, y tiempo de vida por defecto
+    # * de cada clase en segundos. La temperatura cambia en segundos, pero
+    # * las horas de encendido y los datos leídos/escritos cambian en
+    # * minutos u horas.
+    CLASES_ATRIBUTOS = {
+        'temperatura': ('temperatura',),
+        'contadores': (
+            'horas_encendido', 'ciclos_encendido', 'unidades_leidas',
+            'unidades_escritas', 'porcentaje_usado', 'errores_medios',
+            'sectores_reasignados', 'sectores_pendientes', 'lbas_leidos',
+            'lbas_escritos'
+        ),
+    }
+    TTL_POR_DEFECTO = {
+        'temperatura': 30,
+        'contadores': 600,
+    }
+
+    def __init__(self, smartmontools, ttl=None, salud=None):
+        self.smartmontools = smartmontools
+        self.parser = ParserSmart()
+
+        # * Registro de interruptores (utils.salud_fuentes.RegistroSalud) de
+        # * cada dispositivo, bajo el nombre 'smart.<dispositivo>'. Sin él,
+        # * smartctl se reintenta en cada consulta sobre los dispositivos
+        # * que fallan.
+        self.salud = salud
+
+        self._candado = threading.Lock()
+        self._entradas = {}
+        self.ejecuciones_smartctl = 0
+
+        self.configurar_ttl(ttl)
+
+    def configurar_ttl(self, ttl):
+        '''
+        Define el tiempo de vida en segundos de cada clase de atributo. Las
+        clases que no se indiquen usan el valor por defecto.
+        '''
+        ttl_completo = dict(self.TTL_POR_DEFECTO)
+        ttl_completo.update(ttl or {})
+
+        self.ttl = ttl_completo
+
+    def _clases_vencidas(self, entrada, ahora, clases=CLASES_ATRIBUTOS):
+        '''Devuelve las clases de atributos vencidas de una entrada.'''
+        return [
+            clase for clase in clases
+            if ahora - entrada.actualizado.get(clase, float('-inf')) >=
+            self.ttl[clase]
+        ]
+
+    def obtener(self, dispositivos, timeout=10, sin_temperatura=frozenset()):
+        '''
+        Devuelve un dictionary donde la clave es el dispositivo y el valor es
+        un RegistroCacheSmart, ejecutando smartctl en lote sólo sobre los
+        dispositivos con algún atributo vencido.
+
+        En los dispositivos de 'sin_temperatura', la temperatura se obtiene
+        de otra fuente (hwmon), por lo que su vencimiento no ejecuta
+        smartctl: sólo lo hacen los contadores de vida útil.
+        '''
+        clases_sin_temperatura = tuple(
+            clase for clase in self.CLASES_ATRIBUTOS if clase != 'temperatura'
+        )
+
+        ahora = time.monotonic()
+
+        with self._candado:
+            # * Se descartan las entradas de los dispositivos que ya no
+            # * existen, para que la caché no crezca con los discos retirados.
+            for dispositivo in list(self._entradas):
+                if dispositivo not in dispositivos:
+                    del self._entradas[dispositivo]
+
+                    if self.salud is not None:
+                        self.salud.olvidar(f'smart.{dispositivo}')
+
+            vencidos = [
+                dispositivo for dispositivo in dispositivos
+                if self._clases_vencidas(
+                    self._entradas.setdefault(
+                        dispositivo, _EntradaCacheSmart()
+                    ),
+                    ahora,
+                    clases_sin_temperatura
+                    if dispositivo in sin_temperatura
+                    else self.CLASES_ATRIBUTOS
+                )
+            ]
+
+        # * Los dispositivos con el interruptor abierto no se consultan, y
+        # * conservan sus últimos valores.
+        if self.salud is not None:
+            vencidos = [
+                dispositivo for dispositivo in vencidos
+                if self.salud.fuente(f'smart.{dispositivo}').permitir()
+            ]
+
+        if vencidos:
+            resultados = self.smartmontools.ejecutar_smartmontools_lote(
+                vencidos, timeout=timeout
+            )
+            self._actualizar(resultados)
+
+        ahora = time.monotonic()
+
+        with self._candado:
+            return {
+                dispositivo: self._registro(
+                    self._entradas[dispositivo], ahora
+                )
+                for dispositivo in dispositivos
+            }
+
+    def _actualizar(self, resultados):
+        '''Actualiza las entradas con los resultados de smartctl.'''
+        ahora = time.monotonic()
+
+        with self._candado:
+            self.ejecuciones_smartctl += len(resultados)
+
+            for dispositivo, resultado in resultados.items():
+                entrada = self._entradas.get(dispositivo)
+
+                if entrada is None:
+                    continue
+
+                entrada.estado = resultado.estado
+
+                # * Si smartctl falló, se conservan los valores anteriores y
+                # * no se renuevan las marcas de tiempo, para reintentar en la
+                # * siguiente consulta (o, con un registro de interruptores,
+                # * cuando el interruptor del dispositivo lo permita).
+                if resultado.estado != 'ok':
+                    if self.salud is not None:
+                        self.salud.fuente(
+                            f'smart.{dispositivo}'
+                        ).registrar_fallo(
+                            resultado.duracion,
+                            f'{resultado.estado}: {resultado.error}'
+                        )
+                        continue
+
+                    print(
+                        f'{datetime.now()} >>> *** Error al ejecutar '
+                        f'Smartmontools en {dispositivo} '
+                        f'({resultado.estado}) ***'
+                    )
+                    print(resultado.error)
+
+                    continue
+
+                if self.salud is not None:
+                    self.salud.fuente(f'smart.{dispositivo}').registrar_exito(
+                        resultado.duracion
+                    )
+
+                # * Una ejecución de smartctl trae todos los atributos, por lo
+                # * que se renuevan todas las clases a la vez.
+                entrada.registro = (
+                    resultado.registro if resultado.registro is not None
+                    else self.parser.parsear(resultado.salida)
+                )
+                entrada.obtenido = ahora
+
+                for clase in self.CLASES_ATRIBUTOS:
+                    entrada.actualizado[clase] = ahora
+
+    def _registro(self, entrada, ahora):
+        '''Devuelve el RegistroCacheSmart inmutable de una entrada.'''
+        edad = None if entrada.obtenido is None else ahora - entrada.obtenido
+
+        return RegistroCacheSmart(entrada.estado, entrada.registro, edad)
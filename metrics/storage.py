@@ -2,9 +2,9 @@ import psutil
 import os
 import subprocess
 import json
-import sys
 
-from datetime import datetime
+# * Parser de la salida de smartctl.
+import metrics.smart as smart
 
 # * WMI sólo es importado si el sistema operativo es Windows.
 if os.name == 'nt':
@@ -13,12 +13,16 @@ if os.name == 'nt':
 class Storage:
     '''Clase para obtener las métricas del storage.'''
 
+    def __init__(self):
+        self._parser_smart = smart.ParserSmart()
+
     def obtener_almacenamiento_windows(self):
         '''
         Devuelve la información del almacenamiento en Windows en un tuple,
-        donde cada elemento es un dictionary que contiene el modelo del disco
-        y un tuple de particiones. Cada partición es un dictionary,
-        conteniendo la unidad de la partición y el sistema de archivos.
+        donde cada elemento es un dictionary que contiene la clave que
+        identifica al disco, el modelo del disco y un tuple de particiones.
+        Cada partición es un dictionary, conteniendo la unidad de la partición
+        y el sistema de archivos.
         '''
         instancia_wmi = wmi.WMI()
 
@@ -42,6 +46,7 @@ class Storage:
             particiones = tuple(particiones)
 
             almacenamiento.append({
+                'clave': disco.DeviceID,
                 'modelo': modelo,
                 'particiones': particiones
             })
@@ -53,80 +58,90 @@ class Storage:
     def obtener_almacenamiento_linux(self):
         '''
         Devuelve la información del almacenamiento en Linux en un tuple,
-        donde cada elemento es un dictionary que contiene el nombre del
-        dispositivo, el modelo y un tuple de particiones. Cada partición es un
-        dictionary, conteniendo la unidad de la partición y el sistema de
-        archivos.
+        donde cada elemento es un dictionary que contiene la clave que
+        identifica al disco, el nombre del dispositivo, el nombre del
+        dispositivo de bloque en el kernel, el modelo y un tuple de
+        particiones. Cada partición es un dictionary, conteniendo la unidad de
+        la partición, el nombre del dispositivo de bloque en el kernel y el
+        sistema de archivos. Si lsblk falla, lanza la excepción, para que el
+        interruptor de la fuente la registre.
         '''
         almacenamiento = []
 
-        try:
-            comando = [
-                'lsblk', '-J', '-o', 'NAME,MODEL,MOUNTPOINTS,TYPE,FSTYPE'
-            ]
+        comando = [
+            'lsblk', '-J', '-o', 'NAME,MODEL,MOUNTPOINTS,TYPE,FSTYPE'
+        ]
 
-            resultado = subprocess.run(
-                comando, capture_output=True, text=True, check=True
-            )
+        resultado = subprocess.run(
+            comando, capture_output=True, text=True, check=True
+        )
 
-            resultadoJSON = json.loads(resultado.stdout)['blockdevices']
+        resultadoJSON = json.loads(resultado.stdout)['blockdevices']
 
-            almacenamiento = []
+        almacenamiento = []
 
-            for disco in resultadoJSON:
-                if disco.get('type') == 'disk':
-                    nombre = disco.get('name')
-                    modelo = disco.get('model')
+        for disco in resultadoJSON:
+            if disco.get('type') == 'disk':
+                nombre = disco.get('name')
+                modelo = disco.get('model')
 
-                    if nombre.startswith('nvme'):
-                        nombre = '/dev/' + nombre.rsplit('n', 1)[0]
-                    elif nombre.startswith('sd'):
-                        nombre = '/dev/' + nombre
-                    elif nombre.startswith('mmcblk'):
-                        nombre = '/dev/' + nombre
+                if nombre.startswith('nvme'):
+                    nombre = '/dev/' + nombre.rsplit('n', 1)[0]
+                elif nombre.startswith('sd'):
+                    nombre = '/dev/' + nombre
+                elif nombre.startswith('mmcblk'):
+                    nombre = '/dev/' + nombre
 
-                    particiones = []
+                particiones = []
 
-                    for particion in disco.get('children'):
-                        particiones.append({
-                            'particion': particion.get('mountpoints')[0],
-                            'sistema_archivos': particion.get('fstype')
-                        })
+                # * Un disco sin particiones no tiene 'children', y las
+                # * particiones sin montar no tienen uso que medir.
+                for particion in disco.get('children') or []:
+                    puntos_montaje = particion.get('mountpoints') or []
 
-                    particiones = tuple(particiones)
+                    if not puntos_montaje or puntos_montaje[0] is None:
+                        continue
 
-                    almacenamiento.append({
-                        'nombre': nombre,
-                        'modelo': modelo,
-                        'particiones': particiones
+                    particiones.append({
+                        'particion': puntos_montaje[0],
+                        'dispositivo': particion.get('name'),
+                        'sistema_archivos': particion.get('fstype')
                     })
 
-            almacenamiento = tuple(almacenamiento)
+                particiones = tuple(particiones)
 
-            return almacenamiento
-        except Exception as error:
-            print(f'{datetime.now()} >>> *** Error al ejecutar lsblk ***')
-            print(error)
+                # * El nombre del dispositivo de bloque en el kernel es
+                # * único, por lo que sirve como clave estable del disco
+                # * aunque se conecten o retiren otros discos.
+                almacenamiento.append({
+                    'clave': disco.get('name'),
+                    'nombre': nombre,
+                    'dispositivo': disco.get('name'),
+                    'modelo': modelo,
+                    'particiones': particiones
+                })
 
-            # * Si no se puede ejecutar lsblk, se finaliza el agente.
-            sys.exit(1)
+        almacenamiento = tuple(almacenamiento)
+
+        return almacenamiento
+
+    def obtener_registro_smart(self, ejecucion_smartctl):
+        '''
+        Devuelve el RegistroSmart del disco en base a la salida del comando
+        smartctl, en JSON o en texto, interpretándola en una sola pasada.
+        '''
+        return self._parser_smart.parsear(ejecucion_smartctl)
 
     def obtener_horas_encendido(self, ejecucion_smartctl):
         '''
         Devuelve las horas de encendido del disco en base a la salida del
         comando smartctl.
         '''
-        for linea in ejecucion_smartctl.splitlines():
-            if 'Power On Hours' in linea:
-                cadenas = linea.split()
-
-                for cadena in cadenas:
-                    horas_encendido = cadena.replace(',', '')
-
-                    if horas_encendido.isdigit():
-                        return int(horas_encendido)
+        horas_encendido = (
+            self.obtener_registro_smart(ejecucion_smartctl).horas_encendido
+        )
 
-        return -1
+        return -1 if horas_encendido is None else horas_encendido
 
     def obtener_datos_leidos_escritos(self, ejecucion_smartctl):
         '''
@@ -135,50 +150,18 @@ class Storage:
         el total de datos leídos y el segundo elemento es el total de datos
         escritos.
         '''
-        datos_leidos = None
-        datos_escritos = None
-
-        for linea in ejecucion_smartctl.splitlines():
-            if 'Data Units Read' in linea:
-                cadenas = linea.split()
-
-                for cadena in cadenas:
-                    valor = cadena.replace(',', '')
-
-                    if valor.isdigit():
-                        datos_leidos = int(valor)
-                        break
+        registro = self.obtener_registro_smart(ejecucion_smartctl)
 
-            elif 'Data Units Written' in linea:
-                cadenas = linea.split()
-
-                for cadena in cadenas:
-                    valor = cadena.replace(',', '')
-
-                    if valor.isdigit():
-                        datos_escritos = int(valor)
-                        break
-
-            # * Si ya se encontraron ambos valores, se sale del bucle.
-            if datos_leidos is not None and datos_escritos is not None:
-                break
-
-        return (datos_leidos, datos_escritos)
+        return (registro.unidades_leidas, registro.unidades_escritas)
 
     def obtener_temperatura(self, ejecucion_smartctl):
         '''
         Devuelve la temperatura del disco en base a la salida del comando
         smartctl.
         '''
-        for linea in ejecucion_smartctl.splitlines():
-            if 'Temperature' in linea:
-                cadenas = linea.split()
-
-                for cadena in cadenas:
-                    if cadena.isdigit():
-                        return int(cadena)
+        temperatura = self.obtener_registro_smart(ejecucion_smartctl).temperatura
 
-        return -1
+        return -1 if temperatura is None else temperatura
     
     def obtener_uso_particion(self, particion):
         '''
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import threading
+
+import psutil
+
+from datetime import datetime
+
+class TopologiaAlmacenamiento:
+    '''
+    Caché de la topología de los dispositivos de almacenamiento. La topología
+    sólo se vuelve a obtener (con lsblk en Linux o WMI en Windows) cuando
+    cambia una huella barata de calcular del estado de los dispositivos.
+    '''
+
+    def __init__(self, storage_metrics, sistema_operativo, raiz_proc='/proc',
+                 raiz_sys='/sys'):
+        self.storage_metrics = storage_metrics
+        self.sistema_operativo = sistema_operativo
+        self.raiz_proc = raiz_proc
+        self.raiz_sys = raiz_sys
+
+        self._candado = threading.Lock()
+        self._huella = None
+        self._almacenamiento = None
+        self.reconstrucciones = 0
+
+    def _calcular_huella_linux(self):
+        '''
+        Devuelve la huella de la topología en Linux, calculada a partir de
+        /proc/partitions, el listado de /sys/block y /proc/self/mountinfo.
+        '''
+        huella = hashlib.blake2b(digest_size=16)
+
+        for ruta in (
+            os.path.join(self.raiz_proc, 'partitions'),
+            os.path.join(self.raiz_proc, 'self', 'mountinfo'),
+        ):
+            with open(ruta, 'rb') as archivo:
+                huella.update(archivo.read())
+
+        for nombre in sorted(os.listdir(os.path.join(self.raiz_sys, 'block'))):
+            huella.update(nombre.encode())
+            huella.update(b'\0')
+
+        return huella.digest()
+
+    def _calcular_huella_windows(self):
+        '''
+        Devuelve la huella de la topología en Windows, calculada a partir de
+        las particiones montadas y de los discos físicos, ya que consultar
+        WMI es costoso.
+        '''
+        # * Los discos sin volúmenes montados no aparecen en las particiones,
+        # * pero sí en los contadores de entrada/salida ('PhysicalDrive0',
+        # * ...). psutil devuelve None si no hay discos.
+        discos = psutil.disk_io_counters(perdisk=True) or {}
+
+        return hash((
+            tuple(psutil.disk_partitions(all=False)), tuple(sorted(discos))
+        ))
+
+    def obtener(self):
+        '''
+        Devuelve la información del almacenamiento en un tuple con el mismo
+        formato que Storage.obtener_almacenamiento_linux() y
+        Storage.obtener_almacenamiento_windows(), reconstruyéndola sólo si
+        la huella de la topología cambió.
+        '''
+        with self._candado:
+            if self.sistema_operativo == 'nt':
+                huella = self._calcular_huella_windows()
+            if self.sistema_operativo == 'posix':
+                huella = self._calcular_huella_linux()
+
+            if huella != self._huella or self._almacenamiento is None:
+                if self._huella is not None:
+                    print(
+                        f'{datetime.now()} >>> *** Cambió la topología del '
+                        'almacenamiento ***'
+                    )
+
+                if self.sistema_operativo == 'nt':
+                    almacenamiento = (
+                        self.storage_metrics.obtener_almacenamiento_windows()
+                    )
+                if self.sistema_operativo == 'posix':
+                    almacenamiento = (
+                        self.storage_metrics.obtener_almacenamiento_linux()
+                    )
+
+                # * La huella sólo se actualiza si la topología se pudo
+                # * obtener, para reintentar en la siguiente consulta.
+                self._almacenamiento = almacenamiento
+                self._huella = huella
+                self.reconstrucciones += 1
+
+            return self._almacenamiento
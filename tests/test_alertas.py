@@ -0,0 +1,88 @@
+import config
+import utils.alertas as alertas
+
+def regla(metrica='cpu.uso', **parametros):
+    valores = {
+        'tipo': 'valor', 'condicion': 'mayor', 'umbral': 90, 'durante': 0,
+        'liberar': 90, 'enfriamiento': 0, 'mensaje': '{metrica}: {valor}'
+    }
+    valores.update(parametros)
+
+    return config.Regla(metrica=metrica, **valores)
+
+def evaluar(motor, reglas, serie, metrica='cpu.uso'):
+    '''Evalúa una serie de (marca, valor) y devuelve las marcas con alerta.'''
+    return [
+        marca for marca, valor in serie
+        if motor.evaluar(reglas, marca, ((metrica, valor),))
+    ]
+
+def test_histeresis_no_repite_la_alerta_hasta_liberar():
+    reglas = (regla(umbral=90, liberar=80),)
+    serie = [(0, 95), (1, 85), (2, 95), (3, 79), (4, 95)]
+
+    assert evaluar(alertas.MotorReglas(), reglas, serie) == [0, 4]
+
+def test_durante_exige_que_la_condicion_se_mantenga():
+    reglas = (regla(durante=10),)
+    serie = [(0, 95), (5, 95), (8, 50), (9, 95), (18, 95), (19, 95)]
+
+    assert evaluar(alertas.MotorReglas(), reglas, serie) == [19]
+
+def test_enfriamiento_entre_disparos():
+    reglas = (regla(enfriamiento=60),)
+    serie = [(0, 95), (1, 50), (30, 95), (31, 50), (61, 95)]
+
+    assert evaluar(alertas.MotorReglas(), reglas, serie) == [0, 61]
+
+def test_condicion_menor_y_comodin():
+    reglas = (regla(
+        'particion.*.libre', condicion='menor', umbral=10, liberar=10,
+        mensaje='{comodin}: {valor}'
+    ),)
+    motor = alertas.MotorReglas()
+
+    disparadas = motor.evaluar(reglas, 0, (
+        ('particion./home.libre', 5), ('particion./.libre', 50),
+        ('cpu.uso', 1)
+    ))
+
+    assert [(a.clave, a.mensaje) for a in disparadas] == [
+        ('particion./home.libre', '/home: 5')
+    ]
+
+def test_tasa_usa_la_muestra_anterior():
+    reglas = (regla(tipo='tasa', umbral=10, liberar=10),)
+    serie = [(0, 0), (1, 5), (2, 20), (4, 30)]
+
+    motor = alertas.MotorReglas()
+
+    assert evaluar(motor, reglas, serie) == [2]
+    assert motor.evaluar(reglas, 5, (('cpu.uso', 30),)) == ()
+
+def test_olvida_las_metricas_sin_muestras():
+    reglas = (regla('particion.*.libre', condicion='menor', umbral=10),)
+    motor = alertas.MotorReglas()
+
+    motor.evaluar(reglas, 0, (('particion./a.libre', 50),))
+    motor.evaluar(reglas, 0, (('particion./b.libre', 50),))
+    assert motor.pares == 2
+
+    # * Las métricas se buscan cada 'TIEMPO_OLVIDO' segundos, por lo que
+    # * en la segunda búsqueda sólo queda la métrica que sigue reportando,
+    # * y su estado (la alerta activa) se conserva al compactar los arrays.
+    olvido = alertas.MotorReglas.TIEMPO_OLVIDO
+    assert motor.evaluar(reglas, olvido, (('particion./b.libre', 5),))
+    assert motor.pares == 2
+
+    motor.evaluar(reglas, 2 * olvido, (('particion./b.libre', 5),))
+    assert motor.pares == 1
+    assert motor.evaluar(
+        reglas, 2 * olvido + 1, (('particion./b.libre', 5),)
+    ) == ()
+
+def test_recargar_las_reglas_reinicia_el_estado():
+    motor = alertas.MotorReglas()
+
+    assert motor.evaluar((regla(),), 0, (('cpu.uso', 95),))
+    assert motor.evaluar((regla(),), 1, (('cpu.uso', 95),))
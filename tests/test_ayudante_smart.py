@@ -0,0 +1,147 @@
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+import config
+import utils.ayudante_smart as ayudante_smart
+import utils.smartmontools as smartmontools
+
+def solicitud(dispositivos=('sda',), timeout=5, **otros):
+    datos = {
+        'version': smartmontools.VERSION_PROTOCOLO,
+        'dispositivos': list(dispositivos), 'timeout': timeout
+    }
+    datos.update(otros)
+
+    return datos
+
+class Lotes:
+    '''Ejecutor de lotes falso que registra los dispositivos recibidos.'''
+
+    def __init__(self):
+        self.llamadas = []
+
+    def __call__(self, dispositivos, timeout):
+        self.llamadas.append(list(dispositivos))
+
+        return {
+            dispositivo: smartmontools.ResultadoSmartctl(
+                'ok', f'salida de {dispositivo}', '', 0.1
+            )
+            for dispositivo in dispositivos
+        }
+
+@pytest.mark.parametrize('invalida', [
+    [],
+    solicitud(version=smartmontools.VERSION_PROTOCOLO + 1),
+    solicitud(version=None),
+    solicitud(dispositivos=()),
+    solicitud(dispositivos=['sda'] * (ayudante_smart.MAXIMO_DISPOSITIVOS + 1)),
+    solicitud(dispositivos=[1]),
+    solicitud(timeout=0),
+    solicitud(timeout=True),
+    solicitud(timeout='5'),
+    solicitud(timeout=config.TIMEOUT_MAXIMO + 1),
+])
+def test_rechaza_solicitudes_invalidas(invalida):
+    lotes = Lotes()
+    ayudante = ayudante_smart.AyudanteSmart(lotes)
+
+    respuesta = ayudante.atender(invalida)
+
+    assert set(respuesta) == {'error'}
+    assert ayudante.rechazadas == 1
+    assert lotes.llamadas == []
+
+def test_rechaza_solo_los_dispositivos_no_permitidos():
+    lotes = Lotes()
+    ayudante = ayudante_smart.AyudanteSmart(lotes)
+
+    respuesta = ayudante.atender(solicitud((
+        'sda', '/dev/nvme0n1', 'mmcblk0', 'zram0', '../sda', 'sda'
+    )))
+    resultados = respuesta['resultados']
+
+    assert lotes.llamadas == [['sda', '/dev/nvme0n1', 'mmcblk0']]
+    assert resultados['sda'][0] == 'ok'
+    assert resultados['zram0'][0] == 'error'
+    assert resultados['../sda'][0] == 'error'
+
+def test_cache_comparte_los_resultados_exitosos():
+    lotes = Lotes()
+    ayudante = ayudante_smart.AyudanteSmart(lotes, ttl=60)
+
+    ayudante.atender(solicitud(('sda', 'sdb')))
+    respuesta = ayudante.atender(solicitud(('sdb', 'sdc')))
+
+    assert lotes.llamadas == [['sda', 'sdb'], ['sdc']]
+    assert ayudante.aciertos_cache == 1
+    assert respuesta['resultados']['sdb'][1] == 'salida de sdb'
+
+def test_mensajes_por_socket():
+    extremo, otro = socket.socketpair()
+
+    with extremo, otro:
+        smartmontools.enviar_mensaje(extremo, {'a': [1, 'ñ']})
+        smartmontools.enviar_mensaje(extremo, {'b': None})
+
+        assert smartmontools.recibir_mensaje(otro) == {'a': [1, 'ñ']}
+        assert smartmontools.recibir_mensaje(otro) == {'b': None}
+
+        extremo.shutdown(socket.SHUT_WR)
+        assert smartmontools.recibir_mensaje(otro) is None
+
+def test_mensaje_demasiado_grande_o_invalido():
+    extremo, otro = socket.socketpair()
+
+    with extremo, otro:
+        smartmontools.enviar_mensaje(extremo, 'x' * 100)
+
+        with pytest.raises(ValueError):
+            smartmontools.recibir_mensaje(otro, maximo=50)
+
+    extremo, otro = socket.socketpair()
+
+    with extremo, otro:
+        extremo.sendall(b'\x00\x00\x00\x03{{{')
+
+        with pytest.raises(ValueError):
+            smartmontools.recibir_mensaje(otro)
+
+    extremo, otro = socket.socketpair()
+
+    with extremo, otro:
+        extremo.sendall(b'\x00\x00\x00\x10{}')
+        extremo.shutdown(socket.SHUT_WR)
+
+        with pytest.raises(ConnectionError):
+            smartmontools.recibir_mensaje(otro)
+
+def test_servidor_atiende_y_crea_el_socket_privado(tmp_path):
+    ruta = str(tmp_path / 'ayudante.sock')
+    servidor = ayudante_smart.ServidorAyudante(
+        ruta, ayudante_smart.AyudanteSmart(Lotes())
+    )
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+
+    try:
+        assert stat.S_IMODE(os.stat(ruta).st_mode) == 0o600
+
+        with socket.socket(socket.AF_UNIX) as cliente:
+            cliente.connect(ruta)
+
+            smartmontools.enviar_mensaje(cliente, solicitud())
+            respuesta = smartmontools.recibir_mensaje(cliente)
+
+            assert respuesta['resultados']['sda'][:2] == [
+                'ok', 'salida de sda'
+            ]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    assert not os.path.exists(ruta)
@@ -0,0 +1,143 @@
+import gzip
+import http.client
+
+import metrics.cpu as cpu
+import metrics.diskstats as diskstats
+import metrics.smart as smart
+import utils.exportador_prometheus as exportador_prometheus
+import utils.recoleccion as recoleccion
+
+def crear_instantanea(secuencia=1):
+    desglose = cpu.DesgloseCpu(10.0, 5.0, 1.0, 0.0)
+    metricas_cpu = recoleccion.MetricasCpu(
+        'Modelo "X"', 1, 2, ((20.0, 30.0), 25.0), ((desglose,) * 2, desglose),
+        ((40.0, 42.0), 41.0, None)
+    )
+    disco = recoleccion.MetricasDisco(
+        'sda', 'Disco\\A', 'timeout', 100, 35, (None, None),
+        smart.REGISTRO_SMART_VACIO._replace(horas_encendido=100),
+        (recoleccion.MetricasParticion('/', 'ext4', (100, 60, 40, 60.0)),)
+    )
+    rendimiento = diskstats.RendimientoIO(1, 2, 3, 4, 0.5, 0.25, 0.1, 5.0)
+    io = (recoleccion.MetricasIODisco(
+        'sda', rendimiento,
+        (recoleccion.MetricasIOParticion('/dev/sda1', rendimiento),)
+    ),)
+
+    return recoleccion.Instantanea(
+        secuencia, 0.0, metricas_cpu, (disco,), (), io=io
+    )
+
+def familias(cuerpo):
+    '''Devuelve un dictionary con las líneas de muestras de cada familia.'''
+    resultado = {}
+    actual = None
+
+    for linea in cuerpo.decode('utf-8').split('\n'):
+        if linea.startswith('# TYPE '):
+            actual = linea.split()[2]
+            assert actual not in resultado
+            resultado[actual] = []
+        elif linea.startswith(('# HELP ', '# EOF')) or not linea:
+            continue
+        else:
+            assert linea.startswith(actual)
+            resultado[actual].append(linea)
+
+    return resultado
+
+def test_cuerpo_termina_en_eof():
+    cuerpo = exportador_prometheus.renderizar_openmetrics(crear_instantanea())
+
+    assert cuerpo.endswith(b'\n# EOF\n')
+
+def test_cada_familia_tiene_tipo_y_descripcion():
+    lineas = exportador_prometheus.renderizar_openmetrics(
+        crear_instantanea()
+    ).decode('utf-8').split('\n')
+
+    for indice, linea in enumerate(lineas):
+        if linea.startswith('# TYPE '):
+            nombre = linea.split()[2]
+            assert lineas[indice + 1].startswith(f'# HELP {nombre} ')
+
+def test_muestras_y_etiquetas():
+    resultado = familias(
+        exportador_prometheus.renderizar_openmetrics(crear_instantanea())
+    )
+
+    assert resultado['monitor_agent_cpu'] == [
+        'monitor_agent_cpu_info{modelo="Modelo \\"X\\"",nucleos_fisicos="1",'
+        'nucleos_logicos="2"} 1'
+    ]
+    assert resultado['monitor_agent_cpu_uso_porcentaje'] == [
+        'monitor_agent_cpu_uso_porcentaje{nucleo="0"} 20.0',
+        'monitor_agent_cpu_uso_porcentaje{nucleo="1"} 30.0',
+    ]
+    assert resultado['monitor_agent_disco_smart_estado'] == [
+        'monitor_agent_disco_smart_estado'
+        f'{{monitor_agent_disco_smart_estado="{estado}",disco="sda"}} {valor}'
+        for estado, valor in (('ok', 0), ('error', 0), ('timeout', 1))
+    ]
+    assert resultado['monitor_agent_disco_temperatura_celsius'] == [
+        'monitor_agent_disco_temperatura_celsius'
+        '{disco="sda",modelo="Disco\\\\A"} 35'
+    ]
+    assert resultado['monitor_agent_particion_libre_bytes'] == [
+        'monitor_agent_particion_libre_bytes'
+        '{disco="sda",particion="/",sistema_archivos="ext4"} 40'
+    ]
+    assert len(resultado['monitor_agent_io_cola']) == 2
+
+def test_valores_desconocidos_se_omiten():
+    resultado = familias(
+        exportador_prometheus.renderizar_openmetrics(crear_instantanea())
+    )
+
+    # * Sin temperatura de paquete ni atributos SMART de NVMe, sus familias
+    # * no se publican.
+    assert 'monitor_agent_cpu_temperatura_paquete_celsius' not in resultado
+    assert 'monitor_agent_disco_unidades_leidas' not in resultado
+    assert 'monitor_agent_disco_horas_encendido' in resultado
+
+def test_instantanea_vacia():
+    cuerpo = exportador_prometheus.renderizar_openmetrics(
+        recoleccion.Instantanea(1, 0.0, None, None, ())
+    )
+
+    assert cuerpo == b'# EOF\n'
+
+def test_exportador_descarta_instantaneas_anteriores_y_sirve_gzip():
+    exportador = exportador_prometheus.ExportadorPrometheus(puerto=0)
+    exportador.actualizar(crear_instantanea(2))
+    exportador.actualizar(crear_instantanea(1))
+
+    assert exportador.renderizados == 1
+
+    exportador.iniciar()
+
+    try:
+        conexion = http.client.HTTPConnection(
+            exportador.direccion, exportador.puerto, timeout=5
+        )
+        conexion.request(
+            'GET', '/metrics', headers={'Accept-Encoding': 'gzip'}
+        )
+        respuesta = conexion.getresponse()
+
+        assert respuesta.status == 200
+        assert respuesta.getheader('Content-Type') == (
+            exportador_prometheus.TIPO_CONTENIDO
+        )
+        assert gzip.decompress(respuesta.read()) == (
+            exportador.obtener_cuerpo()[0]
+        )
+
+        conexion.request('GET', '/otra')
+        respuesta = conexion.getresponse()
+        respuesta.read()
+
+        assert respuesta.status == 404
+        conexion.close()
+    finally:
+        exportador.detener()
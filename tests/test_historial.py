@@ -0,0 +1,117 @@
+import math
+import random
+
+import pytest
+
+import utils.historial as historial
+
+def aplanar(segmentos):
+    '''Une los segmentos (memoryviews) de una columna de una ventana.'''
+    return [valor for segmento in segmentos for valor in segmento]
+
+def test_buffer_reemplaza_las_muestras_mas_antiguas():
+    buffer = historial.BufferCircular(4)
+
+    for marca in range(6):
+        buffer.agregar(marca, marca * 10)
+
+    ventana = buffer.ventana()
+
+    assert buffer.cantidad == 4
+    assert buffer.primera_marca() == 2
+    assert buffer.ultimo() == (5, 50)
+    assert aplanar(ventana.marcas) == [2, 3, 4, 5]
+    assert aplanar(ventana.valores) == [20, 30, 40, 50]
+
+    # * La ventana cruza el final del buffer, por lo que tiene dos segmentos.
+    assert len(ventana.marcas) == 2
+
+def test_buffer_ventana_por_rango_cruzando_el_final():
+    buffer = historial.BufferCircular(5)
+
+    for marca in range(8):
+        buffer.agregar(marca, marca)
+
+    assert aplanar(buffer.ventana(4, 6).marcas) == [4, 5, 6]
+    assert aplanar(buffer.ventana(desde=6).marcas) == [6, 7]
+    assert aplanar(buffer.ventana(hasta=3).marcas) == [3]
+    assert aplanar(buffer.ventana(8).marcas) == []
+    assert aplanar(buffer.ventana(0, 2).marcas) == []
+
+def test_buffer_vacio():
+    buffer = historial.BufferCircular(3)
+
+    assert buffer.ultimo() is None
+    assert buffer.primera_marca() is None
+    assert buffer.ventana() == ((), ())
+
+def test_historial_olvida_las_series_sin_muestras():
+    series = historial.HistorialMetricas(10, olvido=100)
+
+    series.agregar(0, (('disco.sda.temperatura', 30), ('cpu.uso', 5)))
+    series.agregar(100, (('cpu.uso', 6),))
+    series.agregar(200, (('cpu.uso', 7),))
+
+    assert list(series.nombres()) == ['cpu.uso']
+    assert series.ultimo('cpu.uso') == (200, 7)
+
+def cuantil_exacto(muestras, cuantil):
+    muestras = sorted(muestras)
+    posicion = cuantil * (len(muestras) - 1)
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(muestras) - 1)
+
+    return muestras[inferior] + (posicion - inferior) * (
+        muestras[superior] - muestras[inferior]
+    )
+
+def test_p2_es_exacto_con_pocas_muestras():
+    estimador = historial.EstimadorP2(0.95)
+
+    assert math.isnan(estimador.valor())
+
+    for valor in (4, 1, 3):
+        estimador.agregar(valor)
+
+    assert estimador.valor() == cuantil_exacto((4, 1, 3), 0.95)
+
+def test_p2_aproxima_el_cuantil():
+    generador = random.Random(1)
+
+    for cuantil in (0.5, 0.95):
+        estimador = historial.EstimadorP2(cuantil)
+        muestras = [generador.gauss(50, 10) for _ in range(5000)]
+
+        for valor in muestras:
+            estimador.agregar(valor)
+
+        assert estimador.valor() == pytest.approx(
+            cuantil_exacto(muestras, cuantil), abs=1
+        )
+
+def test_p2_reiniciar_descarta_las_muestras():
+    estimador = historial.EstimadorP2(0.95)
+
+    for valor in range(100):
+        estimador.agregar(valor)
+
+    estimador.reiniciar()
+    estimador.agregar(7)
+
+    assert estimador.cantidad == 1
+    assert estimador.valor() == 7
+
+def test_consulta_completa_el_resumen_con_muestras_crudas():
+    serie = historial.SerieMetrica(100, ((10, 10),))
+
+    for marca in range(25):
+        serie.agregar(marca, marca)
+
+    resultado = serie.consultar(0, resolucion=10)
+
+    # * Las cubetas 0 y 10 están cerradas; las muestras 20 a 24 vienen de
+    # * las crudas, con su valor en todas las columnas.
+    assert resultado.resolucion == 10
+    assert aplanar(resultado.ventana.marcas) == [0, 10, 20, 21, 22, 23, 24]
+    assert aplanar(resultado.ventana.promedio)[:2] == [4.5, 14.5]
+    assert aplanar(resultado.ventana.maximo) == [9, 19, 20, 21, 22, 23, 24]
@@ -0,0 +1,107 @@
+import pytest
+
+import config
+import utils.salud_fuentes as salud_fuentes
+
+CONFIGURACION = config.Fuentes(
+    fallos_para_abrir=3, backoff_inicial=10, backoff_maximo=40
+)
+
+class Reloj:
+    '''Reloj monótono falso que sólo avanza cuando el test lo indica.'''
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(salud_fuentes.time, 'monotonic', reloj)
+    return reloj
+
+def fallar():
+    raise OSError('sin respuesta')
+
+def test_se_abre_tras_fallos_consecutivos(reloj):
+    interruptor = salud_fuentes.InterruptorFuente('prueba', CONFIGURACION)
+
+    assert interruptor.llamar(lambda: 5) == (5, False, 0.0)
+
+    for _ in range(2):
+        resultado = interruptor.llamar(fallar)
+        assert interruptor.estado == salud_fuentes.CERRADO
+
+    assert resultado.valor == 5 and resultado.obsoleto
+
+    interruptor.llamar(fallar)
+    assert interruptor.estado == salud_fuentes.ABIERTO
+
+    # * Con el interruptor abierto, la fuente no se llama.
+    llamadas = []
+    resultado = interruptor.llamar(lambda: llamadas.append(1))
+
+    assert llamadas == []
+    assert resultado.valor == 5 and resultado.obsoleto
+    assert interruptor.omitidas == 1
+
+def test_exito_reinicia_los_fallos_consecutivos(reloj):
+    interruptor = salud_fuentes.InterruptorFuente('prueba', CONFIGURACION)
+
+    interruptor.llamar(fallar)
+    interruptor.llamar(fallar)
+    interruptor.llamar(lambda: 1)
+    interruptor.llamar(fallar)
+    interruptor.llamar(fallar)
+
+    assert interruptor.estado == salud_fuentes.CERRADO
+    assert interruptor.errores == 4
+
+def test_prueba_semiabierta_cierra_o_duplica_la_espera(reloj):
+    interruptor = salud_fuentes.InterruptorFuente('prueba', CONFIGURACION)
+
+    for _ in range(3):
+        interruptor.llamar(fallar)
+
+    reloj.ahora += 9.9
+    assert not interruptor.permitir()
+
+    # * Pasada la espera, se permite una única consulta de prueba.
+    reloj.ahora += 0.1
+    assert interruptor.permitir()
+    assert interruptor.estado == salud_fuentes.SEMIABIERTO
+    assert not interruptor.permitir()
+
+    interruptor.registrar_fallo(0.0, 'sigue sin responder')
+    assert interruptor.estado == salud_fuentes.ABIERTO
+
+    reloj.ahora += 10
+    assert not interruptor.permitir()
+
+    reloj.ahora += 10
+    assert interruptor.llamar(lambda: 7) == (7, False, 0.0)
+    assert interruptor.estado == salud_fuentes.CERRADO
+
+def test_la_espera_se_limita_al_maximo(reloj):
+    interruptor = salud_fuentes.InterruptorFuente('prueba', CONFIGURACION)
+
+    for _ in range(3):
+        interruptor.llamar(fallar)
+
+    for espera in (10, 20, 40, 40):
+        reloj.ahora += espera
+        interruptor.llamar(fallar)
+
+    assert interruptor.obtener_estadisticas().proximo_intento == 40
+
+def test_registro_crea_y_olvida_interruptores(reloj):
+    registro = salud_fuentes.RegistroSalud(CONFIGURACION)
+
+    interruptor = registro.fuente('particion./')
+    assert registro.fuente('particion./') is interruptor
+
+    registro.olvidar('particion./')
+    assert registro.fuente('particion./') is not interruptor
+    assert list(registro.obtener_estadisticas()) == ['particion./']
@@ -0,0 +1,94 @@
+import os
+
+import config
+import utils.segmentos as segmentos
+
+def configuracion(directorio, retencion_cruda=100, olvido=3600):
+    return config.Historial(
+        capacidad=1000,
+        niveles=(config.NivelHistorial(10, 100),),
+        olvido_segundos=olvido,
+        persistencia=config.Persistencia(
+            habilitada=True, directorio=str(directorio),
+            muestras_por_segmento=1000, rotacion_segundos=100,
+            escritura_segundos=0, fsync_segundos=0,
+            retencion_cruda=retencion_cruda
+        )
+    )
+
+def aplanar(segmentos_columna):
+    return [valor for segmento in segmentos_columna for valor in segmento]
+
+def llenar(almacen, nombre, marcas):
+    for marca in marcas:
+        almacen.agregar(marca, ((nombre, marca),))
+
+    almacen._escribir()
+
+def test_serie_rota_por_tamano_y_por_periodo(tmp_path):
+    serie = segmentos.SerieDisco(
+        str(tmp_path / 'serie'), segmentos.historial.VentanaSerie, 4, 100
+    )
+
+    # * 4 filas por segmento, y un segmento nuevo al pasar de 99 a 100.
+    serie.escribir([(marca, marca) for marca in (0, 1, 2, 3, 4, 98, 99, 100)])
+
+    assert [segmento.inicio for segmento in serie.segmentos] == [0, 4, 100]
+    assert aplanar(serie.ventana(2, 99).marcas) == [2, 3, 4, 98, 99]
+
+    # * Una fila anterior a la última escrita se descarta.
+    serie.escribir([(50, 50)])
+    assert aplanar(serie.ventana().marcas)[-1] == 100
+
+def test_almacen_persiste_y_se_reabre(tmp_path):
+    almacen = segmentos.AlmacenSegmentos(configuracion(tmp_path))
+    llenar(almacen, 'particion./home.libre', range(150))
+    almacen.cerrar()
+
+    reabierto = segmentos.AlmacenSegmentos(configuracion(tmp_path))
+    resultado = reabierto.consultar('particion./home.libre', 90, 110)
+
+    assert reabierto.nombres() == ('particion./home.libre',)
+    assert resultado.resolucion == 0
+    assert aplanar(resultado.ventana.valores) == list(range(90, 111))
+
+def test_consultar_una_metrica_desconocida_no_crea_nada(tmp_path):
+    almacen = segmentos.AlmacenSegmentos(configuracion(tmp_path))
+
+    resultado = almacen.consultar('cpu.uso')
+
+    assert resultado.ventana == ((), ())
+    assert os.listdir(tmp_path) == []
+
+def test_compactar_genera_cubetas_completas(tmp_path):
+    almacen = segmentos.AlmacenSegmentos(configuracion(tmp_path))
+    llenar(almacen, 'cpu.uso', range(300))
+
+    # * Sólo el segmento crudo de 0 a 99 es más antiguo que la retención.
+    almacen._compactar(250)
+
+    resultado = almacen.consultar('cpu.uso', 0, resolucion=10)
+    marcas = aplanar(resultado.ventana.marcas)
+
+    assert resultado.resolucion == 10
+    assert marcas == list(range(0, 100, 10)) + list(range(100, 300))
+    assert aplanar(resultado.ventana.promedio)[:10] == [
+        cubeta + 4.5 for cubeta in range(0, 100, 10)
+    ]
+    assert aplanar(resultado.ventana.maximo)[9] == 99
+
+    # * Un segundo paso no vuelve a compactar ni parte las cubetas.
+    almacen._compactar(260)
+    resultado = almacen.consultar('cpu.uso', 0, resolucion=10)
+    assert aplanar(resultado.ventana.marcas) == marcas
+
+def test_compactar_olvida_las_metricas_inactivas(tmp_path):
+    almacen = segmentos.AlmacenSegmentos(configuracion(tmp_path, olvido=50))
+    llenar(almacen, 'disco.sdb.temperatura', range(300))
+
+    # * Todo vence: las crudas se compactan y los resúmenes (100 cubetas de
+    # * 10 segundos) también, por lo que se elimina el directorio.
+    almacen._compactar(10000)
+
+    assert almacen.nombres() == ()
+    assert almacen.consultar('disco.sdb.temperatura').ventana == ((), ())
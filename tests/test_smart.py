@@ -0,0 +1,74 @@
+import json
+
+from pathlib import Path
+
+import pytest
+
+import metrics.smart as smart
+
+RUTA_FIXTURES = (
+    Path(__file__).parent.parent / 'benchmarks' / 'fixtures' / 'smartctl'
+)
+
+ATA = smart.REGISTRO_SMART_VACIO._replace(
+    protocolo='ATA', temperatura=34, horas_encendido=26512,
+    ciclos_encendido=408, sectores_reasignados=0, sectores_pendientes=0,
+    lbas_leidos=42949672960, lbas_escritos=21474836480
+)
+NVME = smart.REGISTRO_SMART_VACIO._replace(
+    protocolo='NVMe', temperatura=38, horas_encendido=6731,
+    ciclos_encendido=1114, unidades_leidas=24613541,
+    unidades_escritas=31470112, porcentaje_usado=3, errores_medios=0
+)
+
+def leer(nombre):
+    return (RUTA_FIXTURES / nombre).read_text(encoding='utf-8')
+
+@pytest.mark.parametrize('nombre, esperado', [
+    ('ata.json', ATA), ('ata.txt', ATA), ('nvme.json', NVME),
+    ('nvme.txt', NVME),
+])
+def test_fixtures(nombre, esperado):
+    assert smart.ParserSmart().parsear(leer(nombre)) == esperado
+
+def test_json_sin_indentar_o_con_la_tabla_al_final():
+    parser = smart.ParserSmart()
+    datos = json.loads(leer('ata.json'))
+
+    assert parser.parsear(json.dumps(datos)) == ATA
+
+    tabla = datos.pop('ata_smart_attributes')
+    datos['ata_smart_attributes'] = tabla
+
+    assert parser.parsear(json.dumps(datos, indent=2)) == ATA
+
+def test_decodificacion_parcial_igual_a_la_completa():
+    parser = smart.ParserSmart()
+    salida = leer('ata.json')
+
+    assert parser.parsear_json(parser.decodificar_json(salida)) == (
+        parser.parsear_json(json.loads(salida))
+    )
+
+def test_texto_ata_sin_encabezado_y_valor_no_numerico():
+    salida = leer('ata.txt')
+    parser = smart.ParserSmart()
+
+    assert parser.parsear(salida.replace('ID# ATTRIBUTE_NAME', '')) == ATA
+
+    # * Si el primer atributo de temperatura no es numérico, se usa el
+    # * siguiente.
+    salida = salida.replace(
+        '  9 Power_On_Hours', '190 Airflow_Temperature_Cel'
+    ).replace('26512', '0/0', 1)
+
+    assert parser.parsear(salida).temperatura == 34
+
+def test_salida_vacia_o_desconocida():
+    parser = smart.ParserSmart()
+
+    assert parser.parsear('') == smart.REGISTRO_SMART_VACIO
+    assert parser.parsear('{"incompleto": ') == smart.REGISTRO_SMART_VACIO
+    assert parser.parsear('Smartctl open device failed') == (
+        smart.REGISTRO_SMART_VACIO
+    )
@@ -0,0 +1,253 @@
+import math
+import re
+import threading
+import time
+
+from array import array
+from collections import namedtuple
+from datetime import datetime
+
+# * Una alerta se identifica por su clave (por ejemplo, 'cpu.uso' o
+# * 'particion./home.libre'), que permite agrupar las repeticiones de la
+# * misma alerta aunque el valor del mensaje cambie. La marca de tiempo es
+# * del reloj de pared.
+Alerta = namedtuple('Alerta', ['clave', 'mensaje', 'marca_tiempo'])
+
+def formatear_alerta(alerta):
+    '''Antepone la hora de la alerta a su mensaje.'''
+    hora = datetime.fromtimestamp(alerta.marca_tiempo).strftime('%H:%M:%S')
+
+    return f'[{hora}] Alerta: {alerta.mensaje}'
+
+def _compilar_patron(metrica):
+    '''
+    Convierte el nombre de métrica de una regla, con comodines '*', en una
+    expresión regular que captura la parte de cada comodín.
+    '''
+    return re.compile(
+        '(.+)'.join(re.escape(parte) for parte in metrica.split('*')) + r'\Z'
+    )
+
+class MotorReglas:
+    '''
+    Evalúa las reglas de alerta compiladas de la configuración
+    (config.Regla) sobre las muestras del historial de cada recolección.
+
+    Cada regla se aplica a todas las métricas que coinciden con su nombre, y
+    cada par de regla y métrica tiene un estado: desde cuándo se cumple la
+    condición, si la alerta está activa, cuándo se disparó por última vez y
+    la muestra anterior (para las reglas de tasa de cambio). Una alerta se
+    dispara cuando la condición se cumple durante 'durante' segundos, y no
+    se vuelve a disparar hasta que el valor cruza el umbral de liberación
+    ('liberar') y pasan 'enfriamiento' segundos desde el disparo anterior.
+
+    Las reglas que se aplican a cada métrica se resuelven una única vez, la
+    primera vez que aparece la métrica, y el estado se guarda en arrays
+    indexados por posición, por lo que evaluar un lote de muestras sólo
+    recorre las reglas que le corresponden a cada una.
+
+    Como cada recolector evalúa sólo sus propias muestras, una métrica
+    ausente de un lote no se descarta; el estado de las métricas que no
+    aparecen en ningún lote durante 'TIEMPO_OLVIDO' segundos (por ejemplo,
+    de una partición desmontada o un disco retirado) se descarta y los
+    arrays se compactan, por lo que el estado no crece indefinidamente.
+    '''
+
+    # * Segundos sin muestras tras los cuales se olvida una métrica, y cada
+    # * cuánto se buscan las métricas a olvidar.
+    TIEMPO_OLVIDO = 3600
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._reglas = None
+        self._compilar(())
+
+    @property
+    def pares(self):
+        '''Cantidad de pares de regla y métrica con estado.'''
+        return len(self._activa)
+
+    def _compilar(self, reglas):
+        self._reglas = reglas
+        self._patrones = tuple(_compilar_patron(r.metrica) for r in reglas)
+
+        # * Posiciones del estado de cada métrica: un tuple de (posición,
+        # * regla, clave de la alerta, comodín).
+        self._posiciones = {}
+
+        # * Marca de tiempo de la última muestra de cada métrica, y de la
+        # * última vez que se olvidaron métricas.
+        self._vistas = {}
+        self._ultimo_olvido = -math.inf
+
+        self._desde = array('d')
+        self._ultimo_disparo = array('d')
+        self._marca_anterior = array('d')
+        self._valor_anterior = array('d')
+        self._activa = bytearray()
+
+    def _resolver(self, nombre):
+        '''Reserva el estado de las reglas que se aplican a una métrica.'''
+        posiciones = []
+
+        for regla, patron in zip(self._reglas, self._patrones):
+            coincidencia = patron.match(nombre)
+
+            if coincidencia is None:
+                continue
+
+            posiciones.append((
+                len(self._activa), regla,
+                f'{nombre}.tasa' if regla.tipo == 'tasa' else nombre,
+                ', '.join(coincidencia.groups())
+            ))
+
+            self._desde.append(math.nan)
+            self._ultimo_disparo.append(-math.inf)
+            self._marca_anterior.append(math.nan)
+            self._valor_anterior.append(math.nan)
+            self._activa.append(0)
+
+        posiciones = tuple(posiciones)
+        self._posiciones[nombre] = posiciones
+
+        return posiciones
+
+    def _olvidar(self, marca):
+        '''
+        Descarta el estado de las métricas sin muestras desde hace
+        'TIEMPO_OLVIDO' segundos y compacta los arrays, reubicando las
+        posiciones de las demás.
+        '''
+        self._ultimo_olvido = marca
+        limite = marca - self.TIEMPO_OLVIDO
+
+        olvidadas = [
+            nombre for nombre, vista in self._vistas.items() if vista < limite
+        ]
+
+        if not olvidadas:
+            return
+
+        for nombre in olvidadas:
+            del self._vistas[nombre]
+            del self._posiciones[nombre]
+
+        columnas = (
+            self._desde, self._ultimo_disparo, self._marca_anterior,
+            self._valor_anterior, self._activa
+        )
+        compactadas = (
+            array('d'), array('d'), array('d'), array('d'), bytearray()
+        )
+
+        for nombre, posiciones in self._posiciones.items():
+            reubicadas = []
+
+            for posicion, regla, clave, comodin in posiciones:
+                reubicadas.append(
+                    (len(compactadas[-1]), regla, clave, comodin)
+                )
+
+                for compactada, columna in zip(compactadas, columnas):
+                    compactada.append(columna[posicion])
+
+            self._posiciones[nombre] = tuple(reubicadas)
+
+        (
+            self._desde, self._ultimo_disparo, self._marca_anterior,
+            self._valor_anterior, self._activa
+        ) = compactadas
+
+    def evaluar(self, reglas, marca, muestras):
+        '''
+        Evalúa las reglas sobre un lote de muestras ((nombre, valor)) tomadas
+        en la marca de tiempo monotónica 'marca', y devuelve un tuple con las
+        alertas disparadas. Si las reglas cambiaron (por una recarga de la
+        configuración), se vuelven a compilar y el estado se reinicia.
+        '''
+        alertas = []
+        marca_pared = time.time()
+
+        with self._candado:
+            if reglas is not self._reglas:
+                self._compilar(reglas)
+
+            if marca - self._ultimo_olvido >= self.TIEMPO_OLVIDO:
+                self._olvidar(marca)
+
+            vistas = self._vistas
+            desde = self._desde
+            ultimo_disparo = self._ultimo_disparo
+            marca_anterior = self._marca_anterior
+            valor_anterior = self._valor_anterior
+            activa = self._activa
+
+            for nombre, valor in muestras:
+                if valor is None:
+                    continue
+
+                vistas[nombre] = marca
+                posiciones = self._posiciones.get(nombre)
+
+                if posiciones is None:
+                    posiciones = self._resolver(nombre)
+
+                for posicion, regla, clave, comodin in posiciones:
+                    if regla.tipo == 'tasa':
+                        transcurrido = marca - marca_anterior[posicion]
+                        anterior = valor_anterior[posicion]
+
+                        marca_anterior[posicion] = marca
+                        valor_anterior[posicion] = valor
+
+                        # * La primera muestra sólo sirve de referencia.
+                        if not transcurrido > 0:
+                            continue
+
+                        medido = (valor - anterior) / transcurrido
+                    else:
+                        medido = valor
+
+                    mayor = regla.condicion == 'mayor'
+
+                    if activa[posicion]:
+                        # * La alerta sigue activa hasta cruzar el umbral de
+                        # * liberación.
+                        if (
+                            medido < regla.liberar if mayor
+                            else medido > regla.liberar
+                        ):
+                            activa[posicion] = 0
+                            desde[posicion] = math.nan
+                        continue
+
+                    if not (
+                        medido >= regla.umbral if mayor
+                        else medido <= regla.umbral
+                    ):
+                        desde[posicion] = math.nan
+                        continue
+
+                    if math.isnan(desde[posicion]):
+                        desde[posicion] = marca
+
+                    if marca - desde[posicion] < regla.durante:
+                        continue
+
+                    activa[posicion] = 1
+
+                    if marca - ultimo_disparo[posicion] < regla.enfriamiento:
+                        continue
+
+                    ultimo_disparo[posicion] = marca
+
+                    alertas.append(Alerta(
+                        clave,
+                        regla.mensaje.format(
+                            metrica=nombre, comodin=comodin, valor=medido
+                        ),
+                        marca_pared
+                    ))
+
+        return tuple(alertas)
@@ -0,0 +1,292 @@
+'''
+Ayudante SMART con permisos de administrador. Se inicia una única vez (por
+ejemplo, como un servicio de systemd) y atiende los lotes de dispositivos
+del agente por un socket Unix, ejecutando smartctl sin 'sudo'. Así, el
+agente no ejecuta 'sudo' por disco en cada intervalo, y sudo no evalúa
+sudoers ni escribe en el registro de autenticación en cada lectura.
+
+El protocolo es deliberadamente acotado: una única solicitud (un lote de
+dispositivos y un tiempo límite), sólo se ejecuta smartctl sobre los
+dispositivos cuyo nombre coincide con una expresión regular, y los
+mensajes son JSON de tamaño limitado (ver utils.smartmontools). Sólo los
+usuarios del grupo indicado pueden conectarse al socket.
+
+    python -m utils.ayudante_smart --socket /run/monitor-agent/smart.sock \\
+        --grupo monitor --ttl 30
+
+Un servicio de systemd mínimo para el ayudante:
+
+    [Service]
+    ExecStart=/usr/bin/python3 -m utils.ayudante_smart \\
+        --socket /run/monitor-agent/smart.sock --grupo monitor --ttl 30
+    WorkingDirectory=/opt/monitor-agent
+    RuntimeDirectory=monitor-agent
+    Restart=on-failure
+'''
+import argparse
+import grp
+import os
+import re
+import socketserver
+import threading
+import time
+
+from datetime import datetime
+
+# * Configuración, por el tiempo límite máximo de smartctl.
+import config
+
+# * Smartmontools.
+import utils.smartmontools as smartmontools
+
+# * Dispositivos de bloque que el ayudante acepta, por nombre ('vda', como
+# * los pasa el agente) o por ruta ('/dev/sda'): los mismos discos que
+# * produce la topología, es decir SATA/SAS, IDE, virtio, Xen, eMMC/SD y NVMe
+# * (controladora o espacio de nombres). Cualquier otro nombre (rutas
+# * relativas, '..', opciones de smartctl) se rechaza.
+PATRON_DISPOSITIVO = re.compile(
+    r'(?:/dev/)?(?:sd[a-z]{1,3}|hd[a-z]|vd[a-z]{1,2}|xvd[a-z]{1,2}'
+    r'|mmcblk\d{1,3}|nvme\d{1,3}(?:n\d{1,3})?)\Z'
+)
+
+# * Límites de una solicitud: cantidad de dispositivos y bytes del mensaje.
+# * El tiempo límite de smartctl se limita a config.TIMEOUT_MAXIMO.
+MAXIMO_DISPOSITIVOS = 256
+MAXIMO_SOLICITUD = 64 * 1024
+
+class AyudanteSmart:
+    '''
+    Atiende las solicitudes del protocolo con una función que ejecuta
+    smartctl sobre un lote (por defecto, la de Smartmontools sin 'sudo').
+
+    Con 'ttl' mayor que 0, los resultados exitosos se guardan en una caché
+    durante 'ttl' segundos, que comparten todos los clientes del ayudante.
+    '''
+
+    def __init__(self, ejecutar_lote, ttl=0):
+        self.ejecutar_lote = ejecutar_lote
+        self.ttl = ttl
+
+        self._candado = threading.Lock()
+        self._cache = {}
+
+        self.solicitudes = 0
+        self.rechazadas = 0
+        self.aciertos_cache = 0
+
+    def _validar(self, solicitud):
+        '''
+        Devuelve los dispositivos y el tiempo límite de una solicitud, o
+        lanza ValueError si la solicitud no es válida.
+        '''
+        if not isinstance(solicitud, dict):
+            raise ValueError('La solicitud debe ser un objeto')
+
+        if solicitud.get('version') != smartmontools.VERSION_PROTOCOLO:
+            raise ValueError(
+                'Versión de protocolo no soportada: '
+                f'{solicitud.get("version")!r}'
+            )
+
+        dispositivos = solicitud.get('dispositivos')
+
+        if not isinstance(dispositivos, list) or not (
+            0 < len(dispositivos) <= MAXIMO_DISPOSITIVOS
+        ):
+            raise ValueError(
+                "'dispositivos' debe ser una lista de 1 a "
+                f'{MAXIMO_DISPOSITIVOS} elementos'
+            )
+
+        if not all(isinstance(d, str) for d in dispositivos):
+            raise ValueError("'dispositivos' debe contener sólo cadenas")
+
+        timeout = solicitud.get('timeout')
+
+        if isinstance(timeout, bool) or not isinstance(
+            timeout, (int, float)
+        ) or not 0 < timeout <= config.TIMEOUT_MAXIMO:
+            raise ValueError(
+                "'timeout' debe ser un número entre 0 y "
+                f'{config.TIMEOUT_MAXIMO}'
+            )
+
+        return list(dict.fromkeys(dispositivos)), timeout
+
+    def atender(self, solicitud):
+        '''Devuelve la respuesta del protocolo a una solicitud.'''
+        try:
+            dispositivos, timeout = self._validar(solicitud)
+        except ValueError as error:
+            with self._candado:
+                self.rechazadas += 1
+
+            return {'error': str(error)}
+
+        ahora = time.monotonic()
+        resultados = {}
+
+        with self._candado:
+            self.solicitudes += 1
+
+            for dispositivo in dispositivos:
+                # * Un dispositivo no permitido (por ejemplo, /dev/zram0) se
+                # * rechaza sólo a él, sin ejecutar smartctl, y el resto del
+                # * lote se atiende normalmente.
+                if PATRON_DISPOSITIVO.match(dispositivo) is None:
+                    resultados[dispositivo] = smartmontools.ResultadoSmartctl(
+                        'error', None,
+                        f'Dispositivo no permitido: {dispositivo!r}', 0.0
+                    )
+                    continue
+
+                entrada = self._cache.get(dispositivo)
+
+                if entrada is not None and ahora - entrada[0] < self.ttl:
+                    resultados[dispositivo] = entrada[1]
+                    self.aciertos_cache += 1
+
+        pendientes = [d for d in dispositivos if d not in resultados]
+
+        if pendientes:
+            nuevos = self.ejecutar_lote(pendientes, timeout)
+            obtenido = time.monotonic()
+
+            with self._candado:
+                for dispositivo, resultado in nuevos.items():
+                    if self.ttl > 0 and resultado.estado == 'ok':
+                        self._cache[dispositivo] = (obtenido, resultado)
+
+            resultados.update(nuevos)
+
+        return {
+            'resultados': {
+                dispositivo: tuple(resultado)[:4]
+                for dispositivo, resultado in resultados.items()
+            }
+        }
+
+class _ManejadorAyudante(socketserver.BaseRequestHandler):
+    '''Atiende las solicitudes de un cliente hasta que cierra la conexión.'''
+
+    def handle(self):
+        ayudante = self.server.ayudante
+
+        while True:
+            try:
+                solicitud = smartmontools.recibir_mensaje(
+                    self.request, MAXIMO_SOLICITUD
+                )
+            except (OSError, ValueError) as error:
+                # * Un mensaje demasiado grande o malformado deja el socket
+                # * en un estado desconocido, por lo que se cierra.
+                print(
+                    f'{datetime.now()} >>> *** Se descartó una conexión del '
+                    'ayudante SMART ***'
+                )
+                print(error)
+                return
+
+            if solicitud is None:
+                return
+
+            try:
+                smartmontools.enviar_mensaje(
+                    self.request, ayudante.atender(solicitud)
+                )
+            except OSError:
+                return
+
+class ServidorAyudante(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    '''
+    Servidor del ayudante en un socket Unix, con un hilo por cliente.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, ruta_socket, ayudante, grupo=None):
+        self.ayudante = ayudante
+
+        # * Un socket de una ejecución anterior impediría el bind().
+        if os.path.exists(ruta_socket):
+            os.unlink(ruta_socket)
+
+        # * El socket se crea ya sin permisos para el grupo ni para otros
+        # * usuarios, para que nadie pueda conectarse entre el bind() y el
+        # * chmod().
+        umask_anterior = os.umask(0o177)
+
+        try:
+            super().__init__(ruta_socket, _ManejadorAyudante)
+        finally:
+            os.umask(umask_anterior)
+
+        # * Sólo el dueño (administrador) y el grupo del agente pueden
+        # * conectarse.
+        if grupo is not None:
+            os.chown(ruta_socket, -1, grp.getgrnam(grupo).gr_gid)
+
+        os.chmod(ruta_socket, 0o660 if grupo is not None else 0o600)
+
+    def server_close(self):
+        super().server_close()
+
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+def iniciar_servidor(ruta_socket, ayudante, grupo=None):
+    '''Inicia el servidor en un hilo en segundo plano y lo devuelve.'''
+    servidor = ServidorAyudante(ruta_socket, ayudante, grupo)
+
+    hilo = threading.Thread(
+        target=servidor.serve_forever, name='ayudante-smart', daemon=True
+    )
+    hilo.start()
+
+    return servidor
+
+def main():
+    parser = argparse.ArgumentParser(description='Ayudante SMART')
+    parser.add_argument(
+        '--socket', required=True, help='Ruta del socket Unix'
+    )
+    parser.add_argument(
+        '--grupo', help='Grupo que puede conectarse al socket'
+    )
+    parser.add_argument(
+        '--ttl', type=float, default=0,
+        help='Segundos que se guardan los resultados (0 lo deshabilita)'
+    )
+    parser.add_argument(
+        '--paralelismo', type=int, default=8,
+        help='Ejecuciones simultáneas de smartctl'
+    )
+    argumentos = parser.parse_args()
+
+    smartctl = smartmontools.Smartmontools(argumentos.paralelismo, sudo=False)
+    ayudante = AyudanteSmart(
+        lambda dispositivos, timeout: smartctl.ejecutar_smartmontools_lote(
+            dispositivos, timeout=timeout
+        ),
+        argumentos.ttl
+    )
+
+    with ServidorAyudante(
+        argumentos.socket, ayudante, argumentos.grupo
+    ) as servidor:
+        print(
+            f'{datetime.now()} >>> *** Ayudante SMART escuchando en '
+            f'{argumentos.socket} ***'
+        )
+
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
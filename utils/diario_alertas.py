@@ -0,0 +1,188 @@
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+# * Entrada del diario: una alerta y sus repeticiones agrupadas, con la
+# * cantidad de veces que se produjo y la primera y la última vez (en el
+# * reloj de pared). El mensaje es el de la última repetición.
+EntradaDiario = namedtuple(
+    'EntradaDiario',
+    ['clave', 'mensaje', 'cantidad', 'primera_vez', 'ultima_vez']
+)
+
+def formatear_entrada(entrada):
+    '''
+    Devuelve el texto de una entrada del diario, con la hora de la primera
+    y la última repetición si se produjo más de una vez.
+    '''
+    primera = datetime.fromtimestamp(entrada.primera_vez).strftime('%H:%M:%S')
+
+    if entrada.cantidad == 1:
+        return f'[{primera}] Alerta: {entrada.mensaje}'
+
+    ultima = datetime.fromtimestamp(entrada.ultima_vez).strftime('%H:%M:%S')
+
+    return (
+        f'[{primera} - {ultima}] Alerta: {entrada.mensaje} '
+        f'(x{entrada.cantidad})'
+    )
+
+class DiarioAlertas:
+    '''
+    Diario de alertas acotado. Las entradas se guardan en orden de llegada
+    hasta 'capacidad', descartando las más antiguas, y las repeticiones de
+    una alerta con la misma clave se agrupan en una única entrada mientras
+    no pasen más de 'ventana_coalescencia' segundos entre ellas.
+
+    Si se configura un archivo, las entradas se escriben en un archivo
+    rotativo desde un hilo propio (a través de una cola), por lo que
+    registrar una alerta nunca escribe en disco desde el hilo que la
+    produjo. Al archivo se escribe la primera repetición de cada entrada, y
+    un resumen cuando la entrada se cierra con más de una repetición.
+    '''
+
+    def __init__(self, configuracion_alertas):
+        self.configuracion = configuracion_alertas
+
+        self._candado = threading.Lock()
+        self._entradas = OrderedDict()
+        self._activas = {}
+        self._siguiente = 0
+        self.version = 0
+
+        self._registro = None
+        self._oyente = None
+
+    def iniciar(self):
+        '''Inicia el hilo que escribe el archivo rotativo, si se configuró.'''
+        archivo = self.configuracion.archivo
+
+        if not archivo:
+            return
+
+        try:
+            directorio = os.path.dirname(archivo)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+
+            manejador = logging.handlers.RotatingFileHandler(
+                archivo, maxBytes=self.configuracion.maximo_bytes_archivo,
+                backupCount=self.configuracion.archivos_respaldo,
+                encoding='utf-8'
+            )
+        except OSError as error:
+            print(
+                f'{datetime.now()} >>> *** Error al abrir el archivo de '
+                f'alertas {archivo} ***'
+            )
+            print(error)
+            return
+
+        manejador.setFormatter(
+            logging.Formatter('%(asctime)s %(message)s')
+        )
+
+        cola = queue.SimpleQueue()
+
+        self._registro = logging.getLogger('monitor_agent.alertas')
+        self._registro.setLevel(logging.INFO)
+        self._registro.propagate = False
+        self._registro.handlers[:] = [logging.handlers.QueueHandler(cola)]
+
+        self._oyente = logging.handlers.QueueListener(cola, manejador)
+        self._oyente.start()
+
+    def detener(self):
+        '''
+        Escribe el resumen de las entradas abiertas y espera a que el hilo
+        del archivo termine de escribir.
+        '''
+        with self._candado:
+            for identificador in self._activas.values():
+                self._escribir_resumen(self._entradas[identificador])
+            self._activas.clear()
+
+        if self._oyente is not None:
+            self._oyente.stop()
+            self._oyente.handlers[0].close()
+            self._oyente = None
+            self._registro.handlers.clear()
+            self._registro = None
+
+    def registrar(self, alertas):
+        '''Agrega las alertas (utils.alertas.Alerta) al diario.'''
+        if not alertas:
+            return
+
+        with self._candado:
+            for alerta in alertas:
+                self._registrar_alerta(alerta)
+
+            self.version += 1
+
+    def ultimas(self, cantidad):
+        '''Devuelve un tuple con las últimas 'cantidad' entradas.'''
+        with self._candado:
+            entradas = list(
+                itertools.islice(reversed(self._entradas.values()), cantidad)
+            )
+
+        entradas.reverse()
+
+        return tuple(entradas)
+
+    def _registrar_alerta(self, alerta):
+        identificador = self._activas.get(alerta.clave)
+        entrada = self._entradas.get(identificador)
+
+        if entrada is not None and (
+            alerta.marca_tiempo - entrada.ultima_vez <=
+            self.configuracion.ventana_coalescencia
+        ):
+            self._entradas[identificador] = entrada._replace(
+                mensaje=alerta.mensaje, cantidad=entrada.cantidad + 1,
+                ultima_vez=alerta.marca_tiempo
+            )
+            return
+
+        # * La entrada anterior de la misma clave, si sigue en el diario,
+        # * queda cerrada y las nuevas repeticiones abren otra.
+        if entrada is not None:
+            self._escribir_resumen(entrada)
+
+        identificador = self._siguiente
+        self._siguiente += 1
+
+        self._entradas[identificador] = EntradaDiario(
+            alerta.clave, alerta.mensaje, 1, alerta.marca_tiempo,
+            alerta.marca_tiempo
+        )
+        self._activas[alerta.clave] = identificador
+
+        if self._registro is not None:
+            self._registro.info(alerta.mensaje)
+
+        while len(self._entradas) > self.configuracion.capacidad:
+            identificador, descartada = self._entradas.popitem(last=False)
+
+            if self._activas.get(descartada.clave) == identificador:
+                del self._activas[descartada.clave]
+                self._escribir_resumen(descartada)
+
+    def _escribir_resumen(self, entrada):
+        if self._registro is None or entrada.cantidad == 1:
+            return
+
+        primera = datetime.fromtimestamp(entrada.primera_vez)
+        ultima = datetime.fromtimestamp(entrada.ultima_vez)
+
+        self._registro.info(
+            f'{entrada.mensaje} (repetida {entrada.cantidad} veces entre '
+            f'{primera:%Y-%m-%d %H:%M:%S} y {ultima:%Y-%m-%d %H:%M:%S})'
+        )
@@ -0,0 +1,385 @@
+import gzip
+import socket
+import threading
+
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TIPO_CONTENIDO = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+PREFIJO = 'monitor_agent'
+
+# * Atributos SMART exportados: campo del RegistroSmart, nombre de la métrica
+# * y descripción. La temperatura se exporta aparte, desde la del disco (que
+# * prefiere la de hwmon a la de SMART).
+METRICAS_SMART = (
+    ('horas_encendido', 'disco_horas_encendido', 'Horas de encendido.'),
+    ('ciclos_encendido', 'disco_ciclos_encendido', 'Ciclos de encendido.'),
+    (
+        'unidades_leidas', 'disco_unidades_leidas',
+        'Unidades de datos NVMe leídas (512000 bytes cada una).'
+    ),
+    (
+        'unidades_escritas', 'disco_unidades_escritas',
+        'Unidades de datos NVMe escritas (512000 bytes cada una).'
+    ),
+    (
+        'porcentaje_usado', 'disco_porcentaje_usado',
+        'Porcentaje de vida útil usado (NVMe).'
+    ),
+    (
+        'errores_medios', 'disco_errores_medios',
+        'Errores de integridad de medios y datos (NVMe).'
+    ),
+    (
+        'sectores_reasignados', 'disco_sectores_reasignados',
+        'Sectores reasignados (ATA).'
+    ),
+    (
+        'sectores_pendientes', 'disco_sectores_pendientes',
+        'Sectores pendientes de reasignación (ATA).'
+    ),
+    ('lbas_leidos', 'disco_lbas_leidos', 'LBAs leídos (ATA).'),
+    ('lbas_escritos', 'disco_lbas_escritos', 'LBAs escritos (ATA).'),
+)
+
+# * Rendimiento de entrada/salida exportado por disco y por partición: campo
+# * del RendimientoIO, nombre de la métrica y descripción.
+METRICAS_IO = (
+    ('iops_lectura', 'io_lecturas_por_segundo', 'Lecturas por segundo.'),
+    (
+        'iops_escritura', 'io_escrituras_por_segundo',
+        'Escrituras por segundo.'
+    ),
+    (
+        'bytes_lectura', 'io_lectura_bytes_por_segundo',
+        'Bytes leídos por segundo.'
+    ),
+    (
+        'bytes_escritura', 'io_escritura_bytes_por_segundo',
+        'Bytes escritos por segundo.'
+    ),
+    (
+        'latencia_lectura', 'io_latencia_lectura_milisegundos',
+        'Tiempo promedio de cada lectura, incluida la espera en la cola.'
+    ),
+    (
+        'latencia_escritura', 'io_latencia_escritura_milisegundos',
+        'Tiempo promedio de cada escritura, incluida la espera en la cola.'
+    ),
+    ('cola', 'io_cola', 'Cantidad promedio de operaciones en curso.'),
+    (
+        'utilizacion', 'io_utilizacion_porcentaje',
+        'Porcentaje del tiempo con alguna operación en curso.'
+    ),
+)
+
+def _escapar(valor):
+    '''Escapa el valor de una etiqueta según el formato OpenMetrics.'''
+    return (
+        str(valor).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+def _etiquetas(etiquetas=None, **otras):
+    '''Devuelve las etiquetas de una muestra en formato OpenMetrics.'''
+    etiquetas = dict(etiquetas or {}, **otras)
+
+    return '{' + ','.join(
+        f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas.items()
+    ) + '}'
+
+class _Familia:
+    '''Familia de métricas (un gauge) con sus muestras.'''
+
+    def __init__(self, nombre, descripcion, tipo='gauge'):
+        self.nombre = f'{PREFIJO}_{nombre}'
+        self.descripcion = descripcion
+        self.tipo = tipo
+        self.muestras = []
+
+    def agregar(self, valor, etiquetas='', sufijo=''):
+        if valor is not None:
+            self.muestras.append(f'{self.nombre}{sufijo}{etiquetas} {valor}')
+
+    def renderizar(self, lineas):
+        if not self.muestras:
+            return
+
+        lineas.append(f'# TYPE {self.nombre} {self.tipo}')
+        lineas.append(f'# HELP {self.nombre} {self.descripcion}')
+        lineas.extend(self.muestras)
+
+def renderizar_openmetrics(instantanea):
+    '''
+    Devuelve el cuerpo en formato de texto OpenMetrics (como bytes) con todas
+    las métricas de una instantánea: el uso y la temperatura de la CPU por
+    núcleo, los atributos SMART de cada disco, el uso de cada partición y
+    el rendimiento de entrada/salida de cada disco y partición.
+    '''
+    familias = []
+
+    def familia(*argumentos, **opciones):
+        nueva = _Familia(*argumentos, **opciones)
+        familias.append(nueva)
+        return nueva
+
+    cpu = instantanea.cpu
+
+    if cpu is not None:
+        informacion = familia('cpu', 'Identidad de la CPU.', tipo='info')
+        informacion.agregar(
+            1, _etiquetas(
+                modelo=cpu.modelo, nucleos_fisicos=cpu.nucleos_fisicos,
+                nucleos_logicos=cpu.nucleos_logicos
+            ), sufijo='_info'
+        )
+
+        uso_nucleos, uso_total = cpu.uso
+        uso = familia('cpu_uso_porcentaje', 'Uso de la CPU por núcleo.')
+        for nucleo, valor in enumerate(uso_nucleos):
+            uso.agregar(valor, _etiquetas(nucleo=nucleo))
+
+        familia(
+            'cpu_uso_total_porcentaje', 'Uso total de la CPU.'
+        ).agregar(uso_total)
+
+        if cpu.desglose is not None:
+            desglose = familia(
+                'cpu_desglose_porcentaje',
+                'Porcentaje del tiempo total de la CPU por estado.'
+            )
+            for estado, valor in cpu.desglose[1]._asdict().items():
+                desglose.agregar(valor, _etiquetas(estado=estado))
+
+        if cpu.temperatura is not None:
+            temperatura_nucleos, _, paquete_cpu = cpu.temperatura
+
+            temperatura = familia(
+                'cpu_temperatura_celsius',
+                'Temperatura de cada núcleo (o CCD) de la CPU.'
+            )
+            for nucleo, valor in enumerate(temperatura_nucleos):
+                temperatura.agregar(valor, _etiquetas(nucleo=nucleo))
+
+            familia(
+                'cpu_temperatura_paquete_celsius',
+                'Temperatura del paquete de la CPU.'
+            ).agregar(paquete_cpu)
+
+    if instantanea.almacenamiento is not None:
+        estado = familia(
+            'disco_smart_estado',
+            'Estado de la última lectura SMART del disco.', tipo='stateset'
+        )
+        temperatura_disco = familia(
+            'disco_temperatura_celsius', 'Temperatura del disco.'
+        )
+        smart = [
+            (campo, familia(nombre, descripcion))
+            for campo, nombre, descripcion in METRICAS_SMART
+        ]
+        particion_total = familia(
+            'particion_tamano_bytes', 'Tamaño total de la partición.'
+        )
+        particion_usado = familia(
+            'particion_usado_bytes', 'Espacio usado de la partición.'
+        )
+        particion_libre = familia(
+            'particion_libre_bytes', 'Espacio libre de la partición.'
+        )
+        particion_uso = familia(
+            'particion_uso_porcentaje', 'Porcentaje de uso de la partición.'
+        )
+
+        for disco in instantanea.almacenamiento:
+            etiquetas_disco = _etiquetas(
+                disco=disco.clave, modelo=disco.modelo
+            )
+
+            for valor in ('ok', 'error', 'timeout'):
+                estado.agregar(
+                    int(disco.estado_smart == valor),
+                    # * En un stateset, la etiqueta del estado lleva el nombre
+                    # * de la familia.
+                    _etiquetas({estado.nombre: valor}, disco=disco.clave)
+                )
+
+            temperatura_disco.agregar(disco.temperatura, etiquetas_disco)
+
+            for campo, familia_smart in smart:
+                familia_smart.agregar(
+                    getattr(disco.smart, campo), etiquetas_disco
+                )
+
+            for particion in disco.particiones:
+                etiquetas_particion = _etiquetas(
+                    disco=disco.clave, particion=particion.particion,
+                    sistema_archivos=particion.sistema_archivos
+                )
+                total, usado, libre, porcentaje = particion.uso
+
+                particion_total.agregar(total, etiquetas_particion)
+                particion_usado.agregar(usado, etiquetas_particion)
+                particion_libre.agregar(libre, etiquetas_particion)
+                particion_uso.agregar(porcentaje, etiquetas_particion)
+
+    if instantanea.io is not None:
+        io = [
+            (campo, familia(nombre, descripcion))
+            for campo, nombre, descripcion in METRICAS_IO
+        ]
+
+        for io_disco in instantanea.io:
+            etiquetas_disco = _etiquetas(disco=io_disco.clave)
+
+            for campo, familia_io in io:
+                familia_io.agregar(
+                    getattr(io_disco.rendimiento, campo), etiquetas_disco
+                )
+
+            for particion in io_disco.particiones:
+                etiquetas_particion = _etiquetas(
+                    disco=io_disco.clave, particion=particion.particion
+                )
+
+                for campo, familia_io in io:
+                    familia_io.agregar(
+                        getattr(particion.rendimiento, campo),
+                        etiquetas_particion
+                    )
+
+    lineas = []
+
+    for familia_metricas in familias:
+        familia_metricas.renderizar(lineas)
+
+    lineas.append('# EOF\n')
+
+    return '\n'.join(lineas).encode('utf-8')
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    '''Responde /metrics con el cuerpo ya renderizado por el exportador.'''
+
+    # * HTTP/1.1 para que Prometheus pueda mantener la conexión abierta.
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+
+        # * Sin TCP_NODELAY, el cuerpo enviado después de las cabeceras queda
+        # * esperando el ACK retrasado del cliente en conexiones persistentes.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        cuerpo, comprimido = self.server.exportador.obtener_cuerpo()
+
+        if cuerpo is None:
+            self.send_error(503, 'Todavía no hay métricas recolectadas')
+            return
+
+        usar_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+
+        self.send_response(200)
+        self.send_header('Content-Type', TIPO_CONTENIDO)
+
+        if usar_gzip:
+            cuerpo = comprimido
+            self.send_header('Content-Encoding', 'gzip')
+
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *argumentos):
+        pass
+
+class ExportadorPrometheus:
+    '''
+    Exportador HTTP de las métricas en formato OpenMetrics para Prometheus.
+    El cuerpo se renderiza (y se comprime) una sola vez por cada instantánea
+    publicada por el motor de recolección, y cada consulta sólo envía esos
+    bytes, por lo que los scrapers concurrentes no agregan trabajo ni
+    disparan recolecciones.
+    '''
+
+    def __init__(self, direccion='127.0.0.1', puerto=9108):
+        self.direccion = direccion
+        self.puerto = puerto
+
+        self._candado = threading.Lock()
+        self._secuencia = 0
+        self._cuerpo = None
+        self._comprimido = None
+
+        self._servidor = None
+        self._hilo = None
+
+        self.renderizados = 0
+
+    def actualizar(self, instantanea):
+        '''
+        Renderiza el cuerpo de una instantánea. Las instantáneas más antiguas
+        que la última renderizada (por ejemplo, publicadas por otro hilo de
+        trabajo al mismo tiempo) se descartan.
+        '''
+        if instantanea.secuencia <= self._secuencia:
+            return
+
+        cuerpo = renderizar_openmetrics(instantanea)
+        comprimido = gzip.compress(cuerpo, compresslevel=6)
+
+        with self._candado:
+            if instantanea.secuencia <= self._secuencia:
+                return
+
+            self._secuencia = instantanea.secuencia
+            self._cuerpo = cuerpo
+            self._comprimido = comprimido
+            self.renderizados += 1
+
+    def obtener_cuerpo(self):
+        '''Devuelve el cuerpo renderizado y su versión comprimida con gzip.'''
+        with self._candado:
+            return self._cuerpo, self._comprimido
+
+    def iniciar(self):
+        '''Inicia el servidor HTTP en un hilo en segundo plano.'''
+        try:
+            self._servidor = ThreadingHTTPServer(
+                (self.direccion, self.puerto), _ManejadorMetricas
+            )
+        except OSError as error:
+            print(
+                f'{datetime.now()} >>> *** Error al iniciar el exportador de '
+                f'Prometheus en {self.direccion}:{self.puerto} ***'
+            )
+            print(error)
+
+            return
+
+        self._servidor.daemon_threads = True
+        self._servidor.exportador = self
+        self.puerto = self._servidor.server_address[1]
+
+        self._hilo = threading.Thread(
+            target=self._servidor.serve_forever, name='exportador-prometheus',
+            daemon=True
+        )
+        self._hilo.start()
+
+        print(
+            f'{datetime.now()} >>> *** Exportador de Prometheus en '
+            f'http://{self.direccion}:{self.puerto}/metrics ***'
+        )
+
+    def detener(self):
+        '''Detiene el servidor HTTP.'''
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
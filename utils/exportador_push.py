@@ -0,0 +1,457 @@
+import gzip
+import http.client
+import json
+import os
+import threading
+import time
+
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import urlsplit
+
+EstadisticasPush = namedtuple(
+    'EstadisticasPush',
+    [
+        'lotes_enviados', 'instantaneas_enviadas', 'bytes_enviados',
+        'bytes_sin_comprimir', 'fallos', 'lotes_en_spool', 'bytes_en_spool',
+        'lotes_descartados', 'promedio_lote', 'proximo_intento'
+    ]
+)
+
+def serializar_instantanea(instantanea, marca_tiempo):
+    '''
+    Convierte una instantánea en un dictionary serializable como JSON, con
+    la marca de tiempo del reloj de pared en la que se publicó.
+    '''
+    datos = {
+        'secuencia': instantanea.secuencia,
+        'marca_tiempo': marca_tiempo,
+        'alertas': [alerta._asdict() for alerta in instantanea.alertas],
+        'obsoletas': sorted(instantanea.obsoletas),
+    }
+
+    cpu = instantanea.cpu
+
+    if cpu is not None:
+        uso_nucleos, uso_total = cpu.uso
+
+        datos['cpu'] = {
+            'modelo': cpu.modelo,
+            'nucleos_fisicos': cpu.nucleos_fisicos,
+            'nucleos_logicos': cpu.nucleos_logicos,
+            'uso_nucleos': uso_nucleos,
+            'uso_total': uso_total,
+            'desglose': cpu.desglose[1]._asdict() if cpu.desglose else None,
+            'temperatura': None,
+        }
+
+        if cpu.temperatura is not None:
+            temperatura_nucleos, promedio, paquete_cpu = cpu.temperatura
+
+            datos['cpu']['temperatura'] = {
+                'nucleos': temperatura_nucleos,
+                'promedio': promedio,
+                'paquete': paquete_cpu,
+            }
+
+    if instantanea.almacenamiento is not None:
+        datos['almacenamiento'] = [
+            {
+                'clave': disco.clave,
+                'modelo': disco.modelo,
+                'estado_smart': disco.estado_smart,
+                # * La temperatura del disco prefiere la de hwmon a la de
+                # * SMART.
+                'smart': dict(
+                    disco.smart._asdict(), temperatura=disco.temperatura
+                ),
+                'particiones': [
+                    {
+                        'particion': particion.particion,
+                        'sistema_archivos': particion.sistema_archivos,
+                        'uso': particion.uso,
+                    }
+                    for particion in disco.particiones
+                ],
+            }
+            for disco in instantanea.almacenamiento
+        ]
+
+    if instantanea.io is not None:
+        datos['io'] = [
+            {
+                'clave': io_disco.clave,
+                'rendimiento': io_disco.rendimiento._asdict(),
+                'particiones': [
+                    {
+                        'particion': particion.particion,
+                        'rendimiento': particion.rendimiento._asdict(),
+                    }
+                    for particion in io_disco.particiones
+                ],
+            }
+            for io_disco in instantanea.io
+        ]
+
+    return datos
+
+def _interpretar_nombre_lote(nombre):
+    '''
+    Devuelve el orden y la cantidad de instantáneas de un lote del spool a
+    partir del nombre de su archivo. Lanza ValueError si el nombre no tiene
+    el formato esperado.
+    '''
+    orden, instantaneas, _ = nombre.split('.', 2)
+
+    return int(orden), int(instantaneas)
+
+class SpoolPush:
+    '''
+    Cola en disco de los lotes que no se pudieron enviar, acotada por
+    tamaño. Cada lote es un archivo ya comprimido cuyo nombre conserva el
+    orden de llegada; si se supera el tamaño máximo, se descartan los lotes
+    más antiguos.
+    '''
+
+    def __init__(self, directorio, maximo_bytes):
+        self.directorio = directorio
+        self.maximo_bytes = maximo_bytes
+        self.descartados = 0
+
+        os.makedirs(directorio, exist_ok=True)
+
+        self._lotes = []
+        self._bytes = 0
+        self._siguiente = 0
+
+        # * Los lotes de una ejecución anterior se reenvían primero. Un
+        # * archivo con un nombre inesperado o que no se puede leer se ignora,
+        # * para no detener el exportador.
+        for nombre in sorted(os.listdir(directorio)):
+            if not nombre.endswith('.ndjson.gz'):
+                continue
+
+            ruta = os.path.join(directorio, nombre)
+
+            try:
+                orden, _ = _interpretar_nombre_lote(nombre)
+                tamano = os.path.getsize(ruta)
+            except (OSError, ValueError) as error:
+                print(
+                    f'{datetime.now()} >>> *** Se ignora el lote {ruta} del '
+                    'spool ***'
+                )
+                print(error)
+                continue
+
+            self._lotes.append((ruta, tamano))
+            self._bytes += tamano
+            self._siguiente = max(self._siguiente, orden + 1)
+
+    def __len__(self):
+        return len(self._lotes)
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def agregar(self, cuerpo, instantaneas):
+        '''Guarda un lote comprimido al final de la cola.'''
+        ruta = os.path.join(
+            self.directorio,
+            f'{self._siguiente:012d}.{instantaneas}.ndjson.gz'
+        )
+        self._siguiente += 1
+
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'wb') as archivo:
+            archivo.write(cuerpo)
+        os.replace(temporal, ruta)
+
+        self._lotes.append((ruta, len(cuerpo)))
+        self._bytes += len(cuerpo)
+
+        while self._bytes > self.maximo_bytes and len(self._lotes) > 1:
+            self.eliminar_primero()
+            self.descartados += 1
+
+    def primero(self):
+        '''
+        Devuelve el cuerpo y la cantidad de instantáneas del lote más
+        antiguo, sin quitarlo de la cola.
+        '''
+        ruta, _ = self._lotes[0]
+
+        with open(ruta, 'rb') as archivo:
+            cuerpo = archivo.read()
+
+        return cuerpo, _interpretar_nombre_lote(os.path.basename(ruta))[1]
+
+    def eliminar_primero(self):
+        '''Quita de la cola el lote más antiguo.'''
+        ruta, tamano = self._lotes.pop(0)
+        self._bytes -= tamano
+
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+class ExportadorPush:
+    '''
+    Exportador que envía las instantáneas a un endpoint HTTP, para los hosts
+    que no pueden ser consultados (por ejemplo, detrás de NAT). Las
+    instantáneas se agrupan en lotes de JSON por líneas comprimidos con gzip,
+    que se envían al alcanzar 'maximo_instantaneas' o 'maximo_bytes_lote'
+    (sin comprimir), o cada 'intervalo' segundos. Mientras el endpoint no
+    responde, los lotes se guardan en un spool en disco y se reenvían en
+    orden al reconectar, con reintentos espaciados de forma exponencial.
+    '''
+
+    def __init__(self, configuracion_push):
+        self.configuracion = configuracion_push
+
+        partes = urlsplit(configuracion_push.url)
+        self._esquema = partes.scheme
+        self._servidor = partes.netloc
+        self._ruta = partes.path or '/'
+        if partes.query:
+            self._ruta += f'?{partes.query}'
+
+        self.spool = SpoolPush(
+            configuracion_push.directorio_spool,
+            configuracion_push.maximo_spool_bytes
+        )
+
+        self._candado = threading.Lock()
+        self._hay_lote = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._conexion = None
+
+        self._lineas = []
+        self._bytes_lote = 0
+
+        self._espera = configuracion_push.backoff_inicial
+        self._proximo_intento = 0.0
+
+        self.lotes_enviados = 0
+        self.instantaneas_enviadas = 0
+        self.bytes_enviados = 0
+        self.bytes_sin_comprimir = 0
+        self.fallos = 0
+
+    def actualizar(self, instantanea):
+        '''Agrega una instantánea al lote en curso.'''
+        linea = json.dumps(
+            serializar_instantanea(instantanea, time.time()),
+            separators=(',', ':')
+        ).encode('utf-8') + b'\n'
+
+        with self._candado:
+            self._lineas.append(linea)
+            self._bytes_lote += len(linea)
+
+            if (
+                len(self._lineas) >= self.configuracion.maximo_instantaneas or
+                self._bytes_lote >= self.configuracion.maximo_bytes_lote
+            ):
+                self._hay_lote.set()
+
+    def iniciar(self):
+        '''Inicia el hilo que envía los lotes.'''
+        self._hilo = threading.Thread(
+            target=self._enviar_lotes, name='exportador-push', daemon=True
+        )
+        self._hilo.start()
+
+    def detener(self):
+        '''
+        Detiene el hilo de envío. El lote en curso se intenta enviar una
+        última vez, y si no se puede, queda en el spool.
+        '''
+        self._detener.set()
+        self._hay_lote.set()
+
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.configuracion.timeout * 2)
+            self._hilo = None
+
+    def obtener_estadisticas(self):
+        '''Devuelve las EstadisticasPush del exportador.'''
+        with self._candado:
+            return EstadisticasPush(
+                self.lotes_enviados, self.instantaneas_enviadas,
+                self.bytes_enviados, self.bytes_sin_comprimir, self.fallos,
+                len(self.spool), self.spool.bytes, self.spool.descartados,
+                (
+                    self.instantaneas_enviadas / self.lotes_enviados
+                    if self.lotes_enviados else 0.0
+                ),
+                max(0.0, self._proximo_intento - time.monotonic())
+            )
+
+    def _tomar_lote(self):
+        '''
+        Devuelve el lote en curso comprimido y su cantidad de instantáneas,
+        o None si está vacío. Un lote tiene a lo sumo 'maximo_instantaneas';
+        si quedan suficientes para otro lote completo, se envía a
+        continuación sin esperar al intervalo.
+        '''
+        maximo = self.configuracion.maximo_instantaneas
+
+        with self._candado:
+            lineas = self._lineas[:maximo]
+            self._lineas = self._lineas[maximo:]
+            self._bytes_lote = sum(len(linea) for linea in self._lineas)
+
+            if len(self._lineas) < maximo and (
+                self._bytes_lote < self.configuracion.maximo_bytes_lote
+            ):
+                self._hay_lote.clear()
+
+        if not lineas:
+            return None
+
+        contenido = b''.join(lineas)
+
+        with self._candado:
+            self.bytes_sin_comprimir += len(contenido)
+
+        return gzip.compress(contenido, compresslevel=6), len(lineas)
+
+    def _enviar_lotes(self):
+        '''
+        Bucle del hilo de envío: toma el lote en curso según la política de
+        tamaño y tiempo, y envía primero los lotes pendientes del spool para
+        conservar el orden.
+        '''
+        while True:
+            self._hay_lote.wait(self.configuracion.intervalo)
+            detener = self._detener.is_set()
+
+            lote = self._tomar_lote()
+
+            # * Al detener, se despacha todo lo acumulado.
+            while lote is not None:
+                self._despachar(*lote)
+                lote = self._tomar_lote() if detener else None
+
+            while len(self.spool) and self._puede_intentar():
+                # * Un lote que ya no se puede leer (por ejemplo, si se borró
+                # * el archivo) se descarta, para no bloquear a los demás.
+                try:
+                    cuerpo, instantaneas = self.spool.primero()
+                except (OSError, ValueError) as error:
+                    print(
+                        f'{datetime.now()} >>> *** Se descarta un lote '
+                        f'ilegible del spool {self.spool.directorio} ***'
+                    )
+                    print(error)
+
+                    self.spool.eliminar_primero()
+                    self.spool.descartados += 1
+                    continue
+
+                if not self._enviar(cuerpo, instantaneas):
+                    break
+
+                self.spool.eliminar_primero()
+
+            if detener:
+                self._cerrar_conexion()
+                return
+
+    def _despachar(self, cuerpo, instantaneas):
+        '''
+        Envía un lote, o lo guarda en el spool si hay lotes anteriores
+        pendientes (para conservar el orden), si se está esperando para
+        reintentar o si el envío falla.
+        '''
+        if len(self.spool) == 0 and self._puede_intentar():
+            if self._enviar(cuerpo, instantaneas):
+                return
+
+        self._guardar_en_spool(cuerpo, instantaneas)
+
+    def _puede_intentar(self):
+        return time.monotonic() >= self._proximo_intento
+
+    def _guardar_en_spool(self, cuerpo, instantaneas):
+        '''Guarda un lote en el spool en disco.'''
+        try:
+            with self._candado:
+                self.spool.agregar(cuerpo, instantaneas)
+        except OSError as error:
+            print(
+                f'{datetime.now()} >>> *** Error al guardar un lote en el '
+                f'spool {self.spool.directorio} ***'
+            )
+            print(error)
+
+    def _cerrar_conexion(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+    def _enviar(self, cuerpo, instantaneas):
+        '''
+        Envía un lote comprimido por una conexión persistente. Devuelve True
+        si el endpoint lo aceptó; si no, espacia el próximo intento.
+        '''
+        try:
+            if self._conexion is None:
+                clase = (
+                    http.client.HTTPSConnection if self._esquema == 'https'
+                    else http.client.HTTPConnection
+                )
+                self._conexion = clase(
+                    self._servidor, timeout=self.configuracion.timeout
+                )
+
+            self._conexion.request(
+                'POST', self._ruta, body=cuerpo,
+                headers={
+                    'Content-Type': 'application/x-ndjson',
+                    'Content-Encoding': 'gzip',
+                }
+            )
+            respuesta = self._conexion.getresponse()
+            respuesta.read()
+
+            if not 200 <= respuesta.status < 300:
+                raise http.client.HTTPException(
+                    f'El endpoint respondió {respuesta.status}'
+                )
+        except (OSError, http.client.HTTPException) as error:
+            self._cerrar_conexion()
+
+            with self._candado:
+                self.fallos += 1
+
+            # * Se avisa sólo en el primer fallo de una racha, para no
+            # * llenar el registro mientras el endpoint no esté disponible.
+            if self._espera == self.configuracion.backoff_inicial:
+                print(
+                    f'{datetime.now()} >>> *** Error al enviar métricas a '
+                    f'{self.configuracion.url}. Los lotes se guardarán en el '
+                    'spool ***'
+                )
+                print(error)
+
+            self._proximo_intento = time.monotonic() + self._espera
+            self._espera = min(
+                self._espera * 2, self.configuracion.backoff_maximo
+            )
+
+            return False
+
+        with self._candado:
+            self.lotes_enviados += 1
+            self.instantaneas_enviadas += instantaneas
+            self.bytes_enviados += len(cuerpo)
+
+        self._espera = self.configuracion.backoff_inicial
+        self._proximo_intento = 0.0
+
+        return True
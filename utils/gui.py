@@ -1,26 +1,38 @@
 import tkinter as tk
-import config
-import threading
-
-# * Smartmontools.
-import utils.smartmontools as smartmontools
+import time
 
 from tkinter import ttk
-from datetime import datetime
+
+import utils.vista_modelo as vista_modelo
 
 class GUI(tk.Tk):
-    def __init__(self, cpu_metrics, storage_metrics, sistema_operativo):
+    def __init__(self, motor, sistema_operativo):
         super().__init__()
         self.title('Monitor Agent')
         self.geometry("800x900")
-        self.cpu_metrics = cpu_metrics
-        self.storage_metrics = storage_metrics
+        self.motor = motor
         self.sistema_operativo = sistema_operativo
 
+        # * Los widgets se actualizan a través del modelo de la vista, que
+        # * sólo devuelve los textos que cambiaron desde el último cuadro.
+        # * Cada clave del modelo se asocia a un StringVar o a un Text.
+        self.vista_modelo = vista_modelo.VistaModelo()
+        self._variables = {}
+        self._textos = {}
+
+        # * Versión del diario de alertas renderizada en el registro.
+        self._version_alertas = None
+
+        # * Los widgets de cada disco se indexan por la clave del disco, y no
+        # * por su posición, para que conectar o retirar un disco no desplace
+        # * a los demás.
+        self.disco_frames = {}
         self.horas_encendido_var = {}
         self.disco_temperatura_var = {}
         self.particiones_text = {}
         self.disk_rw_var = {}
+        self.disk_io_var = {}
+        self.io_particiones_text = {}
 
         # Scrollable frame
         container = ttk.Frame(self)
@@ -42,8 +54,10 @@ class GUI(tk.Tk):
 
         # Sections
         self.create_cpu_section()
-        self.create_storage_section(storage_metrics)
+        self.storage_frame = ttk.LabelFrame(self.scrollable_frame, text="Almacenamiento")
+        self.storage_frame.pack(fill="x", padx=10, pady=5)
         self.create_log_section()
+        self.create_diagnostics_section()
 
         self._actualizar_aplicacion()
 
@@ -70,61 +84,106 @@ class GUI(tk.Tk):
         self.cpu_total_usage_var = tk.StringVar(value="0%")
         ttk.Label(cpu_frame, textvariable=self.cpu_total_usage_var).grid(row=3, column=1, sticky="w")
 
+        # Desglose del uso total
+        ttk.Label(cpu_frame, text="Desglose:").grid(row=4, column=0, sticky="w")
+        self.cpu_breakdown_var = tk.StringVar(value="Desconocido")
+        ttk.Label(cpu_frame, textvariable=self.cpu_breakdown_var).grid(row=4, column=1, sticky="w")
+
         # Uso por núcleo (lista)
-        ttk.Label(cpu_frame, text="Uso por núcleo:").grid(row=4, column=0, sticky="nw")
+        ttk.Label(cpu_frame, text="Uso por núcleo:").grid(row=5, column=0, sticky="nw")
         self.cpu_core_usages_text = tk.Text(cpu_frame, height=5, width=50)
-        self.cpu_core_usages_text.grid(row=4, column=1, sticky="w")
+        self.cpu_core_usages_text.grid(row=5, column=1, sticky="w")
 
         # Temperatura total
-        ttk.Label(cpu_frame, text="Temperatura General:").grid(row=5, column=0, sticky="w")
+        ttk.Label(cpu_frame, text="Temperatura General:").grid(row=6, column=0, sticky="w")
         self.cpu_temp_total_var = tk.StringVar(value="Desconocido")
-        ttk.Label(cpu_frame, textvariable=self.cpu_temp_total_var).grid(row=5, column=1, sticky="w")
+        ttk.Label(cpu_frame, textvariable=self.cpu_temp_total_var).grid(row=6, column=1, sticky="w")
 
         # Temperatura de paquete
-        ttk.Label(cpu_frame, text="Temperatura de paquete:").grid(row=6, column=0, sticky="w")
+        ttk.Label(cpu_frame, text="Temperatura de paquete:").grid(row=7, column=0, sticky="w")
         self.cpu_temp_package_var = tk.StringVar(value="Desconocido")
-        ttk.Label(cpu_frame, textvariable=self.cpu_temp_package_var).grid(row=6, column=1, sticky="w")
+        ttk.Label(cpu_frame, textvariable=self.cpu_temp_package_var).grid(row=7, column=1, sticky="w")
 
         # Temperaturas detalladas (por núcleo, etc.)
-        ttk.Label(cpu_frame, text="Temperaturas por núcleo:").grid(row=7, column=0, sticky="nw")
+        ttk.Label(cpu_frame, text="Temperaturas por núcleo:").grid(row=8, column=0, sticky="nw")
         self.cpu_temp_text = tk.Text(cpu_frame, height=5, width=50)
-        self.cpu_temp_text.grid(row=7, column=1, sticky="w")
-
-    def create_storage_section(self, storage_metrics):
-        storage_frame = ttk.LabelFrame(self.scrollable_frame, text="Almacenamiento")
-        storage_frame.pack(fill="x", padx=10, pady=5)
-
-        if self.sistema_operativo == 'nt':
-            # * Se obtiene la información del almacenamiento en Windows.
-            almacenamiento = storage_metrics.obtener_almacenamiento_windows()
-        if self.sistema_operativo == 'posix':
-            # * Se obtiene la información del almacenamiento en Linux.
-            almacenamiento = storage_metrics.obtener_almacenamiento_linux()
-
-        for i, disco in enumerate(almacenamiento):
-            # Subframe para un disco
-            disco_frame = ttk.LabelFrame(storage_frame, text=disco['modelo'])
-            disco_frame.pack(fill="x", padx=5, pady=5)
-
-            # Horas de encendido
-            ttk.Label(disco_frame, text="Horas de encendido:").grid(row=1, column=0, sticky="w")
-            self.horas_encendido_var[i] = tk.StringVar(value="Desconocido")
-            ttk.Label(disco_frame, textvariable=self.horas_encendido_var[i]).grid(row=1, column=1, sticky="w")
-
-            # Temperatura del disco
-            ttk.Label(disco_frame, text="Temperatura del disco:").grid(row=2, column=0, sticky="w")
-            self.disco_temperatura_var[i] = tk.StringVar(value="Desconocido")
-            ttk.Label(disco_frame, textvariable=self.disco_temperatura_var[i]).grid(row=2, column=1, sticky="w")
-
-            # Reads/Writes
-            ttk.Label(disco_frame, text="Datos leídos/escritos:").grid(row=3, column=0, sticky="w")
-            self.disk_rw_var[i] = tk.StringVar(value=disco['modelo'])
-            ttk.Label(disco_frame, textvariable=self.disk_rw_var[i]).grid(row=3, column=1, sticky="w")
-
-            # Particiones
-            ttk.Label(disco_frame, text="Particiones:").grid(row=4, column=0, sticky="nw")
-            self.particiones_text[i] = tk.Text(disco_frame, height=5, width=60)
-            self.particiones_text[i].grid(row=4, column=1, sticky="w")
+        self.cpu_temp_text.grid(row=8, column=1, sticky="w")
+
+        self._variables.update({
+            'cpu.modelo': self.cpu_model_var,
+            'cpu.nucleos_fisicos': self.cpu_physical_var,
+            'cpu.nucleos_logicos': self.cpu_logical_var,
+            'cpu.uso_total': self.cpu_total_usage_var,
+            'cpu.desglose': self.cpu_breakdown_var,
+            'cpu.temperatura_promedio': self.cpu_temp_total_var,
+            'cpu.temperatura_paquete': self.cpu_temp_package_var,
+        })
+        self._textos.update({
+            'cpu.uso_nucleos': self.cpu_core_usages_text,
+            'cpu.temperatura_nucleos': self.cpu_temp_text,
+        })
+
+    def create_disk_section(self, disco):
+        # Subframe para un disco
+        clave = disco.clave
+        disco_frame = ttk.LabelFrame(self.storage_frame, text=disco.modelo)
+        disco_frame.pack(fill="x", padx=5, pady=5)
+        self.disco_frames[clave] = disco_frame
+
+        # Horas de encendido
+        ttk.Label(disco_frame, text="Horas de encendido:").grid(row=1, column=0, sticky="w")
+        self.horas_encendido_var[clave] = tk.StringVar(value="Desconocido")
+        ttk.Label(disco_frame, textvariable=self.horas_encendido_var[clave]).grid(row=1, column=1, sticky="w")
+
+        # Temperatura del disco
+        ttk.Label(disco_frame, text="Temperatura del disco:").grid(row=2, column=0, sticky="w")
+        self.disco_temperatura_var[clave] = tk.StringVar(value="Desconocido")
+        ttk.Label(disco_frame, textvariable=self.disco_temperatura_var[clave]).grid(row=2, column=1, sticky="w")
+
+        # Reads/Writes
+        ttk.Label(disco_frame, text="Datos leídos/escritos:").grid(row=3, column=0, sticky="w")
+        self.disk_rw_var[clave] = tk.StringVar(value=disco.modelo)
+        ttk.Label(disco_frame, textvariable=self.disk_rw_var[clave]).grid(row=3, column=1, sticky="w")
+
+        # Entrada/salida del disco y de sus particiones
+        ttk.Label(disco_frame, text="Entrada/salida:").grid(row=4, column=0, sticky="w")
+        self.disk_io_var[clave] = tk.StringVar(value="Desconocido")
+        ttk.Label(disco_frame, textvariable=self.disk_io_var[clave]).grid(row=4, column=1, sticky="w")
+
+        ttk.Label(disco_frame, text="E/S por partición:").grid(row=5, column=0, sticky="nw")
+        self.io_particiones_text[clave] = tk.Text(disco_frame, height=3, width=60)
+        self.io_particiones_text[clave].grid(row=5, column=1, sticky="w")
+
+        # Particiones
+        ttk.Label(disco_frame, text="Particiones:").grid(row=6, column=0, sticky="nw")
+        self.particiones_text[clave] = tk.Text(disco_frame, height=5, width=60)
+        self.particiones_text[clave].grid(row=6, column=1, sticky="w")
+
+        self._variables.update({
+            f'disco.{clave}.horas_encendido': self.horas_encendido_var[clave],
+            f'disco.{clave}.temperatura': self.disco_temperatura_var[clave],
+            f'disco.{clave}.datos_leidos_escritos': self.disk_rw_var[clave],
+            f'disco.{clave}.io': self.disk_io_var[clave],
+        })
+        self._textos[f'disco.{clave}.particiones'] = self.particiones_text[clave]
+        self._textos[f'disco.{clave}.io_particiones'] = self.io_particiones_text[clave]
+
+    def destroy_disk_section(self, clave):
+        self.disco_frames.pop(clave).destroy()
+        del self.horas_encendido_var[clave]
+        del self.disco_temperatura_var[clave]
+        del self.disk_rw_var[clave]
+        del self.disk_io_var[clave]
+        del self.particiones_text[clave]
+        del self.io_particiones_text[clave]
+
+        for memoria in (self._variables, self._textos):
+            for clave_vista in [c for c in memoria if c.startswith(f'disco.{clave}.')]:
+                del memoria[clave_vista]
+
+        # * Si el disco se vuelve a conectar, sus widgets nuevos se
+        # * renderizan desde cero.
+        self.vista_modelo.olvidar(f'disco.{clave}.')
 
     def create_log_section(self):
         """Crea una sección con un área de texto grande para logs o información adicional"""
@@ -142,182 +201,162 @@ class GUI(tk.Tk):
         self.log_text.pack(side="left", fill="both", expand=True)
         log_scrollbar.pack(side="right", fill="y")
 
-    def _actualizar_metricas(
-        self,
-        configuracion_metricas_cpu,
-        configuracion_metricas_storage,
-        umbrales_cpu_uso,
-        umbrales_cpu_temperatura_paquete,
-        umbrales_storage_temperatura,
-        umbrales_storage_espacio_libre
-
-    ):
-        # * CPU.
-        if configuracion_metricas_cpu:
-            # * Se obtiene el modelo de la CPU.
-            if self.cpu_metrics.modelo is None:
-                self.cpu_metrics.obtener_modelo_cpu()
-
-            self.cpu_model_var.set(self.cpu_metrics.modelo)
-
-            # * Se obtienen los núcleos físicos y lógicos de la CPU.
-            self.cpu_physical_var.set(f'{self.cpu_metrics.obtener_nucleos_fisicos()}')
-            self.cpu_logical_var.set(f'{self.cpu_metrics.obtener_nucleos_logicos()}')
-
-            # * Se obtiene el uso de la CPU en un hilo separado.
-            def obtener_uso_cpu_async():
-                uso_cpu = self.cpu_metrics.obtener_uso_cpu()
-                self.after(0, lambda: self._actualizar_uso_cpu(uso_cpu, umbrales_cpu_uso))
-
-            threading.Thread(target=obtener_uso_cpu_async, daemon=True).start()
-
-            # * Se obtiene la temperatura de la CPU en Windows.
-            if self.sistema_operativo == 'nt':
-                temperatura_cpu = self.cpu_metrics.obtener_temperatura_cpu_windows(self.cpu_metrics.modelo)
-
-                self.cpu_temp_total_var.set(f'{temperatura_cpu[1]}°C')
-                self.cpu_temp_package_var.set(f'{temperatura_cpu[2]}°C')
-
-                if self.cpu_metrics.modelo.startswith('Intel'):
-                    self.cpu_temp_text.delete("1.0", "end")
-                    for nucleo, temperatura in enumerate(temperatura_cpu[0]):
-                        self.cpu_temp_text.insert("end", f"Núcleo {nucleo}: {temperatura} °C\n")
-
-            # * Se obtiene la temperatura de la CPU en Linux.
-            if self.sistema_operativo == 'posix':
-                temperatura_cpu = self.cpu_metrics.obtener_temperatura_cpu_linux()
-
-                self.cpu_temp_total_var.set(f'{temperatura_cpu[1]}°C')
-                self.cpu_temp_package_var.set(f'{temperatura_cpu[2]}°C')
-
-                self.cpu_temp_text.delete("1.0", "end")
-
-                for nucleo, temperatura in enumerate(temperatura_cpu[0]):
-                    self.cpu_temp_text.insert("end", f"Núcleo {nucleo}: {temperatura} °C\n")
-
-            if temperatura_cpu[2] >= umbrales_cpu_temperatura_paquete:
-                mensaje = f'[{datetime.now().strftime("%H:%M:%S")}] Alerta: Temperatura de CPU alta: {temperatura_cpu[2]}°C\n'
-                self.log_text.insert("end", mensaje)
-                self.log_text.see("end")
-
-        # * Almacenamiento.
-        if configuracion_metricas_storage:
-            instancia_smartmontools = smartmontools.Smartmontools()
-
-            if self.sistema_operativo == 'nt':
-                # * Se obtiene la información del almacenamiento en Windows.
-                almacenamiento = self.storage_metrics.obtener_almacenamiento_windows()
-            if self.sistema_operativo == 'posix':
-                # * Se obtiene la información del almacenamiento en Linux.
-                almacenamiento = self.storage_metrics.obtener_almacenamiento_linux()
-                
-            for i, disco in enumerate(almacenamiento):
-                if self.sistema_operativo == 'nt':
-                    # * La primera partición en el tuple de particiones va a servir
-                    # * como partición representante del disco, y de esta manera de
-                    # * obtendrán las métricas del disco.
-                    particion_representante = disco['particiones'][0]['particion']
-
-                    resultado_smartctl = (
-                        instancia_smartmontools.ejecutar_smartmontools(
-                            particion_representante
-                        )
-                    )
-
-                if self.sistema_operativo == 'posix':
-                    # * En Linux, se obtiene el nombre del disco directamente del
-                    # * dictionary del disco, que se usará para obtener las métricas.
-                    disco_nombre = disco['nombre']
-
-                    resultado_smartctl = (
-                        instancia_smartmontools.ejecutar_smartmontools(disco_nombre)
-                    )
-
-                # * Se obtienen las horas de encendido del disco en Windows.
-                disco_horas_encendido = (
-                    self.storage_metrics.obtener_horas_encendido(resultado_smartctl)
-                )
-
-                # * Se obtiene el total de datos leídos y escritos del disco en
-                # * Windows.
-                datos_leidos_escritos = (
-                    self.storage_metrics.obtener_datos_leidos_escritos(resultado_smartctl)
-                )
-
-                # * Se obtiene la temperatura del disco en Windows.
-                temperatura_disco = (
-                    self.storage_metrics.obtener_temperatura(resultado_smartctl)
-                )
-
-                self.horas_encendido_var[i].set(f'{disco_horas_encendido} horas')
-                self.disco_temperatura_var[i].set(f'{temperatura_disco} °C')
-                self.disk_rw_var[i].set(f'Reads {datos_leidos_escritos[0]} bytes, Writes {datos_leidos_escritos[1]} bytes')
-
-                self.particiones_text[i].delete("1.0", "end")
-
-                if temperatura_disco >= umbrales_storage_temperatura:
-                    mensaje = f'[{datetime.now().strftime("%H:%M:%S")}] Alerta: Temperatura de disco {disco['modelo']}: {temperatura_disco} °C\n'
-                    self.log_text.insert("end", mensaje)
-                    self.log_text.see("end")
-
-                for part in disco['particiones']:
-                    self.particiones_text[i].insert('end', f'Partición: {part['particion']}\n')
-                    self.particiones_text[i].insert('end', f'Sistema de Archivos: {part['sistema_archivos']}\n')
-
-                    # * Se obtiene el uso por partición en Windows.
-                    uso_particion = (
-                        self.storage_metrics.obtener_uso_particion(part['particion'])
-                    )
-
-                    self.particiones_text[i].insert('end', f'Espacio total (bytes): {uso_particion[0]}\n')
-                    self.particiones_text[i].insert('end', f'Espacio usado (bytes): {uso_particion[1]}\n')
-                    self.particiones_text[i].insert('end', f'Espacio libre (bytes): {uso_particion[2]}\n')
-                    self.particiones_text[i].insert('end', f'Porcentaje usado: {uso_particion[3]}%\n\n')
-
-                    if uso_particion[2] <= umbrales_storage_espacio_libre:
-                        mensaje = (
-                            f'[{datetime.now().strftime("%H:%M:%S")}] Alerta: '
-                            f'Espacio libre bajo en {part['particion']}: '
-                            f'{uso_particion[2]} bytes\n'
-                        )
-                        self.log_text.insert("end", mensaje)
-                        self.log_text.see("end")
-
-    def _actualizar_uso_cpu(self, uso_cpu, umbral_cpu_uso):
-        self.cpu_total_usage_var.set(f'{uso_cpu[1]}%')
-
-        self.cpu_core_usages_text.delete("1.0", "end")
-
-        for nucleo, uso in enumerate(uso_cpu[0]):
-            self.cpu_core_usages_text.insert("end", f"Núcleo {nucleo}: {uso}%\n")
-
-        if uso_cpu[1] >= umbral_cpu_uso:
-            mensaje = f'[{datetime.now().strftime("%H:%M:%S")}] Alerta: Uso de CPU alto: {uso_cpu[1]}%\n'
-            self.log_text.insert("end", mensaje)
-            self.log_text.see("end")
-
-    def _actualizar_aplicacion(self):
-        # * Se cargan los parámetros de configuración, comenzando por el
-        # * intervalo de tiempo entre cada iteración. En el caso de la métrica
-        # * del uso de la CPU, este demora 5 segundos, por lo que el mínimo
-        # * valor del intervalo debe ser 5 segundos.
-        configuracion = config.Config().parametros
-
-        intervalo = configuracion.get('intervalo')
-        configuracion_metricas_cpu = configuracion.get('metricas').get('cpu')
-        configuracion_metricas_storage = (
-            configuracion.get('metricas').get('storage')
+        self._textos['alertas'] = self.log_text
+
+    def create_diagnostics_section(self):
+        diagnostics_frame = ttk.LabelFrame(self.scrollable_frame, text="Diagnóstico")
+        diagnostics_frame.pack(fill="x", padx=10, pady=5)
+
+        # Tiempo del hilo de la GUI por cuadro
+        ttk.Label(diagnostics_frame, text="Tiempo por cuadro:").grid(row=0, column=0, sticky="w")
+        self.frame_time_var = tk.StringVar(value="Desconocido")
+        ttk.Label(diagnostics_frame, textvariable=self.frame_time_var).grid(row=0, column=1, sticky="w")
+
+        # Contadores de ejecuciones de los recolectores
+        ttk.Label(diagnostics_frame, text="Recolectores:").grid(row=1, column=0, sticky="nw")
+        self.collectors_var = tk.StringVar(value="Desconocido")
+        ttk.Label(diagnostics_frame, textvariable=self.collectors_var, justify="left").grid(row=1, column=1, sticky="w")
+
+        # Estado de las fuentes de métricas
+        ttk.Label(diagnostics_frame, text="Fuentes:").grid(row=2, column=0, sticky="nw")
+        self.sources_var = tk.StringVar(value="Desconocido")
+        ttk.Label(diagnostics_frame, textvariable=self.sources_var, justify="left").grid(row=2, column=1, sticky="w")
+
+        self._variables.update({
+            'diagnostico.tiempo_cuadro': self.frame_time_var,
+            'diagnostico.recolectores': self.collectors_var,
+            'diagnostico.fuentes': self.sources_var,
+        })
+
+    def _actualizar_texto(self, widget, diferencia):
+        # * Sólo se reemplazan las líneas que cambiaron; las líneas de un Text
+        # * se indexan desde 1.
+        for indice, linea in diferencia.cambiadas:
+            widget.delete(f"{indice + 1}.0", f"{indice + 1}.end")
+            widget.insert(f"{indice + 1}.0", linea)
+
+        if diferencia.agregadas:
+            widget.insert("end", ''.join(f'{linea}\n' for linea in diferencia.agregadas))
+
+        if diferencia.eliminar_desde is not None:
+            widget.delete(f"{diferencia.eliminar_desde + 1}.0", "end")
+
+    def _aplicar_cambios(self, cambios):
+        for clave, valor in cambios.etiquetas:
+            self._variables[clave].set(valor)
+
+        for clave, diferencia in cambios.textos:
+            self._actualizar_texto(self._textos[clave], diferencia)
+
+    def _renderizar_cpu(self, metricas_cpu, obsoletas):
+        self._aplicar_cambios(self.vista_modelo.diferenciar(
+            *vista_modelo.vista_cpu(metricas_cpu, self.sistema_operativo, obsoletas)
+        ))
+
+    def _renderizar_almacenamiento(self, almacenamiento, obsoletas):
+        # * Las secciones de los discos se crean y se eliminan según los
+        # * discos presentes en cada instantánea, identificados por su clave,
+        # * para reflejar los discos conectados o retirados en caliente.
+        claves = {disco.clave for disco in almacenamiento}
+
+        for clave in list(self.disco_frames):
+            if clave not in claves:
+                self.destroy_disk_section(clave)
+
+        for disco in almacenamiento:
+            if disco.clave not in self.disco_frames:
+                self.create_disk_section(disco)
+
+            self._aplicar_cambios(self.vista_modelo.diferenciar(
+                *vista_modelo.vista_disco(disco, obsoletas)
+            ))
+
+    def _renderizar_io(self, io):
+        # * La entrada/salida se renderiza sólo en las secciones de los discos
+        # * ya creadas por el almacenamiento.
+        for io_disco in io:
+            if io_disco.clave in self.disco_frames:
+                self._aplicar_cambios(self.vista_modelo.diferenciar(
+                    *vista_modelo.vista_io(io_disco)
+                ))
+
+    def _renderizar_diagnostico(self):
+        estadisticas = self.motor.obtener_estadisticas_cuadro()
+        contadores = self.motor.obtener_contadores_recoleccion()
+        fuentes = self.motor.obtener_salud_fuentes()
+
+        self._aplicar_cambios(self.vista_modelo.diferenciar({
+            'diagnostico.tiempo_cuadro': (
+                f'{estadisticas.ultimo * 1000:.2f} ms '
+                f'(promedio {estadisticas.promedio * 1000:.2f} ms, '
+                f'máximo {estadisticas.maximo * 1000:.2f} ms)'
+            ),
+            'diagnostico.recolectores': '\n'.join(
+                f'{nombre}: {c.ejecutadas}/{c.programadas} ejecutadas, '
+                f'{c.solapadas} solapadas, {c.descartadas} descartadas, '
+                f'{c.errores} errores, última {c.ultima_duracion * 1000:.0f} ms'
+                for nombre, c in contadores.items()
+            ),
+            'diagnostico.fuentes': '\n'.join(
+                f'{nombre}: {f.estado}, {f.exitos} exitosas, {f.errores} errores, '
+                f'{f.omitidas} omitidas, latencia {f.latencia_ultima * 1000:.0f} ms '
+                f'(promedio {f.latencia_promedio * 1000:.0f} ms)'
+                + (f', reintento en {f.proximo_intento:.0f} s' if f.estado == 'abierto' else '')
+                for nombre, f in fuentes.items()
+            ),
+        }, {}))
+
+    def _renderizar_alertas(self):
+        # * El registro muestra sólo las últimas entradas del diario de
+        # * alertas, que ya agrupa las repeticiones, por lo que el widget no
+        # * crece sin límite. Si el diario no cambió, no se renderiza.
+        diario = self.motor.diario_alertas
+
+        if diario.version == self._version_alertas:
+            return
+
+        self._version_alertas = diario.version
+
+        lineas_alertas = self.motor.configuracion_gui.lineas_alertas
+        cambios = self.vista_modelo.diferenciar(
+            *vista_modelo.vista_alertas(diario.ultimas(lineas_alertas))
         )
 
-        umbrales_cpu_uso = configuracion.get('umbrales').get('cpu').get('uso')
-        umbrales_cpu_temperatura_paquete = configuracion.get('umbrales').get('cpu').get('temperatura_paquete')
-        umbrales_storage_temperatura = configuracion.get('umbrales').get('storage').get('temperatura')
-        umbrales_storage_espacio_libre = configuracion.get('umbrales').get('storage').get('espacio_libre')
-
-        self._actualizar_metricas(
-            configuracion_metricas_cpu, configuracion_metricas_storage,
-            umbrales_cpu_uso, umbrales_cpu_temperatura_paquete,
-            umbrales_storage_temperatura, umbrales_storage_espacio_libre
-        )
+        if cambios.textos:
+            self._aplicar_cambios(cambios)
+            self.log_text.see("end")
 
-        self.after(intervalo, self._actualizar_aplicacion)
+    def _actualizar_aplicacion(self):
+        # * La GUI sólo consume las instantáneas que el motor de recolección
+        # * ya publicó; nunca ejecuta recolectores ni lee archivos, por lo
+        # * que el cuadro no se bloquea por operaciones de entrada/salida. El
+        # * ritmo de los cuadros es independiente del de la recolección, y si
+        # * no hay instantáneas nuevas no se renderiza nada.
+        inicio = time.perf_counter()
+
+        instantaneas = self.motor.obtener_instantaneas_pendientes()
+
+        if instantaneas:
+            # * Sólo se renderiza la instantánea más reciente; las alertas de
+            # * todas las pendientes ya están en el diario de alertas.
+            ultima = instantaneas[-1]
+
+            if ultima.cpu is not None:
+                self._renderizar_cpu(ultima.cpu, ultima.obsoletas)
+            if ultima.almacenamiento is not None:
+                self._renderizar_almacenamiento(ultima.almacenamiento, ultima.obsoletas)
+            if ultima.io is not None:
+                self._renderizar_io(ultima.io)
+
+            self._renderizar_alertas()
+
+            self.motor.registrar_tiempo_cuadro(time.perf_counter() - inicio)
+
+        self._renderizar_diagnostico()
+
+        # * Los cuadros por segundo se leen en cada cuadro para que una
+        # * recarga de la configuración los aplique sin reiniciar. Se leen de
+        # * la configuración de la GUI que publica el planificador del motor,
+        # * no del servicio de configuración, que puede leer el archivo.
+        cuadros_por_segundo = self.motor.configuracion_gui.cuadros_por_segundo
+        self.after(max(1, round(1000 / cuadros_por_segundo)), self._actualizar_aplicacion)
@@ -0,0 +1,523 @@
+import math
+import threading
+
+from array import array
+from collections import namedtuple
+
+# * Ventana de una serie. Como el buffer es circular, las marcas de tiempo y
+# * los valores de la ventana pueden estar partidos en dos segmentos; cada
+# * elemento es un tuple de memoryviews (de uno o dos segmentos) sobre el
+# * buffer, sin copiar los datos.
+VentanaSerie = namedtuple('VentanaSerie', ['marcas', 'valores'])
+
+# * Ventana de un nivel de resumen, con la misma estructura que VentanaSerie.
+# * La marca de tiempo de cada cubeta es la de su inicio.
+VentanaResumen = namedtuple(
+    'VentanaResumen',
+    ['marcas', 'minimo', 'maximo', 'promedio', 'ultimo', 'p95']
+)
+
+# * Resultado de una consulta: la resolución en segundos del nivel elegido (0
+# * para las muestras crudas) y su ventana.
+ResultadoConsulta = namedtuple('ResultadoConsulta', ['resolucion', 'ventana'])
+
+class BufferCircular:
+    '''
+    Buffer circular de tamaño fijo para una serie de tiempo, con una columna
+    de marcas de tiempo monotónicas y una o más columnas de valores. La
+    memoria se reserva al crearlo y no crece sin importar cuántas muestras
+    se agreguen.
+    '''
+
+    def __init__(self, capacidad, tipo_ventana=VentanaSerie):
+        self.capacidad = capacidad
+        self.tipo_ventana = tipo_ventana
+
+        # * La primera columna es la de las marcas de tiempo.
+        self._columnas = tuple(
+            array('d', bytes(8 * capacidad))
+            for _ in tipo_ventana._fields
+        )
+        self._vistas = tuple(memoryview(columna) for columna in self._columnas)
+        self._marcas = self._columnas[0]
+
+        # * Posición donde se escribirá la siguiente muestra, y cantidad de
+        # * muestras válidas.
+        self._siguiente = 0
+        self.cantidad = 0
+
+    def agregar(self, marca, *valores):
+        '''
+        Agrega una muestra con un valor por columna, reemplazando la más
+        antigua si está lleno.
+        '''
+        posicion = self._siguiente
+
+        self._marcas[posicion] = marca
+        for columna, valor in zip(self._columnas[1:], valores):
+            columna[posicion] = valor
+
+        self._siguiente += 1
+        if self._siguiente == self.capacidad:
+            self._siguiente = 0
+
+        if self.cantidad < self.capacidad:
+            self.cantidad += 1
+
+    def _posicion(self, indice):
+        '''Devuelve la posición física del índice lógico (0 = más antigua).'''
+        posicion = self._siguiente - self.cantidad + indice
+
+        return posicion + self.capacidad if posicion < 0 else posicion
+
+    def _buscar(self, marca, incluida=True):
+        '''
+        Devuelve el índice lógico de la primera muestra con marca de tiempo
+        mayor o igual a 'marca' (o sólo mayor, si 'incluida' es False), por
+        búsqueda binaria.
+        '''
+        inferior = 0
+        superior = self.cantidad
+
+        while inferior < superior:
+            medio = (inferior + superior) // 2
+            actual = self._marcas[self._posicion(medio)]
+
+            if actual < marca or (not incluida and actual == marca):
+                inferior = medio + 1
+            else:
+                superior = medio
+
+        return inferior
+
+    def primera_marca(self):
+        '''Devuelve la marca de tiempo de la muestra más antigua, o None.'''
+        if self.cantidad == 0:
+            return None
+
+        return self._marcas[self._posicion(0)]
+
+    def ultimo(self):
+        '''Devuelve un tuple con la marca y los valores de la última muestra.'''
+        if self.cantidad == 0:
+            return None
+
+        posicion = self._posicion(self.cantidad - 1)
+
+        return tuple(columna[posicion] for columna in self._columnas)
+
+    def ventana(self, desde=None, hasta=None):
+        '''
+        Devuelve una ventana con las muestras cuya marca de tiempo está entre
+        'desde' y 'hasta' (inclusive; sin límite si son None), ordenadas de
+        la más antigua a la más reciente. Las vistas apuntan al buffer, por
+        lo que agregar muestras después puede sobrescribirlas; si se
+        necesitan conservar, deben copiarse.
+        '''
+        inicio = 0 if desde is None else self._buscar(desde)
+        final = (
+            self.cantidad if hasta is None
+            else self._buscar(hasta, incluida=False)
+        )
+        cantidad = final - inicio
+
+        if cantidad <= 0:
+            return self.tipo_ventana(*(() for _ in self._columnas))
+
+        primera = self._posicion(inicio)
+        final = primera + cantidad
+
+        if final <= self.capacidad:
+            segmentos = ((primera, final),)
+        else:
+            segmentos = (
+                (primera, self.capacidad), (0, final - self.capacidad)
+            )
+
+        return self.tipo_ventana(*(
+            tuple(vista[a:b] for a, b in segmentos) for vista in self._vistas
+        ))
+
+class EstimadorP2:
+    '''
+    Estimador de un cuantil en streaming con el algoritmo P² (Jain y
+    Chlamtac), que usa cinco marcadores en lugar de guardar las muestras.
+    Con menos de cinco muestras, el cuantil se calcula de forma exacta.
+    '''
+
+    def __init__(self, cuantil):
+        self.cuantil = cuantil
+        self.reiniciar()
+
+    def reiniciar(self):
+        '''Descarta las muestras acumuladas.'''
+        cuantil = self.cuantil
+
+        self.cantidad = 0
+        self._alturas = []
+        self._posiciones = [0, 1, 2, 3, 4]
+        self._deseadas = [0, 2 * cuantil, 4 * cuantil, 2 + 2 * cuantil, 4]
+        self._incrementos = [0, cuantil / 2, cuantil, (1 + cuantil) / 2, 1]
+
+    def agregar(self, valor):
+        '''Agrega una muestra al estimador.'''
+        self.cantidad += 1
+        alturas = self._alturas
+
+        if self.cantidad <= 5:
+            alturas.append(valor)
+            if self.cantidad == 5:
+                alturas.sort()
+            return
+
+        posiciones = self._posiciones
+
+        # * Se busca la celda de la muestra, ajustando los extremos.
+        if valor < alturas[0]:
+            alturas[0] = valor
+            celda = 0
+        elif valor >= alturas[4]:
+            alturas[4] = valor
+            celda = 3
+        else:
+            celda = 0
+            while valor >= alturas[celda + 1]:
+                celda += 1
+
+        for indice in range(celda + 1, 5):
+            posiciones[indice] += 1
+        for indice in range(5):
+            self._deseadas[indice] += self._incrementos[indice]
+
+        # * Se ajustan los marcadores intermedios que se alejaron de su
+        # * posición deseada.
+        for indice in range(1, 4):
+            diferencia = self._deseadas[indice] - posiciones[indice]
+
+            if (
+                diferencia >= 1 and
+                posiciones[indice + 1] - posiciones[indice] > 1
+            ) or (
+                diferencia <= -1 and
+                posiciones[indice - 1] - posiciones[indice] < -1
+            ):
+                paso = 1 if diferencia > 0 else -1
+                altura = self._parabolica(indice, paso)
+
+                if not alturas[indice - 1] < altura < alturas[indice + 1]:
+                    altura = self._lineal(indice, paso)
+
+                alturas[indice] = altura
+                posiciones[indice] += paso
+
+    def _parabolica(self, indice, paso):
+        '''Predicción parabólica de la altura de un marcador.'''
+        alturas = self._alturas
+        posiciones = self._posiciones
+
+        return alturas[indice] + paso / (
+            posiciones[indice + 1] - posiciones[indice - 1]
+        ) * (
+            (posiciones[indice] - posiciones[indice - 1] + paso) *
+            (alturas[indice + 1] - alturas[indice]) /
+            (posiciones[indice + 1] - posiciones[indice]) +
+            (posiciones[indice + 1] - posiciones[indice] - paso) *
+            (alturas[indice] - alturas[indice - 1]) /
+            (posiciones[indice] - posiciones[indice - 1])
+        )
+
+    def _lineal(self, indice, paso):
+        '''Predicción lineal de la altura de un marcador.'''
+        alturas = self._alturas
+        posiciones = self._posiciones
+
+        return alturas[indice] + paso * (
+            alturas[indice + paso] - alturas[indice]
+        ) / (posiciones[indice + paso] - posiciones[indice])
+
+    def valor(self):
+        '''Devuelve la estimación del cuantil, o NaN si no hay muestras.'''
+        if self.cantidad == 0:
+            return math.nan
+
+        if self.cantidad >= 5:
+            return self._alturas[2]
+
+        # * Interpolación lineal entre las muestras ordenadas.
+        muestras = sorted(self._alturas)
+        posicion = self.cuantil * (len(muestras) - 1)
+        inferior = int(posicion)
+        superior = min(inferior + 1, len(muestras) - 1)
+
+        return muestras[inferior] + (posicion - inferior) * (
+            muestras[superior] - muestras[inferior]
+        )
+
+class NivelResumen:
+    '''
+    Nivel de resumen de una serie, con cubetas de 'resolucion' segundos. La
+    cubeta en curso se actualiza con cada muestra, y al pasar a la siguiente
+    se guarda en 'destino' (un buffer circular, o un segmento en disco), por
+    lo que nunca se vuelven a recorrer las muestras crudas.
+    '''
+
+    def __init__(self, resolucion, destino):
+        self.resolucion = resolucion
+        self.destino = destino
+
+        self._cubeta = None
+        self._minimo = math.inf
+        self._maximo = -math.inf
+        self._suma = 0.0
+        self._cantidad = 0
+        self._ultimo = math.nan
+        self._p95 = EstimadorP2(0.95)
+
+    def agregar(self, marca, valor):
+        '''Agrega una muestra a la cubeta que le corresponde.'''
+        cubeta = math.floor(marca / self.resolucion) * self.resolucion
+
+        if cubeta != self._cubeta:
+            self.cerrar_cubeta()
+            self._cubeta = cubeta
+
+        if valor < self._minimo:
+            self._minimo = valor
+        if valor > self._maximo:
+            self._maximo = valor
+
+        self._suma += valor
+        self._cantidad += 1
+        self._ultimo = valor
+        self._p95.agregar(valor)
+
+    def cerrar_cubeta_hasta(self, marca):
+        '''Cierra la cubeta en curso si termina en 'marca' o antes.'''
+        if self._cubeta is not None and (
+            self._cubeta + self.resolucion <= marca
+        ):
+            self.cerrar_cubeta()
+
+    def cerrar_cubeta(self):
+        '''Guarda la cubeta en curso en el destino y la reinicia.'''
+        if self._cantidad:
+            self.destino.agregar(
+                self._cubeta, self._minimo, self._maximo,
+                self._suma / self._cantidad, self._ultimo, self._p95.valor()
+            )
+
+        self._minimo = math.inf
+        self._maximo = -math.inf
+        self._suma = 0.0
+        self._cantidad = 0
+        self._ultimo = math.nan
+        self._p95.reiniciar()
+
+def _elegir_nivel(candidatos, desde):
+    '''
+    Devuelve el índice del nivel más grueso cuyos datos comienzan en 'desde'
+    o antes. Si ninguno lo cubre, devuelve el que tiene los datos más
+    antiguos.
+    '''
+    elegido = 0
+    primera_elegida = math.inf
+
+    for indice in reversed(range(len(candidatos))):
+        primera = candidatos[indice][1].primera_marca()
+
+        if primera is None:
+            continue
+
+        if desde is None or primera <= desde:
+            return indice
+
+        if primera < primera_elegida:
+            elegido = indice
+            primera_elegida = primera
+
+    return elegido
+
+def consultar_niveles(candidatos, desde, hasta=None):
+    '''
+    Recibe una list de tuples con la resolución (0 para las muestras crudas)
+    y la fuente de cada nivel candidato, de la más fina a la más gruesa, y
+    consulta el nivel más grueso que cubre el rango desde 'desde'. Si ninguno
+    lo cubre, consulta el que tiene los datos más antiguos.
+
+    Como los niveles de resumen sólo guardan las cubetas cerradas, el tramo
+    posterior a la última cubeta del nivel elegido (hasta 'hasta', o hasta
+    la muestra más reciente) se completa con los niveles más finos; las
+    muestras crudas se agregan con su valor en todas las columnas del
+    resumen.
+    '''
+    indice = _elegir_nivel(candidatos, desde)
+    resolucion, fuente = candidatos[indice]
+
+    # * En los niveles de resumen se incluye la cubeta que contiene a
+    # * 'desde'.
+    inicio = desde
+    if desde is not None and resolucion:
+        inicio = math.floor(desde / resolucion) * resolucion
+
+    ventana = fuente.ventana(inicio, hasta)
+
+    if indice == 0:
+        return ResultadoConsulta(resolucion, ventana)
+
+    # * El tramo faltante comienza donde termina la última cubeta cerrada.
+    if ventana.marcas:
+        desde = ventana.marcas[-1][-1] + resolucion
+
+    if hasta is not None and desde is not None and desde > hasta:
+        return ResultadoConsulta(resolucion, ventana)
+
+    cola = consultar_niveles(candidatos[:indice], desde, hasta).ventana
+
+    if not cola.marcas:
+        return ResultadoConsulta(resolucion, ventana)
+
+    if isinstance(cola, VentanaSerie):
+        cola = VentanaResumen(
+            cola.marcas,
+            *(cola.valores for _ in VentanaResumen._fields[1:])
+        )
+
+    return ResultadoConsulta(resolucion, VentanaResumen(*(
+        columna + columna_cola for columna, columna_cola in zip(ventana, cola)
+    )))
+
+class SerieMetrica:
+    '''
+    Serie de una métrica: las muestras crudas en un buffer circular y un
+    nivel de resumen por cada resolución configurada.
+    '''
+
+    def __init__(self, capacidad, niveles):
+        self.crudas = BufferCircular(capacidad)
+        self.niveles = tuple(
+            NivelResumen(
+                resolucion, BufferCircular(capacidad_nivel, VentanaResumen)
+            )
+            for resolucion, capacidad_nivel in niveles
+        )
+
+    def agregar(self, marca, valor):
+        '''Agrega una muestra cruda y actualiza los niveles de resumen.'''
+        self.crudas.agregar(marca, valor)
+
+        for nivel in self.niveles:
+            nivel.agregar(marca, valor)
+
+    def consultar(self, desde, resolucion=0):
+        '''Devuelve un ResultadoConsulta del nivel que corresponde.'''
+        candidatos = [(0, self.crudas)] + [
+            (nivel.resolucion, nivel.destino) for nivel in self.niveles
+            if nivel.resolucion <= resolucion
+        ]
+
+        return consultar_niveles(candidatos, desde)
+
+class HistorialMetricas:
+    '''
+    Almacén en memoria de series de tiempo, con un buffer circular de
+    capacidad fija por métrica y niveles de resumen (por ejemplo, de un
+    minuto y de una hora) con su propia retención. La memoria total sólo
+    depende de la cantidad de métricas (núcleos, discos y particiones) y no
+    del tiempo que lleva en ejecución el agente: la serie de una métrica
+    sin muestras durante 'olvido' segundos (por ejemplo, de un disco
+    retirado o de una partición desmontada) se descarta.
+    '''
+
+    def __init__(self, capacidad, niveles=(), olvido=3600):
+        self.capacidad = capacidad
+        self.niveles = tuple(niveles)
+        self.olvido = olvido
+
+        self._candado = threading.Lock()
+        self._series = {}
+
+        # * Marca de tiempo de la última muestra de cada serie, y de la
+        # * última vez que se olvidaron series.
+        self._vistas = {}
+        self._ultimo_olvido = -math.inf
+
+    def agregar(self, marca, muestras):
+        '''
+        Agrega a cada serie su muestra, donde 'muestras' es un iterable de
+        tuples con el nombre de la métrica y su valor. Los valores None se
+        omiten.
+        '''
+        with self._candado:
+            if marca - self._ultimo_olvido >= self.olvido:
+                self._olvidar(marca)
+
+            vistas = self._vistas
+
+            for nombre, valor in muestras:
+                if valor is None:
+                    continue
+
+                serie = self._series.get(nombre)
+
+                if serie is None:
+                    serie = SerieMetrica(self.capacidad, self.niveles)
+                    self._series[nombre] = serie
+
+                serie.agregar(marca, valor)
+                vistas[nombre] = marca
+
+    def _olvidar(self, marca):
+        '''
+        Descarta las series sin muestras desde hace 'olvido' segundos. Como
+        cada recolector agrega sólo sus propias muestras, una métrica
+        ausente de un lote no se descarta.
+        '''
+        self._ultimo_olvido = marca
+        limite = marca - self.olvido
+
+        for nombre in [
+            nombre for nombre, vista in self._vistas.items() if vista < limite
+        ]:
+            del self._vistas[nombre]
+            del self._series[nombre]
+
+    def nombres(self):
+        '''Devuelve un tuple con los nombres de las métricas registradas.'''
+        with self._candado:
+            return tuple(self._series)
+
+    def ultimo(self, nombre):
+        '''Devuelve la marca y el valor de la última muestra de una métrica.'''
+        with self._candado:
+            serie = self._series.get(nombre)
+
+            return None if serie is None else serie.crudas.ultimo()
+
+    def ventana(self, nombre, desde=None):
+        '''
+        Devuelve la VentanaSerie de las muestras crudas de una métrica desde
+        la marca de tiempo indicada, sin copiar los datos.
+        '''
+        with self._candado:
+            serie = self._series.get(nombre)
+
+            if serie is None:
+                return VentanaSerie((), ())
+
+            return serie.crudas.ventana(desde)
+
+    def consultar(self, nombre, desde=None, resolucion=0):
+        '''
+        Devuelve un ResultadoConsulta con la ventana de una métrica desde la
+        marca de tiempo indicada, usando el nivel más grueso que cubre el
+        rango con una resolución de a lo sumo 'resolucion' segundos. Las
+        muestras posteriores a la última cubeta cerrada del nivel se toman
+        de los niveles más finos.
+        '''
+        with self._candado:
+            serie = self._series.get(nombre)
+
+            if serie is None:
+                return ResultadoConsulta(0, VentanaSerie((), ()))
+
+            return serie.consultar(desde, resolucion)
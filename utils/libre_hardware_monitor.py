@@ -1,7 +1,9 @@
 import subprocess
 import os
 import psutil
+import re
 import sys
+import requests
 
 import xml.etree.ElementTree as ET
 
@@ -182,4 +184,176 @@ class LibreHardwareMonitor:
 
             # * Si no se puede iniciar Libre Hardware Monitor, se finaliza el
             # * agente.
-            sys.exit(1)
\ No newline at end of file
+            sys.exit(1)
+
+class ClienteLibreHardwareMonitor:
+    '''
+    Cliente del Web Server de Libre Hardware Monitor. Mantiene la conexión
+    HTTP abierta entre consultas, y resuelve una sola vez la ruta de los
+    sensores de temperatura de la CPU dentro del árbol de data.json, de modo
+    que en cada consulta sólo se accede a esos nodos.
+    '''
+
+    PATRON_NUCLEO_INTEL = re.compile(r'^CPU Core #(\d+)$')
+    PATRON_CCD_AMD = re.compile(r'^CCD(\d+) \(Tdie\)$')
+
+    def __init__(self, url='http://localhost:8085/data.json', timeout=3):
+        self.url = url
+        self.timeout = timeout
+
+        # * La sesión reutiliza la conexión TCP (keep-alive) entre consultas.
+        self._sesion = requests.Session()
+
+        # * Rutas resueltas de los sensores: cada ruta es un tuple con los
+        # * índices de 'Children' desde la raíz hasta el nodo del sensor. La
+        # * huella guarda el identificador esperado de cada nodo resuelto.
+        self._modelo = None
+        self._rutas_nucleos = None
+        self._ruta_paquete = None
+        self._huella = None
+        self.redescubrimientos = 0
+
+    def _identificador(self, nodo):
+        '''
+        Devuelve el identificador de un nodo: el SensorId si la versión de
+        Libre Hardware Monitor lo reporta, y si no, el texto del nodo.
+        '''
+        return nodo.get('SensorId') or nodo.get('Text')
+
+    def _resolver(self, datos, modelo):
+        '''
+        Recorre el árbol completo una vez y guarda la ruta de los sensores de
+        temperatura de los núcleos y del paquete de la CPU.
+        '''
+        rutas_nucleos = []
+        ruta_paquete = None
+
+        for indice_hardware, hardware in enumerate(
+            datos['Children'][0]['Children']
+        ):
+            # * Se accede al objeto de la CPU por medio de la imagen por
+            # * defecto que brinda Libre Hardware Monitor.
+            if hardware.get('ImageURL', '') != 'images_icon/cpu.png':
+                continue
+
+            for indice_sensor, sensor in enumerate(hardware['Children']):
+                # * Se accede al objeto que contiene los sensores de
+                # * temperatura.
+                if sensor['Text'] != 'Temperatures':
+                    continue
+
+                for indice_temperatura, sensor_temperatura in enumerate(
+                    sensor['Children']
+                ):
+                    ruta = (
+                        0, indice_hardware, indice_sensor, indice_temperatura
+                    )
+                    texto = sensor_temperatura['Text']
+
+                    # * En Intel se toma la temperatura de cada núcleo y la
+                    # * del paquete; en AMD, la de cada CCD y la de Tctl/Tdie.
+                    if modelo.startswith('Intel'):
+                        coincidencia = self.PATRON_NUCLEO_INTEL.match(texto)
+
+                        if coincidencia is not None:
+                            rutas_nucleos.append(
+                                (int(coincidencia.group(1)), ruta)
+                            )
+                        elif texto == 'CPU Package':
+                            ruta_paquete = ruta
+
+                    if modelo.startswith('AMD'):
+                        coincidencia = self.PATRON_CCD_AMD.match(texto)
+
+                        if coincidencia is not None:
+                            rutas_nucleos.append(
+                                (int(coincidencia.group(1)), ruta)
+                            )
+                        elif texto == 'Core (Tctl/Tdie)':
+                            ruta_paquete = ruta
+
+        self._modelo = modelo
+        self._rutas_nucleos = tuple(ruta for _, ruta in sorted(rutas_nucleos))
+        self._ruta_paquete = ruta_paquete
+        self._huella = tuple(
+            self._identificador(self._nodo(datos, ruta))
+            for ruta in self._rutas_resueltas()
+        )
+        self.redescubrimientos += 1
+
+    def _rutas_resueltas(self):
+        '''Devuelve todas las rutas resueltas, con la del paquete al final.'''
+        if self._ruta_paquete is None:
+            return self._rutas_nucleos
+
+        return self._rutas_nucleos + (self._ruta_paquete,)
+
+    def _nodo(self, datos, ruta):
+        '''Devuelve el nodo del árbol que está en la ruta indicada.'''
+        nodo = datos
+
+        for indice in ruta:
+            nodo = nodo['Children'][indice]
+
+        return nodo
+
+    def _coincide_huella(self, datos):
+        '''
+        Verifica que los nodos de las rutas resueltas sigan siendo los mismos
+        sensores, es decir, que la disposición del hardware no cambió.
+        '''
+        try:
+            return self._huella == tuple(
+                self._identificador(self._nodo(datos, ruta))
+                for ruta in self._rutas_resueltas()
+            )
+        except (IndexError, KeyError, TypeError):
+            return False
+
+    def _valor(self, nodo):
+        '''
+        Devuelve el valor de un sensor de temperatura. El valor tiene formato
+        string con el símbolo de grados Celsius, por lo que se convierte a
+        float.
+        '''
+        return float(
+            nodo['Value'].replace('°C', '').strip().replace(',', '.')
+        )
+
+    def obtener_temperatura_cpu(self, modelo):
+        '''
+        Devuelve la temperatura de la CPU en un tuple, donde el primer
+        elemento es un tuple conteniendo la temperatura de cada núcleo (de
+        cada CCD en AMD), el segundo elemento es la temperatura promedio de
+        los núcleos y el tercer elemento es la temperatura del paquete.
+        '''
+        respuesta = self._sesion.get(self.url, timeout=self.timeout)
+        respuesta.raise_for_status()
+        datos = respuesta.json()
+
+        # * El árbol completo sólo se vuelve a recorrer si cambió el modelo
+        # * o la disposición del hardware.
+        if modelo != self._modelo or not self._coincide_huella(datos):
+            self._resolver(datos, modelo)
+
+        temperatura_nucleos = tuple(
+            self._valor(self._nodo(datos, ruta))
+            for ruta in self._rutas_nucleos
+        )
+
+        paquete_cpu = None
+        if self._ruta_paquete is not None:
+            paquete_cpu = self._valor(self._nodo(datos, self._ruta_paquete))
+
+        if temperatura_nucleos:
+            temperatura_promedio = round(
+                sum(temperatura_nucleos) / len(temperatura_nucleos), 2
+            )
+        else:
+            temperatura_promedio = paquete_cpu
+
+        return (temperatura_nucleos, temperatura_promedio, paquete_cpu)
+
+    def cerrar(self):
+        '''Cierra la conexión con el Web Server.'''
+        self._sesion.close()
@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+
+from collections import namedtuple
+from datetime import datetime
+
+ContadoresRecolector = namedtuple(
+    'ContadoresRecolector',
+    [
+        'programadas', 'ejecutadas', 'solapadas', 'descartadas', 'errores',
+        'ultima_duracion'
+    ]
+)
+
+class _EstadoRecolector:
+    '''Estado interno de un recolector dentro del pool.'''
+
+    def __init__(self):
+        self.en_curso = False
+        self.pendiente = None
+
+        self.programadas = 0
+        self.ejecutadas = 0
+        self.solapadas = 0
+        self.descartadas = 0
+        self.errores = 0
+        self.ultima_duracion = 0.0
+
+class PoolRecolectores:
+    '''
+    Pool de hilos de trabajo persistentes que ejecuta los recolectores de
+    métricas, con a lo sumo un trabajo en curso por recolector.
+
+    Cuando se programa un recolector que todavía está en curso, la política de
+    solapamiento define qué hacer:
+
+    - 'omitir': se descarta la nueva ejecución.
+    - 'fusionar': se deja una única ejecución pendiente, que corre en cuanto
+      termine la actual; las siguientes se fusionan con esa pendiente.
+    - 'encolar_ultimo': igual que 'fusionar', pero la ejecución pendiente se
+      reemplaza por la más reciente, con sus argumentos.
+    '''
+
+    POLITICAS = ('omitir', 'fusionar', 'encolar_ultimo')
+
+    def __init__(self, trabajadores, politica='omitir'):
+        if politica not in self.POLITICAS:
+            raise ValueError(
+                f'Política de solapamiento desconocida: {politica}'
+            )
+
+        self.trabajadores = trabajadores
+        self.politica = politica
+
+        self._cola = queue.Queue()
+        self._candado = threading.Lock()
+        self._estados = {}
+        self._hilos = []
+
+    def iniciar(self):
+        '''Inicia los hilos de trabajo del pool.'''
+        for numero in range(self.trabajadores):
+            hilo = threading.Thread(
+                target=self._trabajar, name=f'pool-recolectores-{numero}',
+                daemon=True
+            )
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self):
+        '''Detiene los hilos de trabajo cuando terminen su trabajo actual.'''
+        for _ in self._hilos:
+            self._cola.put(None)
+
+        for hilo in self._hilos:
+            hilo.join(timeout=1)
+
+        self._hilos = []
+
+    def programar(self, nombre, funcion, *argumentos):
+        '''
+        Programa una ejecución del recolector. Devuelve True si se encoló o
+        quedó pendiente, y False si se descartó por estar en curso.
+        '''
+        trabajo = (nombre, funcion, argumentos)
+
+        with self._candado:
+            estado = self._estados.setdefault(nombre, _EstadoRecolector())
+            estado.programadas += 1
+
+            if not estado.en_curso:
+                estado.en_curso = True
+                self._cola.put(trabajo)
+                return True
+
+            estado.solapadas += 1
+
+            if self.politica == 'omitir':
+                estado.descartadas += 1
+                return False
+
+            if estado.pendiente is None:
+                estado.pendiente = trabajo
+            elif self.politica == 'fusionar':
+                # * Ya hay una ejecución pendiente, y esta se fusiona con
+                # * ella.
+                estado.descartadas += 1
+            else:
+                # * La ejecución pendiente se reemplaza por la más reciente.
+                estado.pendiente = trabajo
+                estado.descartadas += 1
+
+            return True
+
+    def obtener_contadores(self):
+        '''
+        Devuelve un dictionary con los contadores de cada recolector: las
+        ejecuciones programadas, ejecutadas, solapadas con una en curso,
+        descartadas y con error, y la duración de la última ejecución.
+        '''
+        with self._candado:
+            return {
+                nombre: ContadoresRecolector(
+                    estado.programadas, estado.ejecutadas, estado.solapadas,
+                    estado.descartadas, estado.errores,
+                    estado.ultima_duracion
+                )
+                for nombre, estado in self._estados.items()
+            }
+
+    def _trabajar(self):
+        '''Bucle de un hilo de trabajo del pool.'''
+        while True:
+            trabajo = self._cola.get()
+
+            if trabajo is None:
+                break
+
+            nombre, funcion, argumentos = trabajo
+            inicio = time.monotonic()
+            hubo_error = False
+
+            try:
+                funcion(*argumentos)
+            except (Exception, SystemExit) as error:
+                # * Un fallo en un recolector no debe detener al hilo de
+                # * trabajo, ni siquiera si el recolector intenta finalizar el
+                # * agente; se reintenta en la siguiente ejecución.
+                hubo_error = True
+
+                print(
+                    f'{datetime.now()} >>> *** Error en el recolector '
+                    f'{nombre} ***'
+                )
+                print(error)
+
+            with self._candado:
+                estado = self._estados[nombre]
+                estado.ejecutadas += 1
+                estado.ultima_duracion = time.monotonic() - inicio
+
+                if hubo_error:
+                    estado.errores += 1
+
+                # * Si quedó una ejecución pendiente, se encola de inmediato y
+                # * el recolector sigue en curso.
+                if estado.pendiente is not None:
+                    self._cola.put(estado.pendiente)
+                    estado.pendiente = None
+                else:
+                    estado.en_curso = False
@@ -0,0 +1,481 @@
+import itertools
+import math
+import multiprocessing
+import pickle
+import signal
+import struct
+import threading
+import time
+
+from collections import namedtuple
+from datetime import datetime
+
+# * Smartmontools.
+import utils.smartmontools as smartmontools
+
+# * Tipos de mensaje del canal entre el proceso principal y los procesos de
+# * trabajo.
+LLAMADA = 1
+RESULTADO = 2
+ERROR = 3
+
+# * Operaciones que ejecutan los procesos de trabajo. En los mensajes se
+# * codifican por su posición, en un byte.
+OPERACIONES = (
+    'almacenamiento_linux', 'almacenamiento_windows', 'uso_particion',
+    'smartctl', 'temperatura_cpu_windows'
+)
+
+# * Cada mensaje es una cabecera de dos bytes (tipo y operación) seguida de
+# * los argumentos o del resultado serializados con pickle. Los mensajes se
+# * envían con Connection.send_bytes(), que ya delimita su longitud.
+_CABECERA = struct.Struct('<BB')
+
+EstadisticasProceso = namedtuple(
+    'EstadisticasProceso',
+    [
+        'pid', 'vivo', 'reinicios', 'llamadas', 'errores', 'bytes_enviados',
+        'bytes_recibidos'
+    ]
+)
+
+class ErrorProceso(RuntimeError):
+    '''Error de una operación ejecutada en un proceso de trabajo.'''
+
+def codificar(tipo, operacion, carga):
+    '''Devuelve el mensaje binario de un tipo, una operación y su carga.'''
+    return _CABECERA.pack(tipo, OPERACIONES.index(operacion)) + pickle.dumps(
+        carga, protocol=pickle.HIGHEST_PROTOCOL
+    )
+
+def decodificar(mensaje):
+    '''Devuelve el tipo, la operación y la carga de un mensaje binario.'''
+    tipo, codigo = _CABECERA.unpack_from(mensaje)
+
+    return (
+        tipo, OPERACIONES[codigo],
+        pickle.loads(memoryview(mensaje)[_CABECERA.size:])
+    )
+
+class _Servidor:
+    '''
+    Recolectores alojados en un proceso de trabajo. Se importan recién en
+    el proceso de trabajo, para que el proceso principal no cargue los
+    módulos que no usa.
+    '''
+
+    def __init__(self, paralelismo_smart, ayudante_smart):
+        import metrics.smart as smart
+        import metrics.storage as storage
+
+        self.storage = storage.Storage()
+        self.smartmontools = smartmontools.Smartmontools(
+            paralelismo_smart, ayudante_smart
+        )
+        self.parser = smart.ParserSmart()
+        self.cpu = None
+
+    def almacenamiento_linux(self):
+        return self.storage.obtener_almacenamiento_linux()
+
+    def almacenamiento_windows(self):
+        return self.storage.obtener_almacenamiento_windows()
+
+    def uso_particion(self, particion):
+        return self.storage.obtener_uso_particion(particion)
+
+    def smartctl(self, dispositivos, timeout, paralelismo):
+        '''
+        Ejecuta smartctl sobre los dispositivos e interpreta las salidas en
+        este proceso, por lo que sólo se devuelven los RegistroSmart. El
+        paralelismo llega con cada llamada, para que una recarga de la
+        configuración se aplique sin reiniciar el proceso.
+        '''
+        self.smartmontools.configurar_paralelismo(paralelismo)
+
+        resultados = self.smartmontools.ejecutar_smartmontools_lote(
+            dispositivos, timeout=timeout
+        )
+
+        return {
+            dispositivo: (
+                resultado._replace(
+                    salida=None, registro=self.parser.parsear(resultado.salida)
+                ) if resultado.estado == 'ok' else resultado
+            )
+            for dispositivo, resultado in resultados.items()
+        }
+
+    def temperatura_cpu_windows(self, modelo):
+        if self.cpu is None:
+            import metrics.cpu as cpu
+
+            self.cpu = cpu.Cpu()
+
+        return self.cpu.obtener_temperatura_cpu_windows(modelo)
+
+def _trabajar(conexion, paralelismo_smart, ayudante_smart):
+    '''
+    Bucle de un proceso de trabajo: recibe llamadas por la conexión, las
+    ejecuta y responde con el resultado o con el error. Termina cuando el
+    proceso principal cierra la conexión.
+    '''
+    # * Ctrl+C lo maneja el proceso principal, que detiene a los procesos de
+    # * trabajo.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    servidor = _Servidor(paralelismo_smart, ayudante_smart)
+
+    while True:
+        try:
+            mensaje = conexion.recv_bytes()
+        except (EOFError, OSError):
+            return
+
+        _, operacion, argumentos = decodificar(mensaje)
+
+        try:
+            resultado = getattr(servidor, operacion)(*argumentos)
+        except Exception as error:
+            respuesta = codificar(
+                ERROR, operacion, f'{type(error).__name__}: {error}'
+            )
+        else:
+            respuesta = codificar(RESULTADO, operacion, resultado)
+
+        conexion.send_bytes(respuesta)
+
+class _ProcesoTrabajador:
+    '''
+    Un proceso de trabajo y su conexión. Atiende una llamada a la vez,
+    protegida por su candado.
+    '''
+
+    def __init__(self, numero, contexto, paralelismo_smart, ayudante_smart):
+        self.numero = numero
+        self.contexto = contexto
+        self.paralelismo_smart = paralelismo_smart
+        self.ayudante_smart = ayudante_smart
+
+        self.candado = threading.Lock()
+        self.proceso = None
+        self.conexion = None
+        self.ultimo_inicio = -math.inf
+
+        self.reinicios = 0
+        self.llamadas = 0
+        self.errores = 0
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+
+    def vivo(self):
+        return self.proceso is not None and self.proceso.is_alive()
+
+    def iniciar(self):
+        '''Inicia el proceso. Se llama con el candado tomado.'''
+        if self.proceso is not None:
+            self.reinicios += 1
+            self.finalizar()
+
+        conexion, conexion_hijo = self.contexto.Pipe()
+
+        self.proceso = self.contexto.Process(
+            target=_trabajar,
+            args=(conexion_hijo, self.paralelismo_smart, self.ayudante_smart),
+            name=f'recolector-{self.numero}', daemon=True
+        )
+        self.proceso.start()
+        conexion_hijo.close()
+
+        self.conexion = conexion
+        self.ultimo_inicio = time.monotonic()
+
+    def finalizar(self):
+        '''Cierra la conexión y finaliza el proceso si sigue vivo.'''
+        if self.conexion is not None:
+            self.conexion.close()
+            self.conexion = None
+
+        if self.proceso is not None and self.proceso.is_alive():
+            self.proceso.kill()
+            self.proceso.join(timeout=1)
+
+    def enviar(self, operacion, argumentos):
+        '''
+        Envía una llamada, iniciando el proceso si no está vivo. Lanza
+        ErrorProceso si no se pudo enviar. Se llama con el candado tomado.
+        '''
+        mensaje = codificar(LLAMADA, operacion, argumentos)
+
+        try:
+            if not self.vivo():
+                self.iniciar()
+
+            self.conexion.send_bytes(mensaje)
+        except (OSError, ValueError) as error:
+            self.errores += 1
+            self.finalizar()
+
+            raise ErrorProceso(
+                f'No se pudo enviar la llamada al proceso '
+                f'recolector-{self.numero}: {error}'
+            )
+
+        self.llamadas += 1
+        self.bytes_enviados += len(mensaje)
+
+    def recibir(self, timeout):
+        '''
+        Espera la respuesta de la llamada enviada y devuelve su resultado.
+        Si el proceso no responde a tiempo o murió, se finaliza (y se
+        reinicia en la próxima llamada o por el supervisor) y se lanza
+        ErrorProceso. Se llama con el candado tomado.
+        '''
+        try:
+            if not self.conexion.poll(timeout):
+                raise TimeoutError(
+                    f'El proceso no respondió en {timeout} segundos'
+                )
+
+            mensaje = self.conexion.recv_bytes()
+        except (EOFError, OSError) as error:
+            self.errores += 1
+            self.finalizar()
+
+            raise ErrorProceso(
+                f'El proceso recolector-{self.numero} finalizó o no '
+                f'respondió: {error or type(error).__name__}'
+            )
+
+        self.bytes_recibidos += len(mensaje)
+
+        tipo, _, carga = decodificar(mensaje)
+
+        if tipo == ERROR:
+            self.errores += 1
+            raise ErrorProceso(carga)
+
+        return carga
+
+class PoolProcesos:
+    '''
+    Pool de procesos de trabajo de larga vida que alojan los recolectores
+    lentos o que requieren permisos (lsblk/WMI, smartctl y su parser, el uso
+    de las particiones y Libre Hardware Monitor), para que no compitan por el
+    GIL con la GUI y para que un fallo en ellos no congele ni finalice al
+    agente. Un hilo supervisor reinicia los procesos que finalizan, con al
+    menos 'espera_reinicio' segundos entre reinicios de un mismo proceso.
+
+    Los procesos se crean con 'spawn', ya que el proceso principal tiene
+    hilos (y en Windows es el único método disponible).
+    '''
+
+    def __init__(self, configuracion_procesos, paralelismo_smart,
+                 ayudante_smart=''):
+        self.configuracion = configuracion_procesos
+
+        contexto = multiprocessing.get_context('spawn')
+
+        self._trabajadores = [
+            _ProcesoTrabajador(
+                numero, contexto, paralelismo_smart, ayudante_smart
+            )
+            for numero in range(configuracion_procesos.trabajadores)
+        ]
+        self._turno = itertools.count()
+
+        self._detener = threading.Event()
+        self._hilo_supervisor = None
+
+    def iniciar(self):
+        '''Inicia los procesos de trabajo y el hilo supervisor.'''
+        for trabajador in self._trabajadores:
+            with trabajador.candado:
+                trabajador.iniciar()
+
+        self._hilo_supervisor = threading.Thread(
+            target=self._supervisar, name='supervisor-procesos', daemon=True
+        )
+        self._hilo_supervisor.start()
+
+    def detener(self):
+        '''Detiene el hilo supervisor y finaliza los procesos de trabajo.'''
+        self._detener.set()
+
+        if self._hilo_supervisor is not None:
+            self._hilo_supervisor.join(timeout=1)
+            self._hilo_supervisor = None
+
+        for trabajador in self._trabajadores:
+            with trabajador.candado:
+                trabajador.finalizar()
+
+    def _supervisar(self):
+        '''Reinicia los procesos de trabajo que finalizaron.'''
+        while not self._detener.wait(self.configuracion.espera_reinicio):
+            for trabajador in self._trabajadores:
+                # * Un proceso ocupado está vivo; si murió durante una
+                # * llamada, lo reinicia la próxima llamada.
+                if trabajador.vivo() or not trabajador.candado.acquire(
+                    blocking=False
+                ):
+                    continue
+
+                try:
+                    if trabajador.vivo() or (
+                        time.monotonic() - trabajador.ultimo_inicio <
+                        self.configuracion.espera_reinicio
+                    ):
+                        continue
+
+                    print(
+                        f'{datetime.now()} >>> *** El proceso '
+                        f'recolector-{trabajador.numero} finalizó. Se '
+                        'reinicia ***'
+                    )
+                    trabajador.iniciar()
+                finally:
+                    trabajador.candado.release()
+
+    def llamar(self, operacion, *argumentos, timeout=None):
+        '''
+        Ejecuta una operación en un proceso de trabajo (el siguiente por
+        turno) y devuelve su resultado. Lanza ErrorProceso si la operación
+        falla o si el proceso no responde en 'timeout' segundos.
+        '''
+        trabajador = self._trabajadores[
+            next(self._turno) % len(self._trabajadores)
+        ]
+
+        with trabajador.candado:
+            trabajador.enviar(operacion, argumentos)
+
+            return trabajador.recibir(
+                self.configuracion.timeout if timeout is None else timeout
+            )
+
+    def llamar_repartido(self, operacion, elementos, *argumentos,
+                         timeout=None):
+        '''
+        Reparte los elementos entre los procesos de trabajo, ejecuta la
+        operación en todos a la vez (con los elementos de cada uno como
+        primer argumento) y devuelve una lista de (elementos, resultado),
+        donde el resultado es un ErrorProceso si la operación falló en ese
+        proceso.
+        '''
+        partes = [
+            elementos[numero::len(self._trabajadores)]
+            for numero in range(len(self._trabajadores))
+        ]
+        asignados = [
+            (trabajador, parte)
+            for trabajador, parte in zip(self._trabajadores, partes) if parte
+        ]
+        timeout = self.configuracion.timeout if timeout is None else timeout
+        resultados = []
+
+        # * Los candados se toman siempre en el mismo orden, para que dos
+        # * llamadas repartidas no se bloqueen entre sí.
+        for trabajador, _ in asignados:
+            trabajador.candado.acquire()
+
+        try:
+            enviados = []
+
+            for trabajador, parte in asignados:
+                try:
+                    trabajador.enviar(operacion, (parte, *argumentos))
+                except ErrorProceso as error:
+                    resultados.append((parte, error))
+                    continue
+
+                enviados.append((trabajador, parte))
+
+            limite = time.monotonic() + timeout
+
+            for trabajador, parte in enviados:
+                try:
+                    resultado = trabajador.recibir(
+                        max(0.0, limite - time.monotonic())
+                    )
+                except ErrorProceso as error:
+                    resultado = error
+
+                resultados.append((parte, resultado))
+        finally:
+            for trabajador, _ in asignados:
+                trabajador.candado.release()
+
+        return resultados
+
+    def obtener_estadisticas(self):
+        '''Devuelve las EstadisticasProceso de cada proceso de trabajo.'''
+        return [
+            EstadisticasProceso(
+                trabajador.proceso.pid if trabajador.proceso else None,
+                trabajador.vivo(), trabajador.reinicios, trabajador.llamadas,
+                trabajador.errores, trabajador.bytes_enviados,
+                trabajador.bytes_recibidos
+            )
+            for trabajador in self._trabajadores
+        ]
+
+class StorageRemoto:
+    '''
+    Reemplazo de metrics.storage.Storage para el motor de recolección, que
+    obtiene la topología y el uso de las particiones en los procesos de
+    trabajo.
+    '''
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def obtener_almacenamiento_linux(self):
+        return self.pool.llamar('almacenamiento_linux')
+
+    def obtener_almacenamiento_windows(self):
+        return self.pool.llamar('almacenamiento_windows')
+
+    def obtener_uso_particion(self, particion):
+        return self.pool.llamar('uso_particion', particion)
+
+class SmartmontoolsRemoto:
+    '''
+    Reemplazo de utils.smartmontools.Smartmontools para la caché SMART, que
+    reparte la ejecución y la interpretación de smartctl entre los procesos
+    de trabajo.
+    '''
+
+    def __init__(self, pool, paralelismo):
+        self.pool = pool
+        self.paralelismo = paralelismo
+
+    def configurar_paralelismo(self, paralelismo):
+        '''
+        Igual que Smartmontools.configurar_paralelismo(); cada proceso de
+        trabajo lo aplica en su siguiente lote.
+        '''
+        self.paralelismo = paralelismo
+
+    def ejecutar_smartmontools_lote(self, dispositivos, timeout=10):
+        '''
+        Igual que Smartmontools.ejecutar_smartmontools_lote(), pero los
+        ResultadoSmartctl exitosos traen el RegistroSmart ya interpretado.
+        Los dispositivos de un proceso que falló se devuelven con error.
+        '''
+        resultados = {}
+
+        for parte, resultado in self.pool.llamar_repartido(
+            'smartctl', sorted(dispositivos), timeout, self.paralelismo,
+            timeout=timeout + self.pool.configuracion.timeout
+        ):
+            if isinstance(resultado, ErrorProceso):
+                for dispositivo in parte:
+                    resultados[dispositivo] = smartmontools.ResultadoSmartctl(
+                        'error', None, str(resultado), 0.0
+                    )
+                continue
+
+            resultados.update(resultado)
+
+        return resultados
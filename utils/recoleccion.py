@@ -0,0 +1,801 @@
+import functools
+import queue
+import threading
+import time
+
+from collections import namedtuple
+from datetime import datetime
+
+# * Topología del almacenamiento y temperatura de los discos desde hwmon.
+import metrics.topologia as topologia
+import metrics.hwmon as hwmon
+
+# * Rendimiento de entrada/salida de los discos y las particiones.
+import metrics.diskstats as diskstats
+
+# * Caché de atributos SMART.
+import metrics.smart as smart
+
+# * Smartmontools.
+import utils.smartmontools as smartmontools
+
+# * Alertas.
+import utils.alertas as alertas
+import utils.diario_alertas as diario_alertas
+
+# * Pool de hilos de trabajo de los recolectores e interruptores de las
+# * fuentes de métricas.
+import utils.pool_recolectores as pool_recolectores
+import utils.procesos_recolectores as procesos_recolectores
+import utils.salud_fuentes as salud_fuentes
+
+# * Historial de series de tiempo, en memoria y en disco.
+import utils.historial as historial
+import utils.segmentos as segmentos
+
+# * Instantáneas inmutables que se publican hacia la GUI. Los tuples y
+# * namedtuples se usan para que ningún consumidor pueda modificar los datos
+# * que otro hilo está leyendo.
+MetricasCpu = namedtuple(
+    'MetricasCpu',
+    [
+        'modelo', 'nucleos_fisicos', 'nucleos_logicos', 'uso', 'desglose',
+        'temperatura'
+    ]
+)
+
+MetricasDisco = namedtuple(
+    'MetricasDisco',
+    [
+        'clave', 'modelo', 'estado_smart', 'horas_encendido', 'temperatura',
+        'datos_leidos_escritos', 'smart', 'particiones', 'fuente_smart',
+        'temperatura_hwmon'
+    ],
+    defaults=(None, False)
+)
+
+MetricasParticion = namedtuple(
+    'MetricasParticion', ['particion', 'sistema_archivos', 'uso']
+)
+
+# * Registro SMART de un disco sin dispositivo sobre el cual ejecutar
+# * smartctl (en Windows, un disco sin volúmenes montados).
+REGISTRO_CACHE_SIN_SMART = smart.RegistroCacheSmart(
+    None, smart.REGISTRO_SMART_VACIO, None
+)
+
+# * Rendimiento de entrada/salida (diskstats.RendimientoIO) de un disco y de
+# * sus particiones, identificados por la clave del disco y por la
+# * partición, igual que en MetricasDisco.
+MetricasIODisco = namedtuple(
+    'MetricasIODisco', ['clave', 'rendimiento', 'particiones']
+)
+
+MetricasIOParticion = namedtuple(
+    'MetricasIOParticion', ['particion', 'rendimiento']
+)
+
+# * 'obsoletas' contiene los nombres de las fuentes cuyo valor en la
+# * instantánea es el último obtenido, porque la fuente falló o su
+# * interruptor está abierto.
+Instantanea = namedtuple(
+    'Instantanea',
+    [
+        'secuencia', 'marca_tiempo', 'cpu', 'almacenamiento', 'alertas',
+        'obsoletas', 'io'
+    ],
+    defaults=(frozenset(), None)
+)
+
+EstadisticasCuadro = namedtuple(
+    'EstadisticasCuadro', ['ultimo', 'promedio', 'maximo', 'cuadros']
+)
+
+class MotorRecoleccion:
+    '''
+    Motor que ejecuta los recolectores de métricas en un pool de hilos de
+    trabajo persistentes y publica instantáneas inmutables en una cola, de
+    modo que el hilo de la GUI nunca se bloquea esperando operaciones de
+    entrada/salida.
+    '''
+
+    # * Cantidad máxima de instantáneas pendientes en la cola. Si la GUI no
+    # * las consume a tiempo, se descartan las más antiguas.
+    MAXIMO_PENDIENTES = 32
+
+    # * Factor de suavizado del promedio móvil exponencial del tiempo por
+    # * cuadro.
+    SUAVIZADO_CUADRO = 0.1
+
+    def __init__(self, cpu_metrics, storage_metrics, sistema_operativo,
+                 servicio_configuracion):
+        self.cpu_metrics = cpu_metrics
+        self.sistema_operativo = sistema_operativo
+        self.servicio_configuracion = servicio_configuracion
+
+        configuracion = servicio_configuracion.actual()
+
+        # * Configuración de la GUI vigente, que el planificador actualiza en
+        # * cada intervalo. La GUI sólo lee este atributo, para que el hilo de
+        # * Tk nunca consulte el archivo de configuración.
+        self.configuracion_gui = configuracion.gui
+
+        # * Con los procesos de trabajo habilitados, la topología, el uso de
+        # * las particiones, smartctl y la temperatura de Windows se obtienen
+        # * en procesos aislados. Como crearlos es costoso, se decide una
+        # * única vez al crear el motor.
+        self.pool_procesos = None
+
+        if configuracion.procesos.habilitado:
+            self.pool_procesos = procesos_recolectores.PoolProcesos(
+                configuracion.procesos, configuracion.smart.paralelismo,
+                configuracion.smart.ayudante
+            )
+            storage_metrics = procesos_recolectores.StorageRemoto(
+                self.pool_procesos
+            )
+            self.smartmontools = procesos_recolectores.SmartmontoolsRemoto(
+                self.pool_procesos, configuracion.smart.paralelismo
+            )
+        else:
+            self.smartmontools = smartmontools.Smartmontools(
+                configuracion.smart.paralelismo, configuracion.smart.ayudante
+            )
+
+        self.storage_metrics = storage_metrics
+        self.topologia = topologia.TopologiaAlmacenamiento(
+            storage_metrics, sistema_operativo
+        )
+
+        # * Cada fuente de métricas (la temperatura de la CPU, la topología
+        # * del almacenamiento, smartctl en cada disco y el uso de cada
+        # * partición) tiene su propio interruptor, para que una fuente caída
+        # * no bloquee ni finalice al agente.
+        self.salud_fuentes = salud_fuentes.RegistroSalud(
+            servicio_configuracion.actual().fuentes
+        )
+        self.cache_smart = smart.CacheSmart(
+            self.smartmontools, salud=self.salud_fuentes
+        )
+
+        # * Fuentes de las particiones de la última topología, para olvidar
+        # * los interruptores de las que se desmontan.
+        self._fuentes_particiones = set()
+
+        # * En Linux, la temperatura de los discos con un chip hwmon (nvme o
+        # * drivetemp) se lee en cada intervalo desde sysfs, y smartctl sólo
+        # * se ejecuta para los contadores de vida útil.
+        self.temperatura_discos = None
+
+        if sistema_operativo == 'posix':
+            self.temperatura_discos = hwmon.TemperaturaDiscosHwmon(
+                self.topologia.raiz_sys
+            )
+
+        # * El rendimiento de entrada/salida se calcula por diferencia entre
+        # * muestras de /proc/diskstats (o de psutil en Windows), con su
+        # * propio intervalo, sobre la última topología obtenida.
+        self.muestreador_io = diskstats.MuestreadorIO(
+            sistema_operativo, self.topologia.raiz_proc
+        )
+        self._topologia_io = None
+
+        # * La capacidad y los niveles del historial se fijan al crear el
+        # * motor, ya que cambiarlos implicaría volver a reservar todos los
+        # * buffers.
+        configuracion_historial = servicio_configuracion.actual().historial
+
+        self.historial = historial.HistorialMetricas(
+            configuracion_historial.capacidad,
+            configuracion_historial.niveles,
+            configuracion_historial.olvido_segundos
+        )
+
+        self.almacen_segmentos = None
+
+        if configuracion_historial.persistencia.habilitada:
+            self.almacen_segmentos = segmentos.AlmacenSegmentos(
+                configuracion_historial
+            )
+
+        # * El diario de alertas también se fija al crear el motor, ya que
+        # * su archivo queda abierto mientras el motor está en ejecución.
+        self.diario_alertas = diario_alertas.DiarioAlertas(
+            servicio_configuracion.actual().alertas
+        )
+        self.motor_reglas = alertas.MotorReglas()
+
+        self._cola = queue.Queue(maxsize=self.MAXIMO_PENDIENTES)
+        self._candado = threading.Lock()
+        self._detener = threading.Event()
+        self._pool = None
+        self._hilo_planificador = None
+
+        self._observadores = []
+
+        self._secuencia = 0
+        self._ultimo_cpu = None
+        self._ultimo_almacenamiento = None
+        self._ultimo_io = None
+        self._obsoletas_cpu = frozenset()
+        self._obsoletas_almacenamiento = frozenset()
+
+        self._tiempo_cuadro_ultimo = 0.0
+        self._tiempo_cuadro_promedio = 0.0
+        self._tiempo_cuadro_maximo = 0.0
+        self._cuadros = 0
+
+    def iniciar(self):
+        '''
+        Inicia el pool de hilos de trabajo y el hilo planificador que programa
+        los recolectores en cada intervalo.
+        '''
+        # * La cantidad de hilos de trabajo se fija al iniciar; el resto de
+        # * la configuración se aplica en cada intervalo.
+        recoleccion = self.servicio_configuracion.actual().recoleccion
+
+        self.diario_alertas.iniciar()
+
+        if self.pool_procesos is not None:
+            self.pool_procesos.iniciar()
+
+        self._pool = pool_recolectores.PoolRecolectores(
+            recoleccion.trabajadores, recoleccion.politica_solapamiento
+        )
+        self._pool.iniciar()
+
+        self._hilo_planificador = threading.Thread(
+            target=self._planificar, name='planificador-recolectores',
+            daemon=True
+        )
+        self._hilo_planificador.start()
+
+    def detener(self):
+        '''
+        Detiene el planificador y el pool de hilos de trabajo, y libera los
+        recursos del motor.
+        '''
+        self._detener.set()
+
+        if self._hilo_planificador is not None:
+            self._hilo_planificador.join(timeout=1)
+            self._hilo_planificador = None
+
+        if self._pool is not None:
+            self._pool.detener()
+
+        if self.pool_procesos is not None:
+            self.pool_procesos.detener()
+
+        if self.almacen_segmentos is not None:
+            self.almacen_segmentos.cerrar()
+
+        self.muestreador_io.cerrar()
+
+        self.diario_alertas.detener()
+
+        self.servicio_configuracion.cerrar()
+
+    def agregar_observador(self, observador):
+        '''
+        Registra una función que recibe cada instantánea publicada, desde el
+        hilo de trabajo que la publicó (por ejemplo, un exportador). Debe
+        registrarse antes de iniciar el motor.
+        '''
+        self._observadores.append(observador)
+
+    def obtener_contadores_recoleccion(self):
+        '''
+        Devuelve los contadores de ejecuciones programadas, solapadas y
+        descartadas de cada recolector.
+        '''
+        if self._pool is None:
+            return {}
+
+        return self._pool.obtener_contadores()
+
+    def obtener_salud_fuentes(self):
+        '''
+        Devuelve el estado del interruptor y los contadores de errores y de
+        latencia de cada fuente de métricas.
+        '''
+        return self.salud_fuentes.obtener_estadisticas()
+
+    def obtener_estadisticas_procesos(self):
+        '''
+        Devuelve las EstadisticasProceso de cada proceso de trabajo, o una
+        lista vacía si los procesos de trabajo no están habilitados.
+        '''
+        if self.pool_procesos is None:
+            return []
+
+        return self.pool_procesos.obtener_estadisticas()
+
+    def obtener_instantaneas_pendientes(self):
+        '''
+        Devuelve, sin bloquear, un tuple con las instantáneas publicadas desde
+        la última consulta, de la más antigua a la más reciente.
+        '''
+        instantaneas = []
+
+        while True:
+            try:
+                instantaneas.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+
+        return tuple(instantaneas)
+
+    def registrar_tiempo_cuadro(self, segundos):
+        '''Registra el tiempo que el hilo de la GUI dedicó a un cuadro.'''
+        with self._candado:
+            self._cuadros += 1
+            self._tiempo_cuadro_ultimo = segundos
+            self._tiempo_cuadro_maximo = max(
+                self._tiempo_cuadro_maximo, segundos
+            )
+
+            if self._cuadros == 1:
+                self._tiempo_cuadro_promedio = segundos
+            else:
+                self._tiempo_cuadro_promedio += self.SUAVIZADO_CUADRO * (
+                    segundos - self._tiempo_cuadro_promedio
+                )
+
+    def obtener_estadisticas_cuadro(self):
+        '''
+        Devuelve las estadísticas del tiempo por cuadro del hilo de la GUI en
+        segundos: el último, el promedio móvil y el máximo.
+        '''
+        with self._candado:
+            return EstadisticasCuadro(
+                self._tiempo_cuadro_ultimo, self._tiempo_cuadro_promedio,
+                self._tiempo_cuadro_maximo, self._cuadros
+            )
+
+    def _planificar(self):
+        '''
+        Bucle del hilo planificador: obtiene la configuración vigente y
+        programa en el pool los recolectores habilitados, una vez por
+        intervalo. El pool decide qué hacer si un recolector sigue en curso.
+        Si la configuración se recargó, los cambios se aplican desde este
+        intervalo sin reiniciar los recolectores.
+        '''
+        recolectores = (
+            ('cpu', self._recolectar_cpu),
+            ('storage', self._recolectar_almacenamiento),
+        )
+        proximo_io = time.monotonic()
+
+        while not self._detener.is_set():
+            inicio = time.monotonic()
+
+            configuracion = self.servicio_configuracion.actual()
+            self._pool.politica = (
+                configuracion.recoleccion.politica_solapamiento
+            )
+            self.salud_fuentes.configurar(configuracion.fuentes)
+            self.configuracion_gui = configuracion.gui
+
+            for nombre, recolector in recolectores:
+                if getattr(configuracion.metricas, nombre):
+                    self._pool.programar(nombre, recolector, configuracion)
+
+            # * La persistencia decide en cada ejecución si corresponde
+            # * escribir, sincronizar o compactar según su cadencia.
+            if self.almacen_segmentos is not None:
+                self._pool.programar(
+                    'persistencia', self.almacen_segmentos.persistir
+                )
+
+            # * Hasta el próximo intervalo, el recolector de entrada/salida
+            # * se programa con su propio intervalo, que puede ser menor.
+            limite = inicio + configuracion.intervalo
+
+            while True:
+                ahora = time.monotonic()
+
+                if configuracion.metricas.io and ahora >= proximo_io:
+                    self._pool.programar(
+                        'io', self._recolectar_io, configuracion
+                    )
+                    proximo_io = ahora + configuracion.io.intervalo
+
+                if ahora >= limite:
+                    break
+
+                espera = limite - ahora
+
+                if configuracion.metricas.io:
+                    espera = min(espera, proximo_io - ahora)
+
+                if self._detener.wait(max(0.0, espera)):
+                    return
+
+    def _recolectar_cpu(self, configuracion):
+        '''Obtiene las métricas de la CPU y publica una instantánea.'''
+        umbrales = configuracion.umbrales
+
+        # * El modelo de la CPU sólo se obtiene la primera vez.
+        if self.cpu_metrics.modelo is None:
+            self.cpu_metrics.obtener_modelo_cpu()
+
+        modelo = self.cpu_metrics.modelo
+
+        # * El uso se calcula por diferencia con la muestra anterior, por lo
+        # * que no bloquea y el intervalo de la configuración define la
+        # * ventana de medición.
+        uso_cpu = self.cpu_metrics.obtener_uso_cpu()
+        desglose_cpu = self.cpu_metrics.obtener_desglose_cpu()
+
+        if self.sistema_operativo == 'nt' and self.pool_procesos is not None:
+            fuente_temperatura = functools.partial(
+                self.pool_procesos.llamar, 'temperatura_cpu_windows'
+            )
+        elif self.sistema_operativo == 'nt':
+            fuente_temperatura = (
+                self.cpu_metrics.obtener_temperatura_cpu_windows
+            )
+        if self.sistema_operativo == 'posix':
+            fuente_temperatura = self.cpu_metrics.obtener_temperatura_cpu_linux
+
+        # * Si la fuente de temperatura falla, se publica la última
+        # * temperatura obtenida marcada como obsoleta; mientras su
+        # * interruptor esté abierto, la fuente ni siquiera se consulta.
+        resultado_temperatura = self.salud_fuentes.fuente(
+            'cpu.temperatura'
+        ).llamar(fuente_temperatura, modelo)
+
+        temperatura_cpu = resultado_temperatura.valor
+        obsoletas = (
+            frozenset(('cpu.temperatura',)) if resultado_temperatura.obsoleto
+            else frozenset()
+        )
+
+        # * Si no hay un sensor de temperatura, se publica sin temperatura en
+        # * lugar de un valor vacío.
+        if not temperatura_cpu:
+            temperatura_cpu = None
+
+        metricas_cpu = MetricasCpu(
+            modelo,
+            self.cpu_metrics.obtener_nucleos_fisicos(),
+            self.cpu_metrics.obtener_nucleos_logicos(),
+            uso_cpu,
+            desglose_cpu,
+            temperatura_cpu
+        )
+
+        muestras = tuple(self._muestras_cpu(metricas_cpu))
+        self._registrar_historial(muestras)
+
+        self._publicar(
+            cpu=metricas_cpu,
+            obsoletas=obsoletas,
+            alertas_nuevas=self.motor_reglas.evaluar(
+                umbrales.reglas, time.monotonic(), muestras
+            )
+        )
+
+    def _recolectar_almacenamiento(self, configuracion):
+        '''Obtiene las métricas del almacenamiento y publica una instantánea.'''
+        umbrales = configuracion.umbrales
+        configuracion_smart = configuracion.smart
+
+        # * La topología sólo se vuelve a obtener si cambiaron los
+        # * dispositivos o los puntos de montaje. Si lsblk o WMI fallan, se
+        # * usa la última topología obtenida, y si nunca respondieron, no se
+        # * publica el almacenamiento.
+        resultado_topologia = self.salud_fuentes.fuente(
+            'almacenamiento.topologia'
+        ).llamar(self.topologia.obtener)
+
+        almacenamiento = resultado_topologia.valor
+
+        if almacenamiento is None:
+            return
+
+        self._topologia_io = almacenamiento
+
+        obsoletas = set()
+
+        if resultado_topologia.obsoleto:
+            obsoletas.add('almacenamiento.topologia')
+
+        dispositivos = {}
+
+        for disco in almacenamiento:
+            if self.sistema_operativo == 'nt':
+                # * La primera partición en el tuple de particiones va a servir
+                # * como partición representante del disco, y de esta manera
+                # * se obtendrán las métricas del disco. Un disco sin volúmenes
+                # * montados no tiene representante, por lo que no se le
+                # * ejecuta smartctl.
+                if not disco['particiones']:
+                    continue
+
+                dispositivos[disco['clave']] = (
+                    disco['particiones'][0]['particion']
+                )
+            if self.sistema_operativo == 'posix':
+                # * En Linux, se obtiene el nombre del disco directamente del
+                # * dictionary del disco.
+                dispositivos[disco['clave']] = disco['nombre']
+
+        temperaturas_hwmon = {}
+
+        if self.temperatura_discos is not None:
+            temperaturas_hwmon = self.temperatura_discos.leer(
+                disco['dispositivo'] for disco in almacenamiento
+            )
+
+        # * Los atributos SMART se leen de la caché, que sólo ejecuta smartctl
+        # * sobre los discos con algún atributo vencido (sin contar la
+        # * temperatura de los discos que la reportan en hwmon). smartctl se
+        # * ejecuta en paralelo sobre esos discos, por lo que el tiempo del
+        # * lote lo define el disco más lento y no la suma de todos.
+        self.cache_smart.configurar_ttl(configuracion_smart.ttl)
+        self.smartmontools.configurar_paralelismo(
+            configuracion_smart.paralelismo
+        )
+
+        registros_smart = self.cache_smart.obtener(
+            set(dispositivos.values()),
+            timeout=configuracion_smart.timeout,
+            sin_temperatura=frozenset(
+                dispositivos[disco['clave']] for disco in almacenamiento
+                if disco['clave'] in dispositivos
+                and disco.get('dispositivo') in temperaturas_hwmon
+            )
+        )
+
+        discos = []
+        fuentes_particiones = set()
+
+        for disco in almacenamiento:
+            dispositivo = dispositivos.get(disco['clave'])
+
+            # * Sin dispositivo no hay lectura SMART, por lo que el estado
+            # * queda en None.
+            registro_cache_smart = (
+                REGISTRO_CACHE_SIN_SMART if dispositivo is None
+                else registros_smart[dispositivo]
+            )
+            registro_smart = registro_cache_smart.registro
+
+            # * Si hwmon no tiene la temperatura del disco, se usa la de
+            # * smartctl.
+            temperatura = temperaturas_hwmon.get(
+                disco.get('dispositivo'), registro_smart.temperatura
+            )
+
+            # * Si smartctl falló, la caché conserva los últimos valores.
+            if registro_cache_smart.estado not in ('ok', None):
+                obsoletas.add(f'smart.{dispositivo}')
+
+            particiones = []
+
+            for particion in disco['particiones']:
+                # * Una partición que no responde (por ejemplo, un montaje
+                # * de red caído) no demora a las demás mientras su
+                # * interruptor esté abierto.
+                fuente = f'particion.{particion["particion"]}'
+                fuentes_particiones.add(fuente)
+                resultado_uso = self.salud_fuentes.fuente(fuente).llamar(
+                    self.storage_metrics.obtener_uso_particion,
+                    particion['particion']
+                )
+
+                # * Si la partición nunca respondió, no se publica.
+                if resultado_uso.valor is None:
+                    continue
+
+                if resultado_uso.obsoleto:
+                    obsoletas.add(fuente)
+
+                particiones.append(
+                    MetricasParticion(
+                        particion['particion'],
+                        particion['sistema_archivos'],
+                        resultado_uso.valor
+                    )
+                )
+
+            discos.append(
+                MetricasDisco(
+                    disco['clave'],
+                    disco['modelo'],
+                    registro_cache_smart.estado,
+                    registro_smart.horas_encendido,
+                    temperatura,
+                    (
+                        registro_smart.unidades_leidas,
+                        registro_smart.unidades_escritas
+                    ),
+                    registro_smart,
+                    tuple(particiones),
+                    None if dispositivo is None else f'smart.{dispositivo}',
+                    disco.get('dispositivo') in temperaturas_hwmon
+                )
+            )
+
+        discos = tuple(discos)
+
+        # * Como con los discos en la caché SMART, los interruptores de las
+        # * particiones que ya no están en la topología se olvidan.
+        for fuente in self._fuentes_particiones - fuentes_particiones:
+            self.salud_fuentes.olvidar(fuente)
+
+        self._fuentes_particiones = fuentes_particiones
+
+        muestras = tuple(self._muestras_almacenamiento(discos))
+        self._registrar_historial(muestras)
+
+        self._publicar(
+            almacenamiento=discos,
+            obsoletas=frozenset(obsoletas),
+            alertas_nuevas=self.motor_reglas.evaluar(
+                umbrales.reglas, time.monotonic(), muestras
+            )
+        )
+
+    def _registrar_historial(self, muestras):
+        '''
+        Agrega las muestras al historial en memoria, con marcas de tiempo
+        monotónicas, y al almacén en disco, con marcas del reloj de pared.
+        '''
+        self.historial.agregar(time.monotonic(), muestras)
+
+        if self.almacen_segmentos is not None:
+            self.almacen_segmentos.agregar(time.time(), muestras)
+
+    def _muestras_cpu(self, metricas_cpu):
+        '''
+        Devuelve las muestras del historial de la CPU: el uso total y por
+        núcleo, y la temperatura del paquete y por núcleo.
+        '''
+        uso_nucleos, uso_total = metricas_cpu.uso
+
+        yield ('cpu.uso', uso_total)
+
+        for nucleo, uso in enumerate(uso_nucleos):
+            yield (f'cpu.nucleo.{nucleo}.uso', uso)
+
+        if metricas_cpu.temperatura is None:
+            return
+
+        temperatura_nucleos, _, paquete_cpu = metricas_cpu.temperatura
+
+        yield ('cpu.temperatura_paquete', paquete_cpu)
+
+        for nucleo, temperatura in enumerate(temperatura_nucleos):
+            yield (f'cpu.nucleo.{nucleo}.temperatura', temperatura)
+
+    def _muestras_almacenamiento(self, discos):
+        '''
+        Devuelve las muestras del historial del almacenamiento: la
+        temperatura de cada disco, y el porcentaje de uso y el espacio libre
+        de cada partición.
+        '''
+        for disco in discos:
+            yield (f'disco.{disco.clave}.temperatura', disco.temperatura)
+
+            for particion in disco.particiones:
+                _, _, libre, porcentaje = particion.uso
+
+                yield (f'particion.{particion.particion}.uso', porcentaje)
+                yield (f'particion.{particion.particion}.libre', libre)
+
+    def _recolectar_io(self, configuracion):
+        '''
+        Obtiene el rendimiento de entrada/salida de los discos y de las
+        particiones de la última topología, y publica una instantánea.
+        '''
+        almacenamiento = self._topologia_io
+        rendimientos = self.muestreador_io.muestrear()
+
+        # * Hasta que el recolector del almacenamiento obtenga la topología,
+        # * sólo se toman las muestras de referencia.
+        if almacenamiento is None or not rendimientos:
+            return
+
+        discos = []
+
+        for disco in almacenamiento:
+            if self.sistema_operativo == 'nt':
+                # * psutil identifica a los discos por el final de su
+                # * DeviceID ('\\.\PHYSICALDRIVE0'), en minúsculas.
+                nombre = disco['clave'].rsplit('\\', 1)[-1].lower()
+            if self.sistema_operativo == 'posix':
+                nombre = disco['dispositivo']
+
+            rendimiento = rendimientos.get(nombre)
+
+            if rendimiento is None:
+                continue
+
+            discos.append(MetricasIODisco(
+                disco['clave'],
+                rendimiento,
+                tuple(
+                    MetricasIOParticion(
+                        particion['particion'],
+                        rendimientos[particion['dispositivo']]
+                    )
+                    for particion in disco['particiones']
+                    if particion.get('dispositivo') in rendimientos
+                )
+            ))
+
+        discos = tuple(discos)
+
+        muestras = tuple(self._muestras_io(discos))
+        self._registrar_historial(muestras)
+
+        self._publicar(
+            io=discos,
+            alertas_nuevas=self.motor_reglas.evaluar(
+                configuracion.umbrales.reglas, time.monotonic(), muestras
+            )
+        )
+
+    def _muestras_io(self, discos):
+        '''
+        Devuelve las muestras del historial de la entrada/salida de cada
+        disco: las operaciones y los bytes por segundo, la latencia, la
+        cola y la utilización.
+        '''
+        for disco in discos:
+            for campo, valor in disco.rendimiento._asdict().items():
+                yield (f'disco.{disco.clave}.io.{campo}', valor)
+
+    def _publicar(self, cpu=None, almacenamiento=None, obsoletas=frozenset(),
+                  alertas_nuevas=(), io=None):
+        '''
+        Combina el resultado de un recolector con el último resultado de los
+        demás y publica la instantánea resultante en la cola.
+        '''
+        # * Las alertas se registran en el diario antes de publicar la
+        # * instantánea, para que la GUI las encuentre al renderizarla.
+        self.diario_alertas.registrar(alertas_nuevas)
+
+        with self._candado:
+            if cpu is not None:
+                self._ultimo_cpu = cpu
+                self._obsoletas_cpu = obsoletas
+            if almacenamiento is not None:
+                self._ultimo_almacenamiento = almacenamiento
+                self._obsoletas_almacenamiento = obsoletas
+            if io is not None:
+                self._ultimo_io = io
+
+            self._secuencia += 1
+
+            instantanea = Instantanea(
+                self._secuencia, time.monotonic(), self._ultimo_cpu,
+                self._ultimo_almacenamiento, alertas_nuevas,
+                self._obsoletas_cpu | self._obsoletas_almacenamiento,
+                self._ultimo_io
+            )
+
+            # * Si la cola está llena, se descarta la instantánea más antigua
+            # * para que la GUI siempre reciba la más reciente.
+            if self._cola.full():
+                try:
+                    self._cola.get_nowait()
+                except queue.Empty:
+                    pass
+
+            self._cola.put_nowait(instantanea)
+
+        # * Los observadores se notifican fuera del candado, para que uno
+        # * lento no demore la publicación de los demás recolectores.
+        for observador in self._observadores:
+            try:
+                observador(instantanea)
+            except Exception as error:
+                print(
+                    f'{datetime.now()} >>> *** Error al notificar una '
+                    'instantánea a un observador ***'
+                )
+                print(error)
@@ -0,0 +1,235 @@
+import threading
+import time
+
+from collections import namedtuple
+from datetime import datetime
+
+# * Estados del interruptor de una fuente: 'cerrado' (la fuente responde y
+# * se consulta normalmente), 'abierto' (la fuente falló y no se consulta
+# * hasta el próximo intento) y 'semiabierto' (se está probando si la fuente
+# * volvió a responder).
+CERRADO = 'cerrado'
+ABIERTO = 'abierto'
+SEMIABIERTO = 'semiabierto'
+
+# * Resultado de consultar una fuente a través de su interruptor. Si la
+# * fuente falló o no se consultó, el valor es el último obtenido (o None si
+# * nunca respondió), 'obsoleto' es True y 'edad' indica sus segundos.
+ResultadoFuente = namedtuple('ResultadoFuente', ['valor', 'obsoleto', 'edad'])
+
+EstadisticasFuente = namedtuple(
+    'EstadisticasFuente',
+    [
+        'estado', 'exitos', 'errores', 'errores_consecutivos', 'omitidas',
+        'latencia_ultima', 'latencia_promedio', 'latencia_maxima',
+        'ultimo_error', 'proximo_intento'
+    ]
+)
+
+class InterruptorFuente:
+    '''
+    Interruptor (circuit breaker) de una fuente de métricas. Después de
+    'fallos_para_abrir' fallos consecutivos, el interruptor se abre y la
+    fuente deja de consultarse: las consultas devuelven el último valor
+    obtenido marcado como obsoleto, sin llamar a la fuente. Pasado el tiempo
+    de espera, una única consulta prueba la fuente (estado semiabierto); si
+    vuelve a fallar, la espera se duplica hasta 'backoff_maximo', y si
+    responde, el interruptor se cierra.
+    '''
+
+    def __init__(self, nombre, configuracion_fuentes):
+        self.nombre = nombre
+        self.configuracion = configuracion_fuentes
+
+        self._candado = threading.Lock()
+
+        self.estado = CERRADO
+        self._espera = configuracion_fuentes.backoff_inicial
+        self._proximo_intento = 0.0
+
+        self._valor = None
+        self._obtenido = None
+
+        self.exitos = 0
+        self.errores = 0
+        self.errores_consecutivos = 0
+        self.omitidas = 0
+        self._latencia_ultima = 0.0
+        self._latencia_total = 0.0
+        self._latencia_maxima = 0.0
+        self._ultimo_error = None
+
+    def permitir(self):
+        '''
+        Devuelve True si la fuente se puede consultar ahora. Con el
+        interruptor abierto, sólo la primera consulta después del tiempo de
+        espera lo pasa a semiabierto y se permite.
+        '''
+        with self._candado:
+            if self.estado == CERRADO:
+                return True
+
+            if self.estado == ABIERTO and (
+                time.monotonic() >= self._proximo_intento
+            ):
+                self.estado = SEMIABIERTO
+                return True
+
+            self.omitidas += 1
+            return False
+
+    def registrar_exito(self, latencia, valor=None):
+        '''Registra una consulta exitosa y cierra el interruptor.'''
+        with self._candado:
+            if self.estado != CERRADO:
+                print(
+                    f'{datetime.now()} >>> *** La fuente {self.nombre} '
+                    'volvió a responder ***'
+                )
+
+            self.estado = CERRADO
+            self._espera = self.configuracion.backoff_inicial
+            self.errores_consecutivos = 0
+
+            self._valor = valor
+            self._obtenido = time.monotonic()
+
+            self.exitos += 1
+            self._registrar_latencia(latencia)
+
+    def registrar_fallo(self, latencia, error):
+        '''
+        Registra una consulta fallida, y abre el interruptor si se alcanzó
+        la cantidad de fallos consecutivos o si falló la consulta de prueba.
+        '''
+        with self._candado:
+            self.errores += 1
+            self.errores_consecutivos += 1
+            self._ultimo_error = str(error)
+            self._registrar_latencia(latencia)
+
+            if self.estado == SEMIABIERTO:
+                self._espera = min(
+                    self._espera * 2, self.configuracion.backoff_maximo
+                )
+            elif self.errores_consecutivos < (
+                self.configuracion.fallos_para_abrir
+            ):
+                return
+            else:
+                # * Se avisa sólo al abrir el interruptor, y no en cada
+                # * fallo ni en cada prueba fallida.
+                print(
+                    f'{datetime.now()} >>> *** La fuente {self.nombre} '
+                    f'falló {self.errores_consecutivos} veces seguidas. Se '
+                    f'volverá a probar en {self._espera} segundos ***'
+                )
+                print(error)
+
+            self.estado = ABIERTO
+            self._proximo_intento = time.monotonic() + self._espera
+
+    def _registrar_latencia(self, latencia):
+        self._latencia_ultima = latencia
+        self._latencia_total += latencia
+        self._latencia_maxima = max(self._latencia_maxima, latencia)
+
+    def ultimo(self):
+        '''Devuelve el último valor obtenido como un ResultadoFuente obsoleto.'''
+        with self._candado:
+            edad = (
+                None if self._obtenido is None
+                else time.monotonic() - self._obtenido
+            )
+
+            return ResultadoFuente(self._valor, True, edad)
+
+    def llamar(self, funcion, *argumentos):
+        '''
+        Consulta la fuente llamando a 'funcion' si el interruptor lo permite,
+        y devuelve un ResultadoFuente. Cualquier excepción de la función se
+        registra como un fallo y se devuelve el último valor obtenido.
+        '''
+        if not self.permitir():
+            return self.ultimo()
+
+        inicio = time.perf_counter()
+
+        try:
+            valor = funcion(*argumentos)
+        except Exception as error:
+            self.registrar_fallo(time.perf_counter() - inicio, error)
+            return self.ultimo()
+
+        self.registrar_exito(time.perf_counter() - inicio, valor)
+
+        return ResultadoFuente(valor, False, 0.0)
+
+    def obtener_estadisticas(self):
+        '''Devuelve las EstadisticasFuente de la fuente.'''
+        with self._candado:
+            consultas = self.exitos + self.errores
+
+            return EstadisticasFuente(
+                self.estado, self.exitos, self.errores,
+                self.errores_consecutivos, self.omitidas,
+                self._latencia_ultima,
+                self._latencia_total / consultas if consultas else 0.0,
+                self._latencia_maxima, self._ultimo_error,
+                (
+                    max(0.0, self._proximo_intento - time.monotonic())
+                    if self.estado == ABIERTO else 0.0
+                )
+            )
+
+class RegistroSalud:
+    '''
+    Registro de los interruptores de todas las fuentes de métricas, creados
+    la primera vez que se consulta cada fuente.
+    '''
+
+    def __init__(self, configuracion_fuentes):
+        self.configuracion = configuracion_fuentes
+
+        self._candado = threading.Lock()
+        self._fuentes = {}
+
+    def configurar(self, configuracion_fuentes):
+        '''Aplica una nueva configuración a todos los interruptores.'''
+        if configuracion_fuentes is self.configuracion:
+            return
+
+        with self._candado:
+            self.configuracion = configuracion_fuentes
+
+            for interruptor in self._fuentes.values():
+                interruptor.configuracion = configuracion_fuentes
+
+    def fuente(self, nombre):
+        '''Devuelve el interruptor de una fuente, creándolo si no existe.'''
+        with self._candado:
+            interruptor = self._fuentes.get(nombre)
+
+            if interruptor is None:
+                interruptor = InterruptorFuente(nombre, self.configuracion)
+                self._fuentes[nombre] = interruptor
+
+            return interruptor
+
+    def olvidar(self, nombre):
+        '''Elimina el interruptor de una fuente que ya no existe.'''
+        with self._candado:
+            self._fuentes.pop(nombre, None)
+
+    def obtener_estadisticas(self):
+        '''
+        Devuelve un dictionary donde la clave es el nombre de la fuente y el
+        valor son sus EstadisticasFuente.
+        '''
+        with self._candado:
+            fuentes = list(self._fuentes.items())
+
+        return {
+            nombre: interruptor.obtener_estadisticas()
+            for nombre, interruptor in sorted(fuentes)
+        }
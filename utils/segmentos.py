@@ -0,0 +1,729 @@
+import bisect
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from array import array
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+# * Historial en memoria, del que se reutilizan las ventanas y los niveles de
+# * resumen.
+import utils.historial as historial
+
+class SegmentoColumnar:
+    '''
+    Archivo de segmento de una serie, con columnas de ancho fijo (float64):
+    la primera es la de las marcas de tiempo y el resto la de los valores.
+    El archivo se crea con su tamaño final, por lo que se puede mapear en
+    memoria aunque se siga escribiendo.
+
+    Formato: un encabezado de 32 bytes (firma, cantidad de columnas,
+    capacidad, cantidad de filas y marca de inicio) seguido de cada columna
+    con 'capacidad' valores.
+
+    Ningún descriptor queda abierto entre operaciones: el archivo se abre
+    sólo mientras se escribe o se sincroniza un lote, y cada lectura lo
+    mapea en memoria sólo mientras se usan sus vistas. Las marcas de la
+    primera y de la última fila se guardan en el objeto, para rotar y
+    compactar sin leer el archivo.
+    '''
+
+    FIRMA = b'MASEG001'
+    ENCABEZADO = struct.Struct('<8sIIId4x')
+
+    def __init__(self, ruta, columnas, capacidad, cantidad, inicio,
+                 primera=None, ultima=None):
+        self.ruta = ruta
+        self.columnas = columnas
+        self.capacidad = capacidad
+        self.cantidad = cantidad
+        self.inicio = inicio
+        self.primera = primera
+        self.ultima = ultima
+
+        self._sin_sincronizar = False
+
+    @classmethod
+    def crear(cls, ruta, columnas, capacidad, inicio):
+        '''Crea un segmento vacío.'''
+        with open(ruta, 'xb') as archivo:
+            archivo.write(cls.ENCABEZADO.pack(
+                cls.FIRMA, columnas, capacidad, 0, inicio
+            ))
+            archivo.truncate(cls.ENCABEZADO.size + columnas * capacidad * 8)
+
+        segmento = cls(ruta, columnas, capacidad, 0, inicio)
+        segmento._sin_sincronizar = True
+
+        return segmento
+
+    @classmethod
+    def abrir(cls, ruta):
+        '''
+        Lee el encabezado y las marcas de la primera y de la última fila de
+        un segmento existente.
+        '''
+        with open(ruta, 'rb') as archivo:
+            firma, columnas, capacidad, cantidad, inicio = (
+                cls.ENCABEZADO.unpack(archivo.read(cls.ENCABEZADO.size))
+            )
+
+            if firma != cls.FIRMA:
+                raise ValueError(f'{ruta} no es un segmento de métricas')
+
+            primera = ultima = None
+
+            if cantidad:
+                archivo.seek(cls.ENCABEZADO.size)
+                primera = struct.unpack('<d', archivo.read(8))[0]
+                archivo.seek(cls.ENCABEZADO.size + (cantidad - 1) * 8)
+                ultima = struct.unpack('<d', archivo.read(8))[0]
+
+        return cls(
+            ruta, columnas, capacidad, cantidad, inicio, primera, ultima
+        )
+
+    def _desplazamiento(self, columna, fila):
+        '''Devuelve el desplazamiento en bytes de una celda del archivo.'''
+        return self.ENCABEZADO.size + (columna * self.capacidad + fila) * 8
+
+    def escribir(self, filas):
+        '''
+        Escribe un lote de filas (tuples con la marca y los valores), que
+        deben caber en el segmento. Cada columna se escribe de una sola vez,
+        y la cantidad del encabezado se actualiza al final, para que un
+        lector nunca vea filas incompletas.
+        '''
+        with open(self.ruta, 'r+b') as archivo:
+            for columna, valores in enumerate(zip(*filas)):
+                archivo.seek(self._desplazamiento(columna, self.cantidad))
+                archivo.write(array('d', valores).tobytes())
+
+            self.cantidad += len(filas)
+
+            archivo.seek(0)
+            archivo.write(self.ENCABEZADO.pack(
+                self.FIRMA, self.columnas, self.capacidad, self.cantidad,
+                self.inicio
+            ))
+
+        if self.primera is None:
+            self.primera = filas[0][0]
+        self.ultima = filas[-1][0]
+        self._sin_sincronizar = True
+
+    def sincronizar(self):
+        '''
+        Fuerza la escritura al disco de los lotes escritos desde la última
+        sincronización.
+        '''
+        if not self._sin_sincronizar:
+            return
+
+        with open(self.ruta, 'r+b') as archivo:
+            os.fsync(archivo.fileno())
+
+        self._sin_sincronizar = False
+
+    def ventana(self, desde=None, hasta=None):
+        '''
+        Devuelve un tuple con una vista por columna de las filas con marca de
+        tiempo entre 'desde' y 'hasta' (inclusive), sin copiar los datos. El
+        archivo se mapea en memoria en cada lectura, y el mapa (con su
+        descriptor) se libera en cuanto se liberan o se descartan las vistas
+        devueltas.
+        '''
+        with open(self.ruta, 'rb') as archivo:
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        vista = memoryview(mapa).cast('d')
+
+        # * La cantidad se lee del encabezado mapeado, ya que el segmento
+        # * activo puede haber crecido desde que se abrió.
+        cantidad = self.ENCABEZADO.unpack_from(mapa)[3]
+        columnas = tuple(
+            vista[
+                self._desplazamiento(columna, 0) // 8:
+                self._desplazamiento(columna, cantidad) // 8
+            ]
+            for columna in range(self.columnas)
+        )
+        vista.release()
+
+        marcas = columnas[0]
+        inicio = 0 if desde is None else bisect.bisect_left(marcas, desde)
+        final = cantidad if hasta is None else bisect.bisect_right(
+            marcas, hasta
+        )
+
+        ventana = tuple(columna[inicio:final] for columna in columnas)
+
+        for columna in columnas:
+            columna.release()
+
+        return ventana
+
+class SerieDisco:
+    '''
+    Serie de una métrica (o de un nivel de resumen) en disco: una secuencia
+    de segmentos ordenados por su marca de inicio, de los que sólo en el
+    último se escribe. Los segmentos se rotan al llenarse o al
+    comenzar un nuevo período de 'rotacion_segundos'.
+    '''
+
+    def __init__(self, directorio, tipo_ventana, muestras_por_segmento,
+                 rotacion_segundos):
+        self.directorio = directorio
+        self.tipo_ventana = tipo_ventana
+        self.muestras_por_segmento = muestras_por_segmento
+        self.rotacion_segundos = rotacion_segundos
+
+        self.segmentos = []
+        self._activo = None
+        self._ultima_marca = None
+        self._pendientes = []
+
+        # * El directorio se crea recién al escribir el primer segmento, para
+        # * que abrir una serie (por ejemplo, al consultarla) no cree nada en
+        # * el disco.
+        try:
+            archivos = sorted(os.listdir(directorio))
+        except FileNotFoundError:
+            archivos = []
+
+        for nombre in archivos:
+            if not nombre.endswith('.seg'):
+                continue
+
+            try:
+                self.segmentos.append(
+                    SegmentoColumnar.abrir(os.path.join(directorio, nombre))
+                )
+            except (OSError, ValueError, struct.error) as error:
+                print(
+                    f'{datetime.now()} >>> *** Segmento de métricas inválido '
+                    f'{nombre} en {directorio} ***'
+                )
+                print(error)
+
+        # * El primer segmento que se escriba después de abrir la serie debe
+        # * comenzar después de la última marca persistida.
+        for segmento in reversed(self.segmentos):
+            if segmento.ultima is not None:
+                self._ultima_marca = segmento.ultima
+                break
+
+    def agregar(self, marca, *valores):
+        '''Agrega una fila al lote pendiente de escritura.'''
+        self._pendientes.append((marca,) + valores)
+
+    def tomar_pendientes(self):
+        '''Devuelve y descarta el lote pendiente de escritura.'''
+        pendientes = self._pendientes
+        self._pendientes = []
+        return pendientes
+
+    def escribir(self, filas):
+        '''
+        Escribe un lote de filas, rotando el segmento activo cuando es
+        necesario. Las filas con una marca de tiempo anterior a la última
+        escrita (por ejemplo, si el reloj retrocedió) se descartan, para que
+        las marcas de cada serie se mantengan ordenadas.
+        '''
+        lote = []
+
+        for fila in filas:
+            if self._ultima_marca is not None and fila[0] < self._ultima_marca:
+                continue
+
+            if self._debe_rotar(fila[0], len(lote)):
+                if lote:
+                    self._activo.escribir(lote)
+                    lote = []
+
+                self._rotar(fila[0])
+
+            lote.append(fila)
+            self._ultima_marca = fila[0]
+
+        if lote:
+            self._activo.escribir(lote)
+
+    def _debe_rotar(self, marca, pendientes):
+        '''
+        Devuelve True si la fila con 'marca' ya no cabe en el segmento
+        activo. La rotación por tiempo se alinea a múltiplos de
+        'rotacion_segundos', para que un segmento no parta las cubetas de
+        los niveles de resumen cuya resolución divide a ese período.
+        '''
+        activo = self._activo
+
+        if activo is None:
+            return True
+
+        if activo.cantidad + pendientes >= activo.capacidad:
+            return True
+
+        return (
+            marca // self.rotacion_segundos !=
+            activo.inicio // self.rotacion_segundos
+        )
+
+    def _rotar(self, marca):
+        '''
+        Sincroniza el segmento activo y crea uno nuevo que inicia en 'marca'.
+        '''
+        if self._activo is not None:
+            self._activo.sincronizar()
+
+        os.makedirs(self.directorio, exist_ok=True)
+
+        ruta = os.path.join(
+            self.directorio, f'{round(marca * 1000):016d}.seg'
+        )
+
+        # * Si ya existe un segmento con la misma marca (por ejemplo, tras
+        # * reiniciar en el mismo milisegundo), se usa la siguiente.
+        while os.path.exists(ruta):
+            marca += 0.001
+            ruta = os.path.join(
+                self.directorio, f'{round(marca * 1000):016d}.seg'
+            )
+
+        self._activo = SegmentoColumnar.crear(
+            ruta, len(self.tipo_ventana._fields), self.muestras_por_segmento,
+            marca
+        )
+        self.segmentos.append(self._activo)
+
+    def sincronizar(self):
+        '''Fuerza la escritura del segmento activo al disco.'''
+        if self._activo is not None:
+            self._activo.sincronizar()
+
+    def cerrar(self):
+        '''Sincroniza el segmento activo y deja de escribir en él.'''
+        if self._activo is not None:
+            self._activo.sincronizar()
+            self._activo = None
+
+    def eliminar_hasta(self, marca):
+        '''
+        Elimina los segmentos cuya última fila es anterior a 'marca', y los
+        devuelve. El segmento activo también se elimina si la serie dejó de
+        recibir filas (por ejemplo, de un disco retirado), y la siguiente
+        escritura crea uno nuevo.
+        '''
+        eliminados = []
+
+        while self.segmentos:
+            segmento = self.segmentos[0]
+
+            if segmento.ultima is not None and segmento.ultima >= marca:
+                break
+
+            if segmento is self._activo:
+                self._activo = None
+
+            self.segmentos.pop(0)
+            eliminados.append(segmento)
+
+        return eliminados
+
+    def primera_marca(self):
+        '''Devuelve la marca de tiempo de la fila más antigua, o None.'''
+        for segmento in self.segmentos:
+            if segmento.primera is not None:
+                return segmento.primera
+
+        return None
+
+    def primera_marca_restante(self):
+        '''
+        Devuelve la marca de tiempo de la fila más antigua, escrita o
+        pendiente de escritura, o math.inf si no hay ninguna.
+        '''
+        primera = self.primera_marca()
+
+        if primera is not None:
+            return primera
+
+        return self._pendientes[0][0] if self._pendientes else math.inf
+
+    def ventana(self, desde=None, hasta=None):
+        '''
+        Devuelve una ventana con las filas entre 'desde' y 'hasta', donde
+        cada columna es un tuple con una vista por segmento, sin copiar los
+        datos.
+        '''
+        columnas = [[] for _ in self.tipo_ventana._fields]
+
+        for indice, segmento in enumerate(self.segmentos):
+            # * Los segmentos que terminan antes de 'desde' se omiten sin
+            # * mapearlos, según la marca de inicio del siguiente.
+            if desde is not None and indice + 1 < len(self.segmentos) and (
+                self.segmentos[indice + 1].inicio <= desde
+            ):
+                continue
+
+            if hasta is not None and segmento.inicio > hasta:
+                break
+
+            vistas = segmento.ventana(desde, hasta)
+
+            if not vistas[0]:
+                continue
+
+            for columna, vista in zip(columnas, vistas):
+                columna.append(vista)
+
+        return self.tipo_ventana(*(tuple(columna) for columna in columnas))
+
+class AlmacenSegmentos:
+    '''
+    Almacén persistente de series de tiempo en segmentos columnares. Las
+    muestras se acumulan en memoria y se escriben en lotes, y los archivos
+    se sincronizan con fsync con su propia cadencia, para que el agente casi
+    no agregue carga de entrada/salida a los discos que monitorea. Las
+    muestras crudas más antiguas que 'retencion_cruda' se compactan en los
+    niveles de resumen, cuya retención es la de su nivel en memoria.
+
+    Las marcas de tiempo son del reloj de pared (segundos desde la época),
+    ya que deben ser comparables entre reinicios del agente.
+
+    Las series de una métrica sin muestras durante 'olvido_segundos' (como
+    en el historial en memoria) se olvidan cuando ya no les quedan muestras
+    crudas por compactar, para no partir las cubetas de los resúmenes. Las
+    métricas que sólo están en el disco (de una ejecución anterior, o ya
+    olvidadas) se siguen compactando y venciendo, y su directorio se
+    elimina cuando queda vacío.
+    '''
+
+    # * Subdirectorios de las muestras crudas y de cada nivel de resumen.
+    DIRECTORIO_CRUDAS = 'crudas'
+
+    def __init__(self, configuracion_historial):
+        persistencia = configuracion_historial.persistencia
+
+        self.directorio = persistencia.directorio
+        self.niveles = configuracion_historial.niveles
+        self.olvido = configuracion_historial.olvido_segundos
+        self.persistencia = persistencia
+
+        self._candado = threading.Lock()
+        self._candado_series = threading.Lock()
+        self._series = {}
+        self._resumenes = {}
+        self._sucias = set()
+
+        # * Marca de tiempo de la última muestra de cada métrica.
+        self._vistas = {}
+
+        self._ultima_escritura = time.monotonic()
+        self._ultima_sincronizacion = time.monotonic()
+        self._ultima_compactacion = time.monotonic()
+
+        self.escrituras = 0
+        self.sincronizaciones = 0
+        self.compactaciones = 0
+
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _directorio_metrica(self, nombre):
+        '''Devuelve el directorio de una métrica.'''
+        return os.path.join(self.directorio, quote(nombre, safe=''))
+
+    def _abrir_series(self, nombre):
+        '''
+        Abre la serie cruda y las series de los niveles de resumen de una
+        métrica, sin registrarlas.
+        '''
+        directorio = self._directorio_metrica(nombre)
+        persistencia = self.persistencia
+
+        return (
+            SerieDisco(
+                os.path.join(directorio, self.DIRECTORIO_CRUDAS),
+                historial.VentanaSerie,
+                persistencia.muestras_por_segmento,
+                persistencia.rotacion_segundos
+            ),
+        ) + tuple(
+            SerieDisco(
+                os.path.join(directorio, f'r{nivel.resolucion}'),
+                historial.VentanaResumen,
+                persistencia.muestras_por_segmento,
+                # * Cada segmento de un nivel cubre tantas cubetas como filas
+                # * tiene, por lo que se rota sólo por tamaño.
+                nivel.resolucion * persistencia.muestras_por_segmento
+            )
+            for nivel in self.niveles
+        )
+
+    def _obtener_series(self, nombre):
+        '''
+        Devuelve la serie cruda y las series de los niveles de resumen de una
+        métrica, abriéndolas y registrándolas la primera vez.
+        '''
+        with self._candado_series:
+            series = self._series.get(nombre)
+
+            if series is not None:
+                return series
+
+            series = self._abrir_series(nombre)
+
+            self._series[nombre] = series
+            self._resumenes[nombre] = tuple(
+                historial.NivelResumen(nivel.resolucion, serie)
+                for nivel, serie in zip(self.niveles, series[1:])
+            )
+
+            return series
+
+    def nombres(self):
+        '''Devuelve un tuple con los nombres de las métricas persistidas.'''
+        return tuple(
+            unquote(nombre) for nombre in sorted(os.listdir(self.directorio))
+        )
+
+    def agregar(self, marca, muestras):
+        '''
+        Agrega las muestras (tuples con el nombre de la métrica y su valor)
+        al lote pendiente de escritura. Los valores None se omiten.
+        '''
+        with self._candado:
+            for nombre, valor in muestras:
+                if valor is None:
+                    continue
+
+                self._obtener_series(nombre)[0].agregar(marca, valor)
+                self._vistas[nombre] = marca
+
+    def persistir(self):
+        '''
+        Escribe el lote pendiente, sincroniza y compacta, cada uno según su
+        cadencia. Se ejecuta periódicamente desde un hilo de trabajo.
+        '''
+        persistencia = self.persistencia
+        ahora = time.monotonic()
+
+        if ahora - self._ultima_escritura >= persistencia.escritura_segundos:
+            self._escribir()
+            self._ultima_escritura = ahora
+
+        if ahora - self._ultima_compactacion >= (
+            persistencia.rotacion_segundos
+        ):
+            self._compactar(time.time())
+            self._ultima_compactacion = ahora
+
+        if ahora - self._ultima_sincronizacion >= persistencia.fsync_segundos:
+            self._sincronizar()
+            self._ultima_sincronizacion = ahora
+
+    def _escribir(self):
+        '''Escribe el lote pendiente de cada serie.'''
+        with self._candado:
+            lotes = [
+                (series[0], series[0].tomar_pendientes())
+                for series in self._series.values()
+            ]
+
+        for serie, filas in lotes:
+            if not filas:
+                continue
+
+            try:
+                serie.escribir(filas)
+                self._sucias.add(serie)
+                self.escrituras += 1
+            except OSError as error:
+                print(
+                    f'{datetime.now()} >>> *** Error al escribir el '
+                    f'historial en {serie.directorio} ***'
+                )
+                print(error)
+
+    def _sincronizar(self):
+        '''Sincroniza con fsync los segmentos escritos desde la última vez.'''
+        sucias = self._sucias
+        self._sucias = set()
+
+        for serie in sucias:
+            try:
+                serie.sincronizar()
+                self.sincronizaciones += 1
+            except OSError as error:
+                print(
+                    f'{datetime.now()} >>> *** Error al sincronizar el '
+                    f'historial en {serie.directorio} ***'
+                )
+                print(error)
+
+    def _compactar(self, ahora):
+        '''
+        Compacta en los niveles de resumen los segmentos crudos más antiguos
+        que la retención, elimina los segmentos de resumen vencidos y olvida
+        las métricas inactivas. Cada segmento se compacta y se elimina por
+        separado, para que un error en uno no descarte a los demás.
+        '''
+        # * Las métricas que sólo están en el disco se registran para
+        # * compactarlas; si siguen inactivas, se vuelven a olvidar al final.
+        try:
+            for nombre in self.nombres():
+                self._obtener_series(nombre)
+        except OSError as error:
+            print(
+                f'{datetime.now()} >>> *** Error al listar el historial en '
+                f'{self.directorio} ***'
+            )
+            print(error)
+
+        with self._candado_series:
+            metricas = list(self._series.items())
+
+        for nombre, series in metricas:
+            crudas = series[0]
+            resumenes = self._resumenes[nombre]
+
+            for segmento in crudas.eliminar_hasta(
+                ahora - self.persistencia.retencion_cruda
+            ):
+                try:
+                    marcas, valores = segmento.ventana()
+                except OSError as error:
+                    self._error_compactacion(nombre, error)
+                    continue
+
+                for marca, valor in zip(marcas, valores):
+                    for resumen in resumenes:
+                        resumen.agregar(marca, valor)
+
+                # * El mapa se libera antes de eliminar el archivo (en
+                # * Windows no se puede eliminar mientras está mapeado).
+                marcas.release()
+                valores.release()
+                self.compactaciones += 1
+                self._eliminar_segmento(nombre, segmento)
+
+            # * Una cubeta en curso sólo se cierra si ninguna de las muestras
+            # * crudas que quedan cae en ella; si no, el resto de la cubeta
+            # * llegaría en otra compactación y se partiría en dos filas.
+            with self._candado:
+                restante = crudas.primera_marca_restante()
+
+            for resumen, nivel, serie in zip(
+                resumenes, self.niveles, series[1:]
+            ):
+                resumen.cerrar_cubeta_hasta(restante)
+
+                try:
+                    serie.escribir(serie.tomar_pendientes())
+                    self._sucias.add(serie)
+                except OSError as error:
+                    self._error_compactacion(nombre, error)
+
+                for segmento in serie.eliminar_hasta(
+                    ahora - nivel.resolucion * nivel.capacidad
+                ):
+                    self._eliminar_segmento(nombre, segmento)
+
+            self._olvidar(nombre, ahora)
+
+    def _olvidar(self, nombre, ahora):
+        '''
+        Olvida las series de una métrica sin muestras desde hace 'olvido'
+        segundos y sin muestras crudas por compactar, y elimina su
+        directorio si ya no tiene segmentos.
+        '''
+        with self._candado, self._candado_series:
+            series = self._series.get(nombre)
+
+            if series is None or (
+                self._vistas.get(nombre, -math.inf) >= ahora - self.olvido
+            ) or series[0].primera_marca_restante() != math.inf:
+                return
+
+            del self._series[nombre]
+            del self._resumenes[nombre]
+            self._vistas.pop(nombre, None)
+
+            for serie in series:
+                self._sucias.discard(serie)
+
+                try:
+                    serie.cerrar()
+                except OSError as error:
+                    self._error_compactacion(nombre, error)
+
+            if any(serie.segmentos for serie in series):
+                return
+
+            # * Si quedó algún archivo ajeno, el directorio se conserva.
+            directorio = self._directorio_metrica(nombre)
+
+            try:
+                for subdirectorio in os.listdir(directorio):
+                    os.rmdir(os.path.join(directorio, subdirectorio))
+
+                os.rmdir(directorio)
+            except OSError:
+                pass
+
+    def _eliminar_segmento(self, nombre, segmento):
+        '''Elimina el archivo de un segmento ya compactado o vencido.'''
+        try:
+            os.remove(segmento.ruta)
+        except OSError as error:
+            self._error_compactacion(nombre, error)
+
+    def _error_compactacion(self, nombre, error):
+        print(
+            f'{datetime.now()} >>> *** Error al compactar el historial de '
+            f'{nombre} ***'
+        )
+        print(error)
+
+    def cerrar(self):
+        '''Escribe el lote pendiente y cierra todos los segmentos.'''
+        self._escribir()
+
+        with self._candado_series:
+            for series in self._series.values():
+                for serie in series:
+                    serie.cerrar()
+
+    def consultar(self, nombre, desde=None, hasta=None, resolucion=0):
+        '''
+        Devuelve un ResultadoConsulta con la ventana de una métrica entre las
+        marcas de tiempo indicadas, usando el nivel más grueso que cubre el
+        rango con una resolución de a lo sumo 'resolucion' segundos. Las
+        columnas son vistas sobre los segmentos mapeados en memoria, que se
+        liberan al descartar el resultado.
+        '''
+        with self._candado_series:
+            series = self._series.get(nombre)
+
+        # * Una consulta no crea series ni directorios: las métricas que no
+        # * están registradas se abren sin registrarlas, y las que no existen
+        # * devuelven una ventana vacía.
+        if series is None:
+            if not os.path.isdir(self._directorio_metrica(nombre)):
+                return historial.ResultadoConsulta(
+                    0, historial.VentanaSerie((), ())
+                )
+
+            series = self._abrir_series(nombre)
+
+        candidatos = [(0, series[0])] + [
+            (nivel.resolucion, serie)
+            for nivel, serie in zip(self.niveles, series[1:])
+            if nivel.resolucion <= resolucion
+        ]
+
+        return historial.consultar_niveles(candidatos, desde, hasta)
@@ -1,56 +1,328 @@
+import json
 import subprocess
 import os
-import sys
+import socket
+import struct
+import threading
+import time
 
-from datetime import datetime
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# * Resultado de ejecutar smartctl sobre un dispositivo dentro de un lote. El
+# * estado puede ser 'ok', 'error' o 'timeout'. 'registro' es el RegistroSmart
+# * si la salida ya se interpretó (por ejemplo, en un proceso de trabajo).
+ResultadoSmartctl = namedtuple(
+    'ResultadoSmartctl', ['estado', 'salida', 'error', 'duracion', 'registro'],
+    defaults=(None,)
+)
+
+# * Protocolo del ayudante SMART (utils.ayudante_smart): cada mensaje es su
+# * longitud en 4 bytes seguida de un objeto JSON en UTF-8. Se usa JSON y no
+# * pickle porque el ayudante corre como administrador y no debe
+# * deserializar objetos arbitrarios de un cliente sin privilegios.
+VERSION_PROTOCOLO = 1
+_LONGITUD = struct.Struct('!I')
+MAXIMO_MENSAJE = 16 * 1024 * 1024
+
+def enviar_mensaje(conexion, objeto):
+    '''Envía un objeto JSON por un socket, precedido de su longitud.'''
+    datos = json.dumps(objeto, separators=(',', ':')).encode('utf-8')
+
+    conexion.sendall(_LONGITUD.pack(len(datos)) + datos)
+
+def _recibir_exacto(conexion, cantidad):
+    partes = []
+
+    while cantidad:
+        parte = conexion.recv(min(cantidad, 65536))
+
+        if not parte:
+            raise ConnectionError('El socket se cerró a mitad de un mensaje')
+
+        partes.append(parte)
+        cantidad -= len(parte)
+
+    return b''.join(partes)
+
+def recibir_mensaje(conexion, maximo=MAXIMO_MENSAJE):
+    '''
+    Recibe un objeto JSON de un socket. Devuelve None si el otro extremo
+    cerró la conexión entre mensajes, y lanza ValueError si el mensaje
+    supera 'maximo' bytes o no es JSON válido.
+    '''
+    cabecera = conexion.recv(_LONGITUD.size, socket.MSG_WAITALL)
+
+    if not cabecera:
+        return None
+
+    if len(cabecera) < _LONGITUD.size:
+        cabecera += _recibir_exacto(
+            conexion, _LONGITUD.size - len(cabecera)
+        )
+
+    longitud, = _LONGITUD.unpack(cabecera)
+
+    if longitud > maximo:
+        raise ValueError(
+            f'El mensaje de {longitud} bytes supera el máximo de {maximo}'
+        )
+
+    return json.loads(_recibir_exacto(conexion, longitud))
 
 class Smartmontools:
     '''
     Clase para interactuar con Smartmontools.
+
+    Si se indica la ruta del socket de un ayudante SMART (ver
+    utils.ayudante_smart), los lotes se le envían a él, que ejecuta smartctl
+    como administrador, en lugar de ejecutar 'sudo smartctl' por disco.
     '''
 
+    # * Máscara de los bits del código de salida de smartctl que indican que
+    # * no se pudo leer el dispositivo (bit 0: error en la línea de comandos,
+    # * bit 1: no se pudo abrir el dispositivo). El resto de bits reportan el
+    # * estado del disco, pero la salida sigue siendo válida.
+    BITS_ERROR_SMARTCTL = 0b11
+
+    # * Segundos que se esperan la respuesta del ayudante, además del tiempo
+    # * límite de smartctl.
+    MARGEN_AYUDANTE = 5
+
+    def __init__(self, maximo_paralelo=8, ayudante='', sudo=True):
+        self.maximo_paralelo = maximo_paralelo
+        self.ayudante = ayudante
+        self.sudo = sudo
+
+        self._candado = threading.Lock()
+        self._ejecutor = None
+
+        self._candado_ayudante = threading.Lock()
+        self._conexion_ayudante = None
+
+    def configurar_paralelismo(self, maximo_paralelo):
+        '''
+        Cambia la cantidad máxima de ejecuciones simultáneas (por ejemplo, al
+        recargar la configuración). El ejecutor anterior termina en segundo
+        plano las ejecuciones ya encoladas, y el siguiente lote crea uno
+        nuevo con el tamaño actualizado.
+        '''
+        with self._candado:
+            if maximo_paralelo == self.maximo_paralelo:
+                return
+
+            self.maximo_paralelo = maximo_paralelo
+            ejecutor = self._ejecutor
+            self._ejecutor = None
+
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False)
+
+    def _construir_comando(self, almacenamiento):
+        '''
+        Devuelve el comando de smartctl para el sistema operativo actual. Se
+        pide la salida en JSON (-j) para interpretarla en una sola pasada.
+        '''
+        sistema_operativo = os.name
+
+        if sistema_operativo == 'nt':
+            # * Para Windows, se obtiene la ruta relativa del ejecutable, y
+            # * se convierte a ruta absoluta para mayor claridad en la
+            # * depuración.
+            ruta = os.path.abspath(
+                os.path.join(
+                    'externals/smartctl', 'smartctl.exe'
+                )
+            )
+
+            comando = [ruta, '-j', '-A', almacenamiento, '--device=auto']
+
+        if sistema_operativo == 'posix':
+            # * Para Linux, se asume que smartctl está instalado y se
+            # * ejecuta directamente.
+            # * Se utiliza 'sudo' porque necesita permisos de administrador
+            # * para acceder a la información del disco, y se usa la ruta
+            # * completa a 'smartctl' porque es la que se configuró en
+            # * '/etc/sudoers' con 'NOPASSWD' para que el comando no
+            # * requiera contraseña. El ayudante SMART ya corre como
+            # * administrador, por lo que no usa 'sudo'.
+            comando = [
+                '/usr/sbin/smartctl', '-j', '-A', almacenamiento,
+                '--device=auto'
+            ]
+
+            if self.sudo:
+                comando.insert(0, 'sudo')
+
+        return comando
+
     def ejecutar_smartmontools(self, almacenamiento):
         '''
         Ejecuta Smartmontools para obtener las métricas del almacenamiento.
+        Si smartctl falla, lanza la excepción en lugar de finalizar el
+        agente, para que el llamador decida cómo manejarla.
         '''
-        try:
-            sistema_operativo = os.name
-
-            if sistema_operativo == 'nt':
-                # * Para Windows, se obtiene la ruta relativa del ejecutable, y
-                # * se convierte a ruta absoluta para mayor claridad en la
-                # * depuración.
-                ruta = os.path.abspath(
-                    os.path.join(
-                        'externals/smartctl', 'smartctl.exe'
-                    )
-                )
+        comando = self._construir_comando(almacenamiento)
+
+        resultado = subprocess.run(
+            comando, capture_output=True, text=True, check=True
+        )
+
+        return resultado.stdout
 
-                comando = [ruta, '-A', almacenamiento, '--device=auto']
-
-            if sistema_operativo == 'posix':
-                # * Para Linux, se asume que smartctl está instalado y se
-                # * ejecuta directamente.
-                # * Se utiliza 'sudo' porque necesita permisos de administrador
-                # * para acceder a la información del disco, y se usa la ruta
-                # * completa a 'smartctl' porque es la que se configuró en
-                # * '/etc/sudoers' con 'NOPASSWD' para que el comando no
-                # * requiera contraseña.
-                comando = [
-                    'sudo', '/usr/sbin/smartctl', '-A', almacenamiento,
-                    '--device=auto'
-                ]
+    def _ejecutar_dispositivo(self, almacenamiento, timeout):
+        '''
+        Ejecuta smartctl sobre un dispositivo con un tiempo límite, y devuelve
+        el resultado en lugar de finalizar el agente si falla.
+        '''
+        inicio = time.monotonic()
 
+        try:
             resultado = subprocess.run(
-                comando, capture_output=True, text=True, check=True
+                self._construir_comando(almacenamiento), capture_output=True,
+                text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            # * subprocess.run() ya finalizó el proceso de smartctl al
+            # * vencer el tiempo límite.
+            return ResultadoSmartctl(
+                'timeout', None,
+                f'smartctl no respondió en {timeout} segundos',
+                time.monotonic() - inicio
             )
-
-            return resultado.stdout
         except Exception as error:
-            print(
-                f'{datetime.now()} >>> *** Error al ejecutar Smartmontools ***'
+            return ResultadoSmartctl(
+                'error', None, str(error), time.monotonic() - inicio
+            )
+
+        if resultado.returncode & self.BITS_ERROR_SMARTCTL:
+            return ResultadoSmartctl(
+                'error', None,
+                resultado.stderr.strip() or resultado.stdout.strip(),
+                time.monotonic() - inicio
+            )
+
+        return ResultadoSmartctl(
+            'ok', resultado.stdout, None, time.monotonic() - inicio
+        )
+
+    def ejecutar_smartmontools_lote(self, dispositivos, timeout=10):
+        '''
+        Ejecuta smartctl sobre varios dispositivos en paralelo, con a lo sumo
+        'maximo_paralelo' ejecuciones simultáneas y un tiempo límite por
+        dispositivo. Devuelve un dictionary donde la clave es el dispositivo
+        y el valor es un ResultadoSmartctl, incluso si algunos dispositivos
+        fallaron o no respondieron a tiempo.
+        '''
+        if self.ayudante:
+            return self._consultar_ayudante(dispositivos, timeout)
+
+        # * El ejecutor se crea una sola vez y se reutiliza entre lotes para
+        # * no crear hilos nuevos en cada intervalo. Los dispositivos se
+        # * encolan con el candado tomado, para que configurar_paralelismo()
+        # * no lo finalice mientras tanto.
+        with self._candado:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(
+                    max_workers=self.maximo_paralelo,
+                    thread_name_prefix='smartctl'
+                )
+
+            futuros = {
+                dispositivo: self._ejecutor.submit(
+                    self._ejecutar_dispositivo, dispositivo, timeout
+                )
+                for dispositivo in dispositivos
+            }
+
+        return {
+            dispositivo: futuro.result()
+            for dispositivo, futuro in futuros.items()
+        }
+
+    def _consultar_ayudante(self, dispositivos, timeout):
+        '''
+        Envía el lote al ayudante SMART por una conexión que se mantiene
+        abierta entre lotes, y devuelve sus resultados. Si el ayudante no
+        responde, todos los dispositivos se devuelven con error.
+        '''
+        dispositivos = list(dispositivos)
+        inicio = time.monotonic()
+
+        with self._candado_ayudante:
+            # * Si el ayudante se reinició, la conexión guardada está cerrada
+            # * y el primer intento falla al ser rechazada o reiniciada; sólo
+            # * en ese caso se reintenta una vez con una conexión nueva. Un
+            # * tiempo límite agotado no se reintenta, para no duplicar la
+            # * espera.
+            for intento in range(2):
+                try:
+                    respuesta = self._solicitar_ayudante(dispositivos, timeout)
+                    break
+                except (OSError, ValueError) as error:
+                    self._cerrar_ayudante()
+
+                    if intento == 1 or not isinstance(error, ConnectionError):
+                        return {
+                            dispositivo: ResultadoSmartctl(
+                                'error', None,
+                                f'El ayudante SMART no respondió: {error}',
+                                time.monotonic() - inicio
+                            )
+                            for dispositivo in dispositivos
+                        }
+
+        if 'error' in respuesta:
+            return {
+                dispositivo: ResultadoSmartctl(
+                    'error', None, respuesta['error'],
+                    time.monotonic() - inicio
+                )
+                for dispositivo in dispositivos
+            }
+
+        resultados = respuesta['resultados']
+
+        return {
+            dispositivo: (
+                ResultadoSmartctl(*resultados[dispositivo])
+                if dispositivo in resultados else ResultadoSmartctl(
+                    'error', None, 'El ayudante SMART no devolvió el disco',
+                    time.monotonic() - inicio
+                )
             )
-            print(error)
+            for dispositivo in dispositivos
+        }
+
+    def _solicitar_ayudante(self, dispositivos, timeout):
+        if self._conexion_ayudante is None:
+            conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+            try:
+                conexion.settimeout(self.MARGEN_AYUDANTE)
+                conexion.connect(self.ayudante)
+            except OSError:
+                conexion.close()
+                raise
+
+            self._conexion_ayudante = conexion
+
+        self._conexion_ayudante.settimeout(timeout + self.MARGEN_AYUDANTE)
+
+        enviar_mensaje(self._conexion_ayudante, {
+            'version': VERSION_PROTOCOLO,
+            'dispositivos': dispositivos,
+            'timeout': timeout
+        })
+
+        respuesta = recibir_mensaje(self._conexion_ayudante)
+
+        if respuesta is None:
+            raise ConnectionError('El ayudante SMART cerró la conexión')
+
+        return respuesta
 
-            # * Si no se puede ejecutar Smartmontools, se finaliza el agente.
-            sys.exit(1)
+    def _cerrar_ayudante(self):
+        if self._conexion_ayudante is not None:
+            self._conexion_ayudante.close()
+            self._conexion_ayudante = None
@@ -0,0 +1,288 @@
+from collections import namedtuple
+
+import metrics.smart as smart
+import utils.diario_alertas as diario_alertas
+
+# * Diferencia entre dos versiones de las líneas de un área de texto: las
+# * líneas que cambiaron (índice y texto nuevo), las líneas agregadas al
+# * final y, si sobran líneas, el índice desde el que hay que eliminarlas.
+DiferenciaLineas = namedtuple(
+    'DiferenciaLineas', ['cambiadas', 'agregadas', 'eliminar_desde']
+)
+
+# * Cambios a aplicar en la GUI: los textos de etiquetas que cambiaron, y la
+# * diferencia de cada área de texto que cambió.
+CambiosVista = namedtuple('CambiosVista', ['etiquetas', 'textos'])
+
+def diferenciar_lineas(anteriores, nuevas):
+    '''Devuelve la DiferenciaLineas entre dos tuples de líneas.'''
+    cambiadas = tuple(
+        (indice, linea)
+        for indice, (anterior, linea) in enumerate(zip(anteriores, nuevas))
+        if anterior != linea
+    )
+    agregadas = tuple(nuevas[len(anteriores):])
+    eliminar_desde = len(nuevas) if len(nuevas) < len(anteriores) else None
+
+    return DiferenciaLineas(cambiadas, agregadas, eliminar_desde)
+
+def formatear_bytes(cantidad):
+    '''Devuelve una cantidad de bytes con la unidad binaria más adecuada.'''
+    for unidad in ('B', 'KiB', 'MiB', 'GiB', 'TiB'):
+        if abs(cantidad) < 1024 or unidad == 'TiB':
+            break
+
+        cantidad /= 1024
+
+    return f'{cantidad:.0f} {unidad}' if unidad == 'B' else (
+        f'{cantidad:.1f} {unidad}'
+    )
+
+def _texto_datos_leidos_escritos(disco):
+    '''
+    Devuelve el texto de los datos leídos y escritos de un disco: en NVMe,
+    las unidades de datos convertidas a bytes, y en ATA, los LBAs (cuyo
+    tamaño depende del disco).
+    '''
+    leidas, escritas = disco.datos_leidos_escritos
+
+    if leidas is not None and escritas is not None:
+        return (
+            f'Leídos {formatear_bytes(leidas * smart.BYTES_UNIDAD_NVME)}, '
+            f'escritos {formatear_bytes(escritas * smart.BYTES_UNIDAD_NVME)}'
+        )
+
+    registro = disco.smart
+
+    if registro.lbas_leidos is not None and registro.lbas_escritos is not None:
+        return (
+            f'{registro.lbas_leidos} LBAs leídos, '
+            f'{registro.lbas_escritos} LBAs escritos'
+        )
+
+    return 'Desconocido'
+
+def _texto_rendimiento(rendimiento):
+    '''Devuelve el texto de un diskstats.RendimientoIO en una línea.'''
+    texto = (
+        f'L {rendimiento.iops_lectura:.0f} IOPS '
+        f'{formatear_bytes(rendimiento.bytes_lectura)}/s '
+        f'{rendimiento.latencia_lectura:.2f} ms, '
+        f'E {rendimiento.iops_escritura:.0f} IOPS '
+        f'{formatear_bytes(rendimiento.bytes_escritura)}/s '
+        f'{rendimiento.latencia_escritura:.2f} ms'
+    )
+
+    if rendimiento.cola is not None:
+        texto += f', cola {rendimiento.cola:.2f}'
+    if rendimiento.utilizacion is not None:
+        texto += f', uso {rendimiento.utilizacion:.0f}%'
+
+    return texto
+
+def vista_cpu(metricas_cpu, sistema_operativo, obsoletas=frozenset()):
+    '''
+    Devuelve los textos de la sección de la CPU en dos dictionaries: uno
+    con el texto de cada etiqueta y otro con las líneas de cada área de
+    texto. Las claves que no se incluyen conservan su valor anterior. Las
+    temperaturas se marcan si su fuente está en 'obsoletas'.
+    '''
+    uso_nucleos, uso_total = metricas_cpu.uso
+    desglose_nucleos, desglose = metricas_cpu.desglose
+
+    etiquetas = {
+        'cpu.modelo': metricas_cpu.modelo,
+        'cpu.nucleos_fisicos': f'{metricas_cpu.nucleos_fisicos}',
+        'cpu.nucleos_logicos': f'{metricas_cpu.nucleos_logicos}',
+        'cpu.uso_total': f'{uso_total}%',
+        'cpu.desglose': (
+            f'user {desglose.user}%, system {desglose.system}%, '
+            f'iowait {desglose.iowait}%, steal {desglose.steal}%'
+        ),
+    }
+    textos = {
+        'cpu.uso_nucleos': tuple(
+            f'Núcleo {nucleo}: {uso}% (iowait {desglose_nucleo.iowait}%, '
+            f'steal {desglose_nucleo.steal}%)'
+            for nucleo, (uso, desglose_nucleo) in enumerate(
+                zip(uso_nucleos, desglose_nucleos)
+            )
+        ),
+    }
+
+    temperatura_cpu = metricas_cpu.temperatura
+
+    if temperatura_cpu is None:
+        return etiquetas, textos
+
+    marca = ' (obsoleta)' if 'cpu.temperatura' in obsoletas else ''
+
+    # * Sin núcleos o sin sensor de paquete, el promedio o la temperatura del
+    # * paquete quedan en None.
+    etiquetas['cpu.temperatura_promedio'] = (
+        'Desconocido' if temperatura_cpu[1] is None
+        else f'{temperatura_cpu[1]}°C{marca}'
+    )
+    etiquetas['cpu.temperatura_paquete'] = (
+        'Desconocido' if temperatura_cpu[2] is None
+        else f'{temperatura_cpu[2]}°C{marca}'
+    )
+
+    # * En Windows sólo se detallan las temperaturas por núcleo de las CPU
+    # * Intel, ya que en AMD hay un único valor para los núcleos.
+    if sistema_operativo == 'nt' and not metricas_cpu.modelo.startswith(
+        'Intel'
+    ):
+        return etiquetas, textos
+
+    textos['cpu.temperatura_nucleos'] = tuple(
+        f'Núcleo {nucleo}: {temperatura} °C'
+        for nucleo, temperatura in enumerate(temperatura_cpu[0])
+    )
+
+    return etiquetas, textos
+
+def vista_disco(disco, obsoletas=frozenset()):
+    '''
+    Devuelve los textos de la sección de un disco, con la misma estructura
+    que vista_cpu(). Las claves incluyen la clave del disco. Los valores
+    SMART y las particiones se marcan si su fuente está en 'obsoletas'.
+    '''
+    clave = disco.clave
+    smart_obsoleto = disco.fuente_smart in obsoletas
+    marca_smart = ' (obsoleta)' if smart_obsoleto else ''
+
+    # * La temperatura puede venir de hwmon aunque la lectura SMART haya
+    # * fallado, por lo que no depende del estado SMART, y sólo es obsoleta
+    # * si viene de smartctl.
+    if disco.temperatura is None:
+        temperatura = 'Desconocido'
+    elif disco.temperatura_hwmon:
+        temperatura = f'{disco.temperatura} °C'
+    else:
+        temperatura = f'{disco.temperatura} °C{marca_smart}'
+
+    # * Si smartctl falló, se muestran los últimos valores de la caché.
+    if disco.horas_encendido is not None:
+        horas_encendido = f'{disco.horas_encendido} horas{marca_smart}'
+    elif disco.estado_smart in ('ok', None):
+        horas_encendido = 'Desconocido'
+    else:
+        horas_encendido = f'Desconocido ({disco.estado_smart})'
+
+    datos_leidos_escritos = _texto_datos_leidos_escritos(disco)
+
+    if datos_leidos_escritos != 'Desconocido':
+        datos_leidos_escritos += marca_smart
+
+    etiquetas = {
+        f'disco.{clave}.horas_encendido': horas_encendido,
+        f'disco.{clave}.temperatura': temperatura,
+        f'disco.{clave}.datos_leidos_escritos': datos_leidos_escritos,
+    }
+
+    lineas = []
+
+    for particion in disco.particiones:
+        uso_particion = particion.uso
+        marca = (
+            ' (obsoleta)' if f'particion.{particion.particion}' in obsoletas
+            else ''
+        )
+
+        lineas.extend((
+            f'Partición: {particion.particion}{marca}',
+            f'Sistema de Archivos: {particion.sistema_archivos}',
+            f'Espacio total (bytes): {uso_particion[0]}',
+            f'Espacio usado (bytes): {uso_particion[1]}',
+            f'Espacio libre (bytes): {uso_particion[2]}',
+            f'Porcentaje usado: {uso_particion[3]}%',
+            '',
+        ))
+
+    textos = {f'disco.{clave}.particiones': tuple(lineas)}
+
+    return etiquetas, textos
+
+def vista_io(io_disco):
+    '''
+    Devuelve los textos de la entrada/salida de un disco, con la misma
+    estructura que vista_cpu(): el rendimiento del disco en una etiqueta y
+    el de cada partición en un área de texto.
+    '''
+    clave = io_disco.clave
+
+    etiquetas = {f'disco.{clave}.io': _texto_rendimiento(io_disco.rendimiento)}
+    textos = {
+        f'disco.{clave}.io_particiones': tuple(
+            f'{particion.particion}: '
+            f'{_texto_rendimiento(particion.rendimiento)}'
+            for particion in io_disco.particiones
+        ),
+    }
+
+    return etiquetas, textos
+
+def vista_alertas(entradas):
+    '''
+    Devuelve las líneas del registro de alertas, una por entrada del diario
+    (utils.diario_alertas.EntradaDiario), con la misma estructura que
+    vista_cpu().
+    '''
+    return {}, {
+        'alertas': tuple(
+            diario_alertas.formatear_entrada(entrada) for entrada in entradas
+        ),
+    }
+
+class VistaModelo:
+    '''
+    Modelo de la vista de la GUI. Recuerda el último texto renderizado de
+    cada etiqueta y de cada línea de las áreas de texto, y devuelve sólo lo
+    que cambió, para que la GUI no vuelva a escribir (ni a recalcular el
+    layout de) los widgets cuyo contenido es el mismo.
+    '''
+
+    def __init__(self):
+        self._etiquetas = {}
+        self._textos = {}
+
+    def diferenciar(self, etiquetas, textos):
+        '''
+        Compara los textos nuevos con los últimos renderizados, los recuerda
+        y devuelve los CambiosVista a aplicar.
+        '''
+        etiquetas_cambiadas = []
+
+        for clave, valor in etiquetas.items():
+            if self._etiquetas.get(clave) != valor:
+                self._etiquetas[clave] = valor
+                etiquetas_cambiadas.append((clave, valor))
+
+        textos_cambiados = []
+
+        for clave, lineas in textos.items():
+            anteriores = self._textos.get(clave, ())
+
+            if anteriores == lineas:
+                continue
+
+            self._textos[clave] = lineas
+            textos_cambiados.append(
+                (clave, diferenciar_lineas(anteriores, lineas))
+            )
+
+        return CambiosVista(
+            tuple(etiquetas_cambiadas), tuple(textos_cambiados)
+        )
+
+    def olvidar(self, prefijo):
+        '''
+        Olvida los textos cuyas claves empiezan con 'prefijo' (por ejemplo,
+        los de un disco retirado).
+        '''
+        for memoria in (self._etiquetas, self._textos):
+            for clave in [
+                clave for clave in memoria if clave.startswith(prefijo)
+            ]:
+                del memoria[clave]